@@ -0,0 +1,150 @@
+import os
+import threading
+import pygame
+from maze import TILE_SIZE
+
+SPRITES_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "assets", "sprites"))
+# Ghosts (and their scatter look) fill a tile with a tiny padding so they fit corridors
+SPRITE_SIZE = max(1, TILE_SIZE - 2)
+LIFE_ICON_SIZE = max(16, TILE_SIZE - 6)
+SCATTER_SPRITE = "scater_mode.png"
+LIFE_ICON_SPRITE = "pacman.png"
+# Every sprite is scaled to each of these when the atlas is built
+ATLAS_SIZES = (SPRITE_SIZE, LIFE_ICON_SIZE)
+ATLAS_WIDTH = 256
+
+
+class SpriteAtlas:
+    """Every sprite in a directory, loaded once and pre-scaled into one surface.
+
+    Each (sprite, size) variant is a region of `surface`; get() hands out a
+    subsurface of it, shared by everyone who asks, so a hundred ghosts cost
+    no more image memory than one. A size not in `sizes` is loaded and
+    scaled the first time it is asked for and kept on its own.
+    """
+
+    def __init__(self, sprite_dir=SPRITES_DIR, sizes=ATLAS_SIZES, width=ATLAS_WIDTH):
+        self.sprite_dir = sprite_dir
+        self.sizes = tuple(sorted(set(sizes), reverse=True))
+        self.width = width
+        self.surface = None
+        # (name, size) -> Rect of the variant in `surface`
+        self.rects = {}
+        self.names = []
+        # Files read from disk so far (one per sprite, plus any late sizes)
+        self.loads = 0
+        self._views = {}
+        self._extra = {}
+        self._build()
+
+    def _load(self, name):
+        try:
+            image = pygame.image.load(os.path.join(self.sprite_dir, name))
+        except (pygame.error, OSError) as e:
+            print("Failed to load sprite:", e)
+            return None
+        self.loads += 1
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        return image
+
+    def _build(self):
+        try:
+            files = sorted(f for f in os.listdir(self.sprite_dir) if f.lower().endswith(".png"))
+        except OSError as e:
+            print("Failed to list sprites:", e)
+            files = []
+        variants = []
+        for name in files:
+            image = self._load(name)
+            if image is None:
+                continue
+            self.names.append(name)
+            for size in self.sizes:
+                variants.append((name, size, pygame.transform.smoothscale(image, (size, size))))
+        self._pack(variants)
+
+    def _pack(self, variants):
+        # Shelves: left to right, a new shelf when the row is full; largest
+        # first so each shelf is as tall as its first sprite
+        variants.sort(key=lambda v: -v[2].get_height())
+        x = y = shelf_height = 0
+        for name, size, image in variants:
+            w, h = image.get_size()
+            if x + w > self.width and x > 0:
+                x, y = 0, y + shelf_height
+                shelf_height = 0
+            self.rects[(name, size)] = pygame.Rect(x, y, w, h)
+            x += w
+            shelf_height = max(shelf_height, h)
+        self.surface = pygame.Surface((self.width, max(1, y + shelf_height)), pygame.SRCALPHA)
+        for name, size, image in variants:
+            # RGBA_MAX onto transparent black copies the pixels (alpha included) as they are
+            self.surface.blit(image, self.rects[(name, size)], special_flags=pygame.BLEND_RGBA_MAX)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+    def get(self, name, size=SPRITE_SIZE):
+        """Shared surface of sprite `name` scaled to size x size, or None if it can't be loaded"""
+        key = (name, size)
+        view = self._views.get(key)
+        if view is not None:
+            return view
+        rect = self.rects.get(key)
+        if rect is not None:
+            view = self._views[key] = self.surface.subsurface(rect)
+            return view
+        if key not in self._extra:
+            image = self._load(name) if name in self.names else None
+            self._extra[key] = image and pygame.transform.smoothscale(image, (size, size))
+        return self._extra[key]
+
+
+_atlas = None
+# Built once even if two threads ask for it at the same moment
+_atlas_lock = threading.Lock()
+
+
+def get_atlas():
+    """The process-wide atlas, built on first use (after the display exists, for convert_alpha)"""
+    global _atlas
+    with _atlas_lock:
+        if _atlas is None:
+            _atlas = SpriteAtlas()
+        return _atlas
+
+
+def get_sprite(name, size=SPRITE_SIZE):
+    return get_atlas().get(name, size)
+
+
+if __name__ == "__main__":
+    # Compare with every ghost loading and scaling its own sprites
+    import time
+    from maze import init_display
+    from ghost_manager import GHOST_SPRITES
+
+    pygame.init()
+    init_display()
+
+    def per_entity(count):
+        images = []
+        for i in range(count):
+            for name in (GHOST_SPRITES[i % len(GHOST_SPRITES)][0], SCATTER_SPRITE):
+                img = pygame.image.load(os.path.join(SPRITES_DIR, name)).convert_alpha()
+                images.append(pygame.transform.smoothscale(img, (SPRITE_SIZE, SPRITE_SIZE)))
+        return images
+
+    for count in (4, 40, 400):
+        start = time.perf_counter()
+        per_entity(count)
+        separate = time.perf_counter() - start
+        start = time.perf_counter()
+        atlas = SpriteAtlas()
+        for i in range(count):
+            atlas.get(GHOST_SPRITES[i % len(GHOST_SPRITES)][0])
+            atlas.get(SCATTER_SPRITE)
+        shared = time.perf_counter() - start
+        print(f"{count:>4} ghosts: per-ghost loading {separate * 1000:7.1f} ms ({2 * count} files), "
+              f"atlas {shared * 1000:6.1f} ms ({atlas.loads} files, "
+              f"{atlas.surface.get_width()}x{atlas.surface.get_height()} atlas)")
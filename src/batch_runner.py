@@ -0,0 +1,187 @@
+"""Play many seeded headless games across all CPU cores and summarise them.
+
+    python src/batch_runner.py --games 2000 --controller greedy --ghost-ai flow
+    python src/batch_runner.py --games 500 --controller script:RRDDLLUU --out runs.jsonl
+
+Each worker process loads the level and its navigation data once and then
+plays game after game; per-game results stream back as they finish.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import time
+from maze import LEVEL_IDS, load_level
+from navigation import NavTable, get_nav_graph
+from simulation import (
+    Simulation, GHOST_SPEED, GHOST_COUNT, INITIAL_LIVES, GHOST_AI, TICK_RATE,
+    random_controller, scripted_controller, greedy_controller,
+)
+
+SCRIPT_KEYS = {"U": (0, -1), "D": (0, 1), "L": (-1, 0), "R": (1, 0)}
+# Games per task sent to a worker (fewer round trips, still streams)
+CHUNK_SIZE = 8
+
+# Per-worker state, filled in by _init_worker()
+_worker = {}
+
+
+def make_controller(spec, seed):
+    """Controller for one game from a --controller spec"""
+    if spec == "idle":
+        return None
+    if spec == "random":
+        return random_controller(random.Random(seed))
+    if spec == "greedy":
+        return greedy_controller()
+    if spec.startswith("script:"):
+        try:
+            directions = [SCRIPT_KEYS[c] for c in spec[len("script:"):].upper()]
+        except KeyError as e:
+            raise ValueError(f"unknown direction {e} in {spec!r} (use U, D, L, R)")
+        if not directions:
+            raise ValueError("script: needs at least one direction")
+        return scripted_controller(directions)
+    raise ValueError(f"unknown controller {spec!r}")
+
+
+def _init_worker(settings):
+    # Build the level, nav graph and (optionally) nav table once per process
+    if settings["size"]:
+        # Every worker generates the same maze from the same seed
+        from maze_gen import grid_of_size
+        grid = grid_of_size(settings["size"], seed=settings["maze_seed"])
+    else:
+        grid = load_level(settings["level"])
+    get_nav_graph(grid)
+    nav_table = NavTable.for_grid(grid) if settings["ghost_ai"] == "table" else None
+    _worker.update(settings=settings, grid=grid, nav_table=nav_table)
+
+
+def play_game(seed):
+    """Play one game to the end (or max_ticks) and return its result dict"""
+    settings = _worker["settings"]
+    sim = Simulation(ghost_speed=settings["ghost_speed"], initial_lives=settings["lives"],
+                     ghost_count=settings["ghost_count"], ghost_ai=settings["ghost_ai"],
+                     nav_table=_worker["nav_table"], grid=_worker["grid"], seed=seed,
+                     step_ticks=settings["step_ticks"])
+    controller = make_controller(settings["controller"], seed)
+    sim.run(settings["max_ticks"], controller)
+    return {
+        "seed": seed,
+        "score": sim.pacman.pallet_count,
+        "ticks": sim.tick,
+        "deaths": sim.level.deaths,
+        "takedowns": sim.level.takedowns,
+        "lives": sim.level.get_lives(),
+        "cleared": sim.level_cleared,
+        "pellets_left": sim.grid.pellets_remaining,
+    }
+
+
+def play_games(seeds):
+    return [play_game(seed) for seed in seeds]
+
+
+def summarize(results):
+    """{metric: {mean, p10, p50, p90, min, max}} plus counts and clear rate"""
+    summary = {"games": len(results)}
+    if not results:
+        return summary
+    for metric in ("score", "ticks", "deaths", "takedowns", "pellets_left"):
+        values = sorted(r[metric] for r in results)
+        n = len(values)
+        summary[metric] = {
+            "mean": statistics.fmean(values),
+            "p10": values[n // 10],
+            "p50": values[n // 2],
+            "p90": values[min(n - 1, n * 9 // 10)],
+            "min": values[0],
+            "max": values[-1],
+        }
+    summary["clear_rate"] = sum(r["cleared"] for r in results) / len(results)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch evaluation")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="first game seed (games use seed, seed+1, ...)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--level", default=LEVEL_IDS[0], choices=LEVEL_IDS)
+    parser.add_argument("--size", type=int, default=None,
+                        help="play on a generated NxN maze (maze_gen.py) instead of --level")
+    parser.add_argument("--maze-seed", type=int, default=0, help="seed of the generated maze")
+    parser.add_argument("--controller", default="greedy",
+                        help="idle, random, greedy or script:<UDLR...>")
+    parser.add_argument("--ghost-ai", default=GHOST_AI, choices=["flow", "table", "dijkstra"])
+    parser.add_argument("--ghost-count", type=int, default=GHOST_COUNT)
+    parser.add_argument("--ghost-speed", type=float, default=GHOST_SPEED)
+    parser.add_argument("--lives", type=int, default=INITIAL_LIVES)
+    parser.add_argument("--max-ticks", type=int, default=5 * 60 * TICK_RATE,
+                        help="cut games off after this many ticks (default: 5 game minutes)")
+    parser.add_argument("--step-ticks", type=int, default=1,
+                        help="ticks per simulation step (fast-forward; swept movement and collisions)")
+    parser.add_argument("--out", default=None, help="also write one JSON line per game here")
+    args = parser.parse_args(argv)
+
+    try:
+        make_controller(args.controller, 0)  # fail fast on a bad spec
+    except ValueError as e:
+        parser.error(str(e))
+    if args.step_ticks < 1:
+        parser.error("--step-ticks must be at least 1")
+    settings = {
+        "level": args.level,
+        "size": args.size,
+        "maze_seed": args.maze_seed,
+        "controller": args.controller,
+        "ghost_ai": args.ghost_ai,
+        "ghost_count": args.ghost_count,
+        "ghost_speed": args.ghost_speed,
+        "lives": args.lives,
+        "max_ticks": args.max_ticks,
+        "step_ticks": args.step_ticks,
+    }
+    seeds = list(range(args.seed, args.seed + args.games))
+    chunks = [seeds[i:i + CHUNK_SIZE] for i in range(0, len(seeds), CHUNK_SIZE)]
+
+    results = []
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    start = time.perf_counter()
+    last_report = start
+    try:
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(settings,)) as pool:
+            for batch in pool.imap_unordered(play_games, chunks):
+                results.extend(batch)
+                if out is not None:
+                    for r in batch:
+                        out.write(json.dumps(r) + "\n")
+                now = time.perf_counter()
+                if now - last_report >= 1.0:
+                    last_report = now
+                    mean = statistics.fmean(r["score"] for r in results)
+                    print(f"{len(results)}/{args.games} games, mean score {mean:.0f}", flush=True)
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results)
+    summary["settings"] = settings
+    total_ticks = sum(r["ticks"] for r in results)
+    print(f"{len(results)} games in {elapsed:.1f}s on {args.workers} workers "
+          f"({total_ticks / elapsed:.0f} ticks/s, {total_ticks / TICK_RATE / elapsed:.0f}x real time)")
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
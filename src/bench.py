@@ -0,0 +1,213 @@
+"""Benchmark runner: python src/bench.py [--quick] [--save-baseline] [--threshold 0.25]
+
+Times pathfinding, map drawing and simulation throughput on every level in
+data/maze.json plus a few synthetic large mazes (and, with --size N,
+generated NxN mazes from maze_gen.py). Runs headless (SDL dummy
+video driver) and offline. Results go to profiles/bench_<time>.json and are
+compared with the stored baseline; the exit code is 1 if anything regressed
+by more than the threshold.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import pygame
+from grid import Grid
+from maze import LEVEL_IDS, TILE_SIZE, load_level, draw_smooth_map
+from ghost import build_graph, dijkstra, nearest_node_from_tile, is_walkable
+from pacman import Pacman
+from simulation import Simulation, random_controller
+from profiler import PROFILE_DIR
+
+BASELINE_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "data", "bench_baseline.json")
+)
+SEED = 1234
+# (width, height) of the generated mazes
+SYNTHETIC_SIZES = [(61, 61), (121, 121)]
+DEFAULT_THRESHOLD = 0.25
+
+
+def synthetic_rows(width, height):
+    """Open lattice maze: border walls plus a pillar on every (even, even) tile.
+
+    Every crossing is a junction, so it is a worst case for the node graph.
+    Pacman starts near the middle and the ghost spawn is in the top left.
+    """
+    rows = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            if x in (0, width - 1) or y in (0, height - 1) or (x % 2 == 0 and y % 2 == 0):
+                row.append("1")
+            else:
+                row.append("2")
+        rows.append(row)
+    cx, cy = width // 2 | 1, height // 2 | 1
+    rows[cy][cx] = "9"
+    rows[1][1] = "5"
+    return ["".join(row) for row in rows]
+
+
+def bench_maps(quick=False, generated_sizes=()):
+    """(name, Grid) for every maze.json level, the synthetic mazes and any generated ones"""
+    maps = [(f"level{level_id}", load_level(level_id)) for level_id in LEVEL_IDS]
+    sizes = SYNTHETIC_SIZES[:1] if quick else SYNTHETIC_SIZES
+    for width, height in sizes:
+        maps.append((f"synthetic{width}x{height}", Grid.from_rows(synthetic_rows(width, height))))
+    if generated_sizes:
+        from maze_gen import grid_of_size
+        for size in generated_sizes:
+            maps.append((f"generated{size}x{size}", grid_of_size(size, seed=SEED)))
+    return maps
+
+
+def best_ms(fn, repeat=5, number=1):
+    """Best-of-`repeat` wall time of `number` calls to fn(), in ms per call.
+
+    The minimum is the least noisy estimate on a busy machine (same idea as timeit).
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000.0 / number)
+    return min(samples)
+
+
+def bench_map(name, grid, quick=False):
+    results = {}
+
+    def record(metric, value, unit="ms"):
+        results[f"{name}/{metric}"] = {"value": round(value, 6), "unit": unit}
+
+    rng = random.Random(SEED)
+    repeat = 5 if quick else 9
+
+    record("build_graph", best_ms(lambda: build_graph(grid), repeat=repeat))
+    nodes, adj = build_graph(grid)
+    node_list = sorted(nodes)
+    pairs = [(rng.choice(node_list), rng.choice(node_list)) for _ in range(50)]
+    record("dijkstra", best_ms(lambda: [dijkstra(adj, a, b) for a, b in pairs], repeat=repeat) / len(pairs))
+
+    walkable = [(x, y) for y in range(grid.height) for x in range(grid.width) if is_walkable(x, y, grid)]
+    tiles = [rng.choice(walkable) for _ in range(200)]
+    record("nearest_node_from_tile",
+           best_ms(lambda: [nearest_node_from_tile(t, nodes, grid) for t in tiles], repeat=repeat) / len(tiles))
+
+    surface = pygame.Surface((grid.width * TILE_SIZE, grid.height * TILE_SIZE))
+    record("draw_smooth_map", best_ms(lambda: draw_smooth_map(surface, grid), repeat=repeat))
+
+    pacman = Pacman(grid.copy())
+    pacman.dx = 1
+    pacman.draw(surface)  # build the frame cache outside the timing
+
+    def draw_pacman():
+        pacman.mouth_phase += pacman.animation_speed
+        pacman.draw(surface)
+    record("Pacman.draw", best_ms(draw_pacman, repeat=repeat, number=200))
+
+    # Full logic ticks with fixed seeds; lives are unlimited so the run never ends early
+    ticks = 1000 if quick else 3000
+    samples = []
+    for _ in range(repeat):
+        sim = Simulation(grid=grid, initial_lives=10 ** 9, seed=SEED)
+        controller = random_controller(random.Random(SEED))
+        start = time.perf_counter()
+        done = sim.run(ticks, controller)
+        samples.append(done / (time.perf_counter() - start))
+    record("ticks_per_s", max(samples), unit="ticks/s")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """List of (metric, baseline, current, change) that got worse by more than threshold"""
+    regressions = []
+    for metric, current in results.items():
+        old = baseline.get(metric)
+        if old is None or not old["value"]:
+            continue
+        if current["unit"] == "ticks/s":
+            # Higher is better
+            change = old["value"] / current["value"] - 1.0 if current["value"] else float("inf")
+        else:
+            change = current["value"] / old["value"] - 1.0
+        if change > threshold:
+            regressions.append((metric, old["value"], current["value"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pacman benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats, smaller synthetic maps")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--output", default=None, help="results file (default: profiles/bench_<time>.json)")
+    parser.add_argument("--size", type=int, action="append", default=[],
+                        help="also bench a generated NxN maze (maze_gen.py); repeatable")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fractional slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+
+    results = {}
+    for name, grid in bench_maps(args.quick, args.size):
+        print(f"{name} ({grid.width}x{grid.height})")
+        map_results = bench_map(name, grid, args.quick)
+        for metric, r in map_results.items():
+            print(f"  {metric.split('/', 1)[1]:<24}{r['value']:>12.3f} {r['unit']}")
+        results.update(map_results)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "machine": platform.platform(),
+        "quick": args.quick,
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        output = os.path.join(PROFILE_DIR, f"bench_{int(time.time())}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Results written to", output)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print("Baseline saved to", args.baseline)
+        return 0
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print("No baseline yet; run with --save-baseline to store one")
+        return 0
+    if baseline.get("quick") != args.quick:
+        print("Warning: baseline was recorded with a different --quick setting")
+
+    regressions = compare(results, baseline["results"], args.threshold)
+    if not regressions:
+        print(f"No regressions over {args.threshold:.0%} against the baseline")
+        return 0
+    print(f"Regressions over {args.threshold:.0%}:")
+    for metric, old, new, change in regressions:
+        print(f"  {metric}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import pygame
+
+
+class Camera:
+    """The part of the world (in pixels) that fits in the window.
+
+    follow() centres the view on a point, clamped so it never shows past the
+    map edges; on a map smaller than the window the view stays at (0, 0).
+    World rects go through to_screen() before drawing.
+    """
+
+    def __init__(self, view_width, view_height, world_width, world_height):
+        self.view = pygame.Rect(0, 0, view_width, view_height)
+        self.world_width = world_width
+        self.world_height = world_height
+
+    @property
+    def offset(self):
+        """Top-left of the view in world pixels"""
+        return self.view.topleft
+
+    def follow(self, x, y):
+        """Centre on (x, y); returns True if the view moved"""
+        old = self.view.topleft
+        left = int(x) - self.view.width // 2
+        top = int(y) - self.view.height // 2
+        self.view.left = max(0, min(left, self.world_width - self.view.width))
+        self.view.top = max(0, min(top, self.world_height - self.view.height))
+        return self.view.topleft != old
+
+    def to_screen(self, rect):
+        return rect.move(-self.view.left, -self.view.top)
+
+    def to_world(self, rect):
+        return rect.move(self.view.left, self.view.top)
+
+    def sees(self, rect):
+        """True if any part of the world rect is in view"""
+        return self.view.colliderect(rect)
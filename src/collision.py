@@ -0,0 +1,280 @@
+import math
+from collections import defaultdict
+from maze import TILE_SIZE
+from lavel_system import COLLISION_DEATH, contact_distance
+
+COLLISION_PICKUP = "pickup"
+
+
+class CollisionEvent:
+    """One resolved contact: kind is lavel_system.COLLISION_* or COLLISION_PICKUP.
+
+    time is when during the tick the two first touched, from 0.0 (where they
+    started the tick) to 1.0 (where they ended it).
+    """
+
+    __slots__ = ("tick", "kind", "pacman", "other", "time")
+
+    def __init__(self, tick, kind, pacman, other, time=1.0):
+        self.tick = tick
+        self.kind = kind
+        self.pacman = pacman
+        self.other = other
+        self.time = time
+
+    def __repr__(self):
+        return f"CollisionEvent(tick={self.tick}, kind={self.kind!r}, time={self.time:.3f})"
+
+
+def time_of_impact(a0, a1, b0, b1, reach):
+    """Earliest t in [0, 1] at which points moving a0->a1 and b0->b1 come within `reach`.
+
+    Both move in a straight line at constant speed over the tick. Returns
+    None if they stay apart the whole time.
+    """
+    rx = a0[0] - b0[0]
+    ry = a0[1] - b0[1]
+    c = rx * rx + ry * ry - reach * reach
+    if c <= 0:
+        return 0.0
+    # Relative velocity over the tick
+    vx = (a1[0] - a0[0]) - (b1[0] - b0[0])
+    vy = (a1[1] - a0[1]) - (b1[1] - b0[1])
+    b = rx * vx + ry * vy
+    if b >= 0:
+        # Not closing in
+        return None
+    a = vx * vx + vy * vy
+    disc = b * b - a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / a
+    return t if t <= 1.0 else None
+
+
+class SpatialHash:
+    """Items bucketed by square cell; cleared and refilled every tick.
+
+    With a cell at least as large as the contact distance, everything that
+    can touch a point lies in the 3x3 block of cells around it.
+    """
+
+    def __init__(self, cell_size=TILE_SIZE):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+
+    def clear(self):
+        self.cells.clear()
+
+    def insert(self, item, x, y):
+        self.cells[(x // self.cell_size, y // self.cell_size)].append(item)
+
+    def fill(self, entities):
+        """Replace the contents with the indices of `entities`, binned by px/py"""
+        size = self.cell_size
+        cells = self.cells = defaultdict(list)
+        for i, entity in enumerate(entities):
+            # Float keys: 3.0 and 3 hash alike, and skipping int() is cheaper
+            cells[(entity.px // size, entity.py // size)].append(i)
+
+    def remove(self, item, x, y):
+        key = (x // self.cell_size, y // self.cell_size)
+        bucket = self.cells[key]
+        bucket.remove(item)
+        if not bucket:
+            del self.cells[key]
+
+    def near(self, x, y):
+        """Items in the cells around (x, y)"""
+        cx = x // self.cell_size
+        cy = y // self.cell_size
+        cells = self.cells
+        found = []
+        for ky in (cy - 1, cy, cy + 1):
+            for kx in (cx - 1, cx, cx + 1):
+                # .get(), so a lookup doesn't add empty buckets
+                bucket = cells.get((kx, ky))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+
+class CollisionSystem:
+    """Per-tick contacts between Pacman and every ghost or pickup.
+
+    Contacts are swept: each entity is taken to move in a straight line from
+    where it was at the end of the last update() to where it is now, and a
+    pair touches if the two paths come within contact distance at any point
+    of the tick. A fast ghost (return_speed, or a scaled-up step) can't pass
+    through Pacman between two checks. Moves longer than max_sweep are
+    teleports (tunnel wraps, respawns) and only count where they land.
+
+    Ghosts are re-binned into a SpatialHash every tick and only the ones
+    around Pacman are tested, so the cost stays linear in the ghost count.
+    Contacts are resolved through LevelSystem.resolve_contact() in order of
+    time of impact (ghost order on ties). After a death Pacman is back at the
+    start, so the remaining ghosts are checked against that.
+
+    Pickups (fruit and the like: anything with px/py/radius) don't move, so
+    they are binned once when added and a tick only looks at Pacman's cells.
+    """
+
+    def __init__(self, level, pacman, ghosts, max_step=None):
+        self.level = level
+        self.pacman = pacman
+        self.ghosts = ghosts
+        if max_step is None:
+            # Fastest anything moves in one tick
+            speeds = [pacman.speed] + [max(g.speed, getattr(g, 'return_speed', 0)) for g in ghosts]
+            max_step = max(speeds)
+        # Snapping to a tile centre can add up to a tile on top of a step
+        self.max_sweep = max_step + TILE_SIZE
+        reach = max([contact_distance(pacman, g) for g in ghosts] + [TILE_SIZE])
+        # Anything whose path can touch Pacman's ends within this of Pacman
+        self.hash = SpatialHash(math.ceil(reach + 2 * self.max_sweep))
+        # id(entity) -> (entity, on_collect(pacman, entity)); dropped once collected
+        self.pickups = {}
+        self.pickup_hash = SpatialHash(self.hash.cell_size)
+        # Contacts resolved by the last update()
+        self.events = []
+        self._remember_positions()
+
+    def _remember_positions(self):
+        self._pacman_from = (self.pacman.px, self.pacman.py)
+        self._ghosts_from = [(g.px, g.py) for g in self.ghosts]
+
+    def _path_start(self, start, end):
+        # Where a move started, or its end if it was a teleport
+        if abs(end[0] - start[0]) > self.max_sweep or abs(end[1] - start[1]) > self.max_sweep:
+            return end
+        return start
+
+    def add_pickup(self, entity, on_collect):
+        if contact_distance(self.pacman, entity) > self.pickup_hash.cell_size:
+            raise ValueError("pickup is larger than a collision cell")
+        self.pickups[id(entity)] = (entity, on_collect)
+        self.pickup_hash.insert(id(entity), entity.px, entity.py)
+
+    def _ghost_hits(self, pacman_from, pacman_to, candidates):
+        # [(time of impact, ghost index)] for the candidates whose path meets Pacman's
+        hits = []
+        for i in candidates:
+            ghost = self.ghosts[i]
+            ghost_to = (ghost.px, ghost.py)
+            ghost_from = self._path_start(self._ghosts_from[i], ghost_to)
+            t = time_of_impact(pacman_from, pacman_to, ghost_from, ghost_to,
+                               contact_distance(self.pacman, ghost))
+            if t is not None:
+                hits.append((t, i))
+        hits.sort()
+        return hits
+
+    def _check_ghosts(self, tick, events):
+        pacman = self.pacman
+        spatial = self.hash
+        spatial.fill(self.ghosts)
+        pacman_to = (pacman.px, pacman.py)
+        pacman_from = self._path_start(self._pacman_from, pacman_to)
+        candidates = spatial.near(pacman.px, pacman.py)
+        resolved = set()
+        while True:
+            for t, i in self._ghost_hits(pacman_from, pacman_to, candidates):
+                ghost = self.ghosts[i]
+                resolved.add(i)
+                outcome = self.level.resolve_contact(pacman, ghost)
+                if outcome is None:
+                    continue
+                events.append(CollisionEvent(tick, outcome, pacman, ghost, t))
+                if outcome == COLLISION_DEATH:
+                    # Pacman is back at the start: look again around there
+                    pacman_to = pacman_from = (pacman.px, pacman.py)
+                    candidates = [j for j in spatial.near(pacman.px, pacman.py) if j not in resolved]
+                    break
+            else:
+                return
+
+    def _check_pickups(self, tick, events):
+        pacman = self.pacman
+        pacman_to = (pacman.px, pacman.py)
+        pacman_from = self._path_start(self._pacman_from, pacman_to)
+        for key in self.pickup_hash.near(pacman.px, pacman.py):
+            entity, on_collect = self.pickups[key]
+            at = (entity.px, entity.py)
+            t = time_of_impact(pacman_from, pacman_to, at, at, contact_distance(pacman, entity))
+            if t is not None:
+                del self.pickups[key]
+                self.pickup_hash.remove(key, entity.px, entity.py)
+                on_collect(pacman, entity)
+                events.append(CollisionEvent(tick, COLLISION_PICKUP, pacman, entity, t))
+
+    def update(self, tick=0):
+        """Resolve this tick's contacts; returns (and keeps in .events) the events"""
+        events = []
+        if self.pickups:
+            self._check_pickups(tick, events)
+        self._check_ghosts(tick, events)
+        self._remember_positions()
+        self.events = events
+        return events
+
+
+if __name__ == "__main__":
+    # Stress: contact checks with hundreds of entities, pair loop vs spatial hash
+    import random
+    import time
+    from lavel_system import LevelSystem
+
+    class Dummy:
+        def __init__(self, px, py):
+            self.px, self.py = px, py
+            self.radius = TILE_SIZE // 2 - 2
+            self.speed = 2
+
+        def reset_position(self):
+            pass
+
+        reset_to_spawn = reset_position
+
+    def spread(count):
+        return [Dummy(rng.uniform(0, 1800), rng.uniform(0, 1800)) for _ in range(count)]
+
+    def collect(pacman, entity):
+        pass
+
+    rng = random.Random(0)
+    pacman = Dummy(300.0, 300.0)
+    ticks = 200
+    print("per tick, N ghosts plus N pickups scattered over a 60x60-tile area")
+    for count in (10, 100, 300, 1000):
+        ghosts = spread(count)
+        pickups = spread(count)
+        level = LevelSystem(initial_lives=10 ** 9)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            for ghost in ghosts:
+                level.check_collision_and_reset(pacman, ghost)
+            for pickup in pickups:
+                dx = pacman.px - pickup.px
+                dy = pacman.py - pickup.py
+                reach = contact_distance(pacman, pickup)
+                if dx * dx + dy * dy <= reach * reach:
+                    collect(pacman, pickup)
+        pairwise = (time.perf_counter() - start) / ticks
+        system = CollisionSystem(LevelSystem(initial_lives=10 ** 9), pacman, ghosts)
+        for pickup in pickups:
+            system.add_pickup(pickup, collect)
+        start = time.perf_counter()
+        for tick in range(ticks):
+            system.update(tick)
+        hashed = (time.perf_counter() - start) / ticks
+        print(f"{count:>5}: pair loop {pairwise * 1e6:8.1f} us, spatial hash {hashed * 1e6:8.1f} us")
+
+    # A ghost fast enough to jump over Pacman in one tick
+    pacman = Dummy(300.0, 300.0)
+    ghost = Dummy(300.0 - 45, 300.0)
+    ghost.speed = 90
+    system = CollisionSystem(LevelSystem(), pacman, [ghost])
+    ghost.px += ghost.speed
+    ended_apart = abs(ghost.px - pacman.px) > contact_distance(pacman, ghost)
+    print(f"fast ghost: end-of-tick check {'misses it' if ended_apart else 'hits'}, "
+          f"swept check gives {system.update()}")
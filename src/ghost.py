@@ -1,37 +1,31 @@
 import pygame
 import random
-import math
-import heapq
-import os
-from maze import MAP_DATA, MAP_WIDTH, MAP_HEIGHT, TILE_SIZE, screen
+from maze import GRID, TILE_SIZE
+from assets import SCATTER_SPRITE, get_sprite
+from grid import GHOST_SPAWN
+from planner import SearchTree
+from topology import DIRECTIONS, get_topology
+from profiler import PROFILER
 
-WALL = 1
-WALKABLE = {0, 2, 3, 5, 6, 7, 8, 9}
+# The functions below work on any level grid; grid=None means maze.GRID.
+# Walls never change, so copies of a level share the same walkability.
 
 
-def is_walkable(x: int, y: int) -> bool:
-    return 0 <= x < MAP_WIDTH and 0 <= y < MAP_HEIGHT and MAP_DATA[y][x] != WALL
+def is_walkable(x: int, y: int, grid=None) -> bool:
+    if grid is None:
+        grid = GRID
+    return 0 <= x < grid.width and 0 <= y < grid.height and grid.walkable[y * grid.width + x] == 1
 
 
-def neighbors_with_tunnel(x: int, y: int):
-    # Standard neighbors
-    dirs = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-    for dx, dy in dirs:
-        nx, ny = x + dx, y + dy
-        # Tunnel wrap on row 9 across left/right edges
-        if y == 9 and ny == 9 and (nx < 0 or nx >= MAP_WIDTH):
-            if nx < 0:
-                nx = MAP_WIDTH - 1
-            elif nx >= MAP_WIDTH:
-                nx = 0
-        if is_walkable(nx, ny):
-            yield nx, ny
+def neighbors_with_tunnel(x: int, y: int, grid=None):
+    """Walkable neighbours of (x, y), tunnels included (precomputed per level, see topology.py)"""
+    return get_topology(grid if grid is not None else GRID).neighbors(x, y)
 
 
-def is_corner_or_junction(x: int, y: int) -> bool:
-    if not is_walkable(x, y):
+def is_corner_or_junction(x: int, y: int, grid=None) -> bool:
+    if not is_walkable(x, y, grid):
         return False
-    nbs = list(neighbors_with_tunnel(x, y))
+    nbs = neighbors_with_tunnel(x, y, grid)
     n = len(nbs)
     if n != 2:
         return n > 0  # dead-end (1) or junction (>=3) are nodes
@@ -42,42 +36,40 @@ def is_corner_or_junction(x: int, y: int) -> bool:
     return not straight  # corner if not straight
 
 
-def build_graph():
+def _raycast(topology, nodes, x, y, dx, dy):
+    # Walk from (x, y) in one direction (through tunnels) to the next node: (x, y, distance) or None
+    dist = 0
+    while True:
+        nxt = topology.step(x, y, dx, dy)
+        if nxt is None:
+            return None
+        dist += 1
+        x, y = nxt
+        if nxt in nodes:
+            return x, y, dist
+
+
+def build_graph(grid=None):
+    if grid is None:
+        grid = GRID
+    topology = get_topology(grid)
     nodes = set()
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            if is_corner_or_junction(x, y):
+    for y in range(grid.height):
+        for x in range(grid.width):
+            if is_corner_or_junction(x, y, grid):
                 nodes.add((x, y))
     # Ensure tunnel endpoints are nodes (helps with wrapping)
-    if is_walkable(0, 9):
-        nodes.add((0, 9))
-    if is_walkable(MAP_WIDTH - 1, 9):
-        nodes.add((MAP_WIDTH - 1, 9))
+    for y in topology.tunnel_rows:
+        nodes.update(((0, y), (grid.width - 1, y)))
+    for x in topology.tunnel_cols:
+        nodes.update(((x, 0), (x, grid.height - 1)))
 
     # Build adjacency by ray-casting from each node in 4 directions until next node
     adj = {n: [] for n in nodes}
 
-    def raycast_from(x, y, dx, dy):
-        cx, cy = x, y
-        dist = 0
-        while True:
-            nx, ny = cx + dx, cy + dy
-            # Tunnel wrap on row 9 across edges
-            if ny == 9 and (nx < 0 or nx >= MAP_WIDTH):
-                if nx < 0:
-                    nx = MAP_WIDTH - 1
-                elif nx >= MAP_WIDTH:
-                    nx = 0
-            if not is_walkable(nx, ny):
-                return None
-            dist += 1
-            cx, cy = nx, ny
-            if (cx, cy) in nodes:
-                return (cx, cy, dist)
-
     for (x, y) in nodes:
-        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-            hit = raycast_from(x, y, dx, dy)
+        for dx, dy in DIRECTIONS:
+            hit = _raycast(topology, nodes, x, y, dx, dy)
             if hit is not None:
                 nx, ny, w = hit
                 # Store undirected edge (we'll add both directions)
@@ -85,71 +77,110 @@ def build_graph():
                     adj[(x, y)].append(((nx, ny), w))
 
     # Make edges symmetric (some directions may not be found from the other node if blocked)
+    linked = {u: {n for n, _ in vs} for u, vs in adj.items()}
     for u in list(adj.keys()):
         for v, w in adj[u]:
-            if u not in [n for n, _ in adj.get(v, [])]:
+            if u not in linked.setdefault(v, set()):
                 adj.setdefault(v, []).append((u, w))
+                linked[v].add(u)
 
     return nodes, adj
 
 
-def nearest_node_from_tile(tile, nodes):
-    """Return the nearest graph node by BFS expanding along walkable tiles."""
-    tx, ty = tile
-    if (tx, ty) in nodes:
-        return (tx, ty)
-    # BFS until we hit a node
-    from collections import deque
-    dq = deque()
-    dq.append((tx, ty))
-    seen = { (tx, ty) }
-    while dq:
-        x, y = dq.popleft()
-        for nx, ny in neighbors_with_tunnel(x, y):
-            if (nx, ny) in seen:
-                continue
+def build_return_graph(nodes, adj, spawn_tile, grid=None):
+    """Copy the base graph and insert spawn_tile as an explicit node with edges."""
+    if grid is None:
+        grid = GRID
+    topology = get_topology(grid)
+    nodes = set(nodes)
+    adj = {u: list(vs) for u, vs in adj.items()}
+    nodes.add(spawn_tile)
+
+    adj.setdefault(spawn_tile, [])
+    for dx, dy in DIRECTIONS:
+        hit = _raycast(topology, nodes, spawn_tile[0], spawn_tile[1], dx, dy)
+        if hit is not None:
+            nx, ny, w = hit
             if (nx, ny) in nodes:
-                return (nx, ny)
-            seen.add((nx, ny))
-            dq.append((nx, ny))
-    # Fallback: pick any node (should not happen on valid maps)
-    return next(iter(nodes))
+                adj[spawn_tile].append(((nx, ny), w))
+                adj.setdefault((nx, ny), []).append((spawn_tile, w))
+
+    return nodes, adj
+
+
+def nearest_node_from_tile(tile, nodes, grid=None):
+    """Return the nearest graph node by BFS expanding along walkable tiles."""
+    if PROFILER.enabled:
+        PROFILER.count("nearest_node_from_tile")
+    if tile in nodes:
+        return tile
+    neighbors = get_topology(grid if grid is not None else GRID).neighbors
+    found = SearchTree(tile, lambda t: neighbors(*t), weighted=False).nearest(nodes)
+    if found is None:
+        # Fallback: pick any node (should not happen on valid maps)
+        return next(iter(nodes))
+    return found
 
 
 def dijkstra(adj, start, goal):
     """Return list of nodes from start to goal inclusive."""
-    if start == goal:
-        return [start]
-    dist = {start: 0}
-    prev = {}
-    pq = [(0, start)]
-    while pq:
-        d, u = heapq.heappop(pq)
-        if u == goal:
-            break
-        if d != dist.get(u, math.inf):
-            continue
-        for v, w in adj.get(u, []):
-            nd = d + w
-            if nd < dist.get(v, math.inf):
-                dist[v] = nd
-                prev[v] = u
-                heapq.heappush(pq, (nd, v))
-    if goal not in prev and goal != start:
-        return [start]
-    # Reconstruct
-    path = [goal]
-    cur = goal
-    while cur != start:
-        cur = prev[cur]
-        path.append(cur)
-    path.reverse()
-    return path
+    if PROFILER.enabled:
+        PROFILER.count("dijkstra")
+    # One-off search; ghosts go through a Planner that keeps its trees
+    return SearchTree(start, lambda u: adj.get(u, ())).path_to(goal)
+
+
+def direction_between(tile, next_tile, grid=None):
+    """Return the (dx, dy) step that moves from `tile` toward `next_tile`."""
+    if grid is None:
+        grid = GRID
+    width, height = grid.width, grid.height
+    x, y = tile
+    nx, ny = next_tile
+    # Edge should be straight (same row or same column), except tunnel wrap
+    if y == ny:
+        # Horizontal move; decide direction considering wrap
+        if x == 0 and nx == width - 1:
+            return -1, 0
+        elif x == width - 1 and nx == 0:
+            return 1, 0
+        else:
+            return (1 if nx > x else -1), 0
+    elif x == nx:
+        # Vertical move; same for a column tunnel
+        if y == 0 and ny == height - 1:
+            return 0, -1
+        elif y == height - 1 and ny == 0:
+            return 0, 1
+        return 0, (1 if ny > y else -1)
+    else:
+        # Unexpected; fallback to greedy step
+        return (1 if nx > x else (-1 if nx < x else 0)), (1 if ny > y else (-1 if ny < y else 0))
 
 
 class Ghost:
-    def __init__(self, color=(255, 0, 0), pacman=None, speed=2):
+    def __init__(self, color=(255, 0, 0), pacman=None, speed=2, clock=None, nav_table=None,
+                 graph=None, sprite="Ghost-red.png", grid=None, rng=None):
         self.color = color
+        # Level this ghost walks on (only its walls are used)
+        self.grid = grid if grid is not None else GRID
+        self.sprite = sprite
+        # Optional navigation.NavTable: O(1) chase decisions instead of dijkstra()
+        self.nav_table = nav_table
+        # Optional shared distance field toward Pacman (set by GhostManager)
+        self.flow_field = None
+        # Optional plan_workers.PlanWorkers: path searches run off the frame (set by GhostManager)
+        self.plan_workers = None
+        # (node, returning, future): the search for the node the ghost is heading to
+        self._next_plan = None
+        # Tie-break order when several directions are equally good
+        self.direction_order = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        # Millisecond time source for scatter timing; the headless simulation
+        # passes its own tick-based clock instead of the pygame one
+        self.clock = clock if clock is not None else pygame.time.get_ticks
+        # Random source for spawn choice and scatter length; pass a seeded
+        # random.Random for reproducible runs
+        self.rng = rng if rng is not None else random
         self.pacman = pacman
         self.speed = speed
         self.normal_speed = speed
@@ -160,43 +191,35 @@ class Ghost:
         self.scatter_active = False
         self.returning_to_base = False
         self._scatter_until_ms = None
+        # Clock time (ms) at which the ghost may leave the spawn; GhostManager staggers these
+        self.release_ms = 0
 
-        # Build graph once
-        self.nodes, self.adj = build_graph()
-
-        # Load red ghost sprite if available
-        try:
-            sprite_path = os.path.normpath(
-                os.path.join(os.path.dirname(__file__), "..", "assets", "sprites", "Ghost-red.png")
-            )
-            img = pygame.image.load(sprite_path).convert_alpha()
-            # Scale to a tile size with a tiny padding so it fits corridors
-            size = max(1, TILE_SIZE - 2)
-            self.image = pygame.transform.smoothscale(img, (size, size))
-            scatter_path = os.path.normpath(
-                os.path.join(os.path.dirname(__file__), "..", "assets", "sprites", "scater_mode.png")
-            )
-            s_img = pygame.image.load(scatter_path).convert_alpha()
-            self.scatter_image = pygame.transform.smoothscale(s_img, (size, size))
-        except Exception as e:
-            # Fallback: keep drawing a circle if sprite fails to load
-            print("Failed to load ghost sprite:", e)
+        # One navigation graph per maze, shared by every ghost
+        if graph is None:
+            from navigation import get_nav_graph
+            graph = get_nav_graph(self.grid)
+        self.graph = graph
+        self.nodes, self.adj = graph.nodes, graph.adj
+        self.topology = get_topology(self.grid)
+
+        # Sprites are fetched from the atlas on first draw (convert_alpha needs a display)
+        self._sprites_loaded = False
 
         # Choose a spawn among 5
-        spawn_tiles = []
-        for y in range(MAP_HEIGHT):
-            for x in range(MAP_WIDTH):
-                if MAP_DATA[y][x] in {5}:
-                    spawn_tiles.append((x, y))
+        spawn_tiles = self.grid.find_all(GHOST_SPAWN)
         if not spawn_tiles:
             # Fallback: center of map
-            spawn = (MAP_WIDTH // 2, MAP_HEIGHT // 2)
+            spawn = (self.grid.width // 2, self.grid.height // 2)
         else:
-            spawn = random.choice(spawn_tiles)
+            spawn = self.rng.choice(spawn_tiles)
         self.spawn_tile = spawn
 
         # Build a return graph that includes the spawn tile as a node
-        self.nodes_return, self.adj_return = self._build_return_graph()
+        self.nodes_return, self.adj_return = graph.return_graph(self.spawn_tile)
+        # Searches are kept between replans and shared with the other ghosts (planner.py)
+        self.planner = graph.planner
+        self.return_planner = graph.return_planner(self.spawn_tile)
+        self.tile_planner = graph.tile_planner
 
         self.px = spawn[0] * TILE_SIZE + TILE_SIZE // 2
         self.py = spawn[1] * TILE_SIZE + TILE_SIZE // 2
@@ -212,12 +235,18 @@ class Ghost:
         # If spawn tile is not a node, plan an initial step toward nearest node
         self._plan_move_from_non_node()
 
+    def load_sprites(self):
+        self._sprites_loaded = True
+        # Shared, pre-scaled surfaces from the sprite atlas; None keeps the circle fallback
+        self.image = get_sprite(self.sprite)
+        self.scatter_image = get_sprite(SCATTER_SPRITE)
+
     def enter_scatter_mode(self):
         # Activate scatter for 5–8 seconds
         self.scatter_active = True
         self.returning_to_base = False
-        now = pygame.time.get_ticks()
-        duration_ms = random.randint(5000, 8000)
+        now = self.clock()
+        duration_ms = self.rng.randint(5000, 8000)
         self._scatter_until_ms = now + duration_ms
 
     def take_down_and_return_to_base(self):
@@ -239,6 +268,7 @@ class Ghost:
         # Restore normal chase speed and visuals
         self.speed = self.normal_speed
         self.scatter_active = False
+        self._drop_next_plan()
         self._plan_move_from_non_node()
         self.last_safe_tile = self.spawn_tile
 
@@ -257,36 +287,10 @@ class Ghost:
         self.py = ty * TILE_SIZE + TILE_SIZE // 2
 
     def _next_tile_to_nearest_node(self, start_tile):
-        # BFS over walkable tiles to find nearest graph node and return next step from start
-        from collections import deque
-        sx, sy = start_tile
-        if (sx, sy) in self.nodes:
-            return None
-        dq = deque()
-        dq.append((sx, sy))
-        parent = { (sx, sy): None }
-        seen = { (sx, sy) }
-        while dq:
-            x, y = dq.popleft()
-            for nx, ny in neighbors_with_tunnel(x, y):
-                if (nx, ny) in seen:
-                    continue
-                parent[(nx, ny)] = (x, y)
-                if (nx, ny) in self.nodes:
-                    # reconstruct path from start to this node
-                    path = [(nx, ny)]
-                    cur = (nx, ny)
-                    while parent[cur] is not None:
-                        cur = parent[cur]
-                        path.append(cur)
-                    path.reverse()
-                    if len(path) >= 2:
-                        return path[1]  # first step from start
-                    else:
-                        return None
-                seen.add((nx, ny))
-                dq.append((nx, ny))
-        return None
+        # First step of a BFS over walkable tiles to the nearest graph node
+        if PROFILER.enabled:
+            PROFILER.count("_next_tile_to_nearest_node")
+        return self.tile_planner.step_to_nearest(start_tile, self.nodes)
 
     def _plan_move_from_non_node(self):
         tx, ty = self.current_tile()
@@ -297,101 +301,28 @@ class Ghost:
 
     def _next_tile_towards(self, start_tile, target_tile):
         """BFS over walkable tiles; return immediate next step toward target."""
-        sx, sy = start_tile
-        tx, ty = target_tile
-        if (sx, sy) == (tx, ty):
-            return None
-        from collections import deque
-        dq = deque()
-        dq.append((sx, sy))
-        parent = { (sx, sy): None }
-        seen = { (sx, sy) }
-        while dq:
-            x, y = dq.popleft()
-            for nx, ny in neighbors_with_tunnel(x, y):
-                if (nx, ny) in seen:
-                    continue
-                parent[(nx, ny)] = (x, y)
-                if (nx, ny) == (tx, ty):
-                    # reconstruct path and return first step
-                    path = [(nx, ny)]
-                    cur = (nx, ny)
-                    while parent[cur] is not None:
-                        cur = parent[cur]
-                        path.append(cur)
-                    path.reverse()
-                    if len(path) >= 2:
-                        return path[1]
-                    return None
-                seen.add((nx, ny))
-                dq.append((nx, ny))
-        return None
-
-    def _build_return_graph(self):
-        # Copy base nodes/adj and insert spawn tile as an explicit node with edges
-        nodes = set(self.nodes)
-        adj = {u: list(vs) for u, vs in self.adj.items()}
-        nodes.add(self.spawn_tile)
-
-        def raycast_from(x, y, dx, dy):
-            cx, cy = x, y
-            dist = 0
-            while True:
-                nx, ny = cx + dx, cy + dy
-                if ny == 9 and (nx < 0 or nx >= MAP_WIDTH):
-                    if nx < 0:
-                        nx = MAP_WIDTH - 1
-                    elif nx >= MAP_WIDTH:
-                        nx = 0
-                if not is_walkable(nx, ny):
-                    return None
-                dist += 1
-                cx, cy = nx, ny
-                if (cx, cy) in nodes:
-                    return (cx, cy, dist)
-
-        adj.setdefault(self.spawn_tile, [])
-        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-            hit = raycast_from(self.spawn_tile[0], self.spawn_tile[1], dx, dy)
-            if hit is not None:
-                nx, ny, w = hit
-                if (nx, ny) in nodes:
-                    adj[self.spawn_tile].append(((nx, ny), w))
-                    adj.setdefault((nx, ny), []).append((self.spawn_tile, w))
-
-        return nodes, adj
+        if PROFILER.enabled:
+            PROFILER.count("_next_tile_towards")
+        return self.tile_planner.first_step(start_tile, target_tile)
 
     def handle_tunnel(self):
         tx, ty = self.current_tile()
-        if ty != 9:
-            return
-        pixel_in_tile = self.px % TILE_SIZE
-        if tx == 0 and self.dx < 0:
-            if pixel_in_tile < TILE_SIZE // 2:
-                self.px = (MAP_WIDTH - 1) * TILE_SIZE + TILE_SIZE // 2
-        elif tx == MAP_WIDTH - 1 and self.dx > 0:
-            if pixel_in_tile > TILE_SIZE // 2:
+        # Past the centre of an edge tile (or already off the map after a big step)
+        if ty in self.topology.tunnel_rows:
+            width = self.grid.width
+            if self.px < TILE_SIZE // 2 and self.dx < 0:
+                self.px = (width - 1) * TILE_SIZE + TILE_SIZE // 2
+            elif self.px > (width - 1) * TILE_SIZE + TILE_SIZE // 2 and self.dx > 0:
                 self.px = TILE_SIZE // 2
+        if tx in self.topology.tunnel_cols:
+            height = self.grid.height
+            if self.py < TILE_SIZE // 2 and self.dy < 0:
+                self.py = (height - 1) * TILE_SIZE + TILE_SIZE // 2
+            elif self.py > (height - 1) * TILE_SIZE + TILE_SIZE // 2 and self.dy > 0:
+                self.py = TILE_SIZE // 2
 
     def choose_next_direction_to(self, next_node):
-        x, y = self.current_tile()
-        nx, ny = next_node
-        # Edge should be straight (same row or same column), except tunnel wrap
-        if y == ny:
-            # Horizontal move; decide direction considering wrap
-            if x == 0 and nx == MAP_WIDTH - 1:
-                self.dx, self.dy = -1, 0
-            elif x == MAP_WIDTH - 1 and nx == 0:
-                self.dx, self.dy = 1, 0
-            else:
-                self.dx = 1 if nx > x else -1
-                self.dy = 0
-        elif x == nx:
-            self.dx, self.dy = 0, (1 if ny > y else -1)
-        else:
-            # Unexpected; fallback to greedy step
-            self.dx = 1 if nx > x else (-1 if nx < x else 0)
-            self.dy = 1 if ny > y else (-1 if ny < y else 0)
+        self.dx, self.dy = direction_between(self.current_tile(), next_node, self.grid)
 
     def recompute_path_if_needed(self):
         # Only recompute when at node (turn or junction), per requirement
@@ -400,18 +331,41 @@ class Ghost:
             return
         # Determine target based on mode
         if self.returning_to_base:
-            target_node = self.spawn_tile
+            target_tile = self.spawn_tile
         else:
+            if self.flow_field is not None:
+                direction = self.flow_field.direction_from((tx, ty), self.direction_order)
+                if direction is not None:
+                    self._follow_direction(direction)
+                    return
             if self.pacman is not None:
-                p_tile = (int(self.pacman.px // TILE_SIZE), int(self.pacman.py // TILE_SIZE))
+                target_tile = (int(self.pacman.px // TILE_SIZE), int(self.pacman.py // TILE_SIZE))
             else:
-                p_tile = (MAP_WIDTH // 2, MAP_HEIGHT // 2)
-            target_node = nearest_node_from_tile(p_tile, self.nodes)
+                target_tile = (self.grid.width // 2, self.grid.height // 2)
+            if self.nav_table is not None:
+                direction = self.nav_table.lookup((tx, ty), target_tile)
+                if direction is not None:
+                    self._follow_direction(direction)
+                    return
         start_node = (tx, ty)
-        if self.returning_to_base:
-            path = dijkstra(self.adj_return, start_node, target_node)
-        else:
-            path = dijkstra(self.adj, start_node, target_node)
+        if self.plan_workers is not None:
+            self._follow_path(self._take_next_plan(start_node, target_tile))
+            self._ask_next_plan(target_tile)
+            return
+        if PROFILER.enabled:
+            PROFILER.count("dijkstra")
+        self._follow_path(self.plan_path(start_node, target_tile, self.returning_to_base))
+
+    def plan_path(self, start_node, target_tile, returning):
+        """Node path from start_node toward target_tile (safe to call from a worker thread)"""
+        if returning:
+            return self.return_planner.path(start_node, target_tile)
+        target_node = self.tile_planner.nearest(target_tile, self.nodes)
+        if target_node is None:
+            target_node = next(iter(self.nodes))
+        return self.planner.path(start_node, target_node)
+
+    def _follow_path(self, path):
         self.path_nodes = path
         # Set the immediate next node as the target (skip start)
         if len(path) >= 2:
@@ -421,65 +375,144 @@ class Ghost:
             self.current_target_node = None
             self.dx, self.dy = 0, 0
 
-    def update(self):
-        # Mouth/animation not needed for ghost; update path decisions at nodes
-        if self.at_tile_center():
-            self.snap_to_center()
-            tx, ty = self.current_tile()
-            # Update last safe tile if walkable
-            if is_walkable(tx, ty):
-                self.last_safe_tile = (tx, ty)
-            # Arrived at current target node?
-            if self.current_target_node is not None and (tx, ty) == self.current_target_node:
-                # Reached this node; plan toward next or recompute toward Pacman again
+    def _ask_next_plan(self, target_tile):
+        # Search from the node we're heading for while we walk there (from
+        # here again if we're staying put), toward where the target is now
+        node = self.current_target_node
+        if node is None:
+            node = self.current_tile()
+        if PROFILER.enabled:
+            PROFILER.count("dijkstra")
+        future = self.plan_workers.submit(self.plan_path, node, target_tile, self.returning_to_base)
+        self._next_plan = (node, self.returning_to_base, future)
+
+    def _take_next_plan(self, start_node, target_tile):
+        """The path searched for start_node on the way here (waiting if it isn't done), or one searched now"""
+        plan = self._next_plan
+        self._next_plan = None
+        if plan is not None and plan[:2] == (start_node, self.returning_to_base):
+            return self.plan_workers.result(plan[2])
+        # Nothing asked for this node in this mode (first node, reset, mode change)
+        if plan is not None:
+            self.plan_workers.drop(plan[2])
+        if PROFILER.enabled:
+            PROFILER.count("dijkstra")
+        return self.plan_path(start_node, target_tile, self.returning_to_base)
+
+    def _drop_next_plan(self):
+        if self._next_plan is not None:
+            self.plan_workers.drop(self._next_plan[2])
+            self._next_plan = None
+
+    def _follow_direction(self, direction):
+        # Table/field lookups only give the next direction; we replan at the
+        # next node anyway, so no path is materialized
+        self.dx, self.dy = direction
+        self.current_target_node = None
+        self.path_nodes = []
+
+    def _decide_at_center(self):
+        # Snap to the centre and pick the next direction (turns happen only here)
+        self.snap_to_center()
+        tx, ty = self.current_tile()
+        # Update last safe tile if walkable
+        if is_walkable(tx, ty, self.grid):
+            self.last_safe_tile = (tx, ty)
+        # Arrived at current target node?
+        if self.current_target_node is not None and (tx, ty) == self.current_target_node:
+            # Reached this node; plan toward next or recompute toward Pacman again
+            self.recompute_path_if_needed()
+        else:
+            # At center; if current tile is a node, recompute toward Pacman
+            if (tx, ty) in self.nodes:
                 self.recompute_path_if_needed()
             else:
-                # At center; if current tile is a node, recompute toward Pacman
-                if (tx, ty) in self.nodes:
-                    self.recompute_path_if_needed()
-                else:
-                    # Ensure we have a direction to reach a node if stuck
-                    if self.dx == 0 and self.dy == 0:
-                        next_step = self._next_tile_to_nearest_node((tx, ty))
-                        if next_step is not None:
-                            self.choose_next_direction_to(next_step)
-
-        # Move along current direction if walkable; else stop
-        next_px = self.px + self.dx * self.speed
-        next_py = self.py + self.dy * self.speed
+                # Ensure we have a direction to reach a node if stuck
+                if self.dx == 0 and self.dy == 0:
+                    next_step = self._next_tile_to_nearest_node((tx, ty))
+                    if next_step is not None:
+                        self.choose_next_direction_to(next_step)
+
+    def _distance_to_next_center(self):
+        """Pixels to the next tile centre ahead (None when not moving)"""
+        center = TILE_SIZE // 2
+        if self.dx:
+            offset = self.px % TILE_SIZE
+            ahead = (center - offset) % TILE_SIZE if self.dx > 0 else (offset - center) % TILE_SIZE
+        elif self.dy:
+            offset = self.py % TILE_SIZE
+            ahead = (center - offset) % TILE_SIZE if self.dy > 0 else (offset - center) % TILE_SIZE
+        else:
+            return None
+        return ahead or TILE_SIZE
+
+    def _move(self, distance):
+        """Move `distance` pixels; False if a wall stopped the ghost"""
+        next_px = self.px + self.dx * distance
+        next_py = self.py + self.dy * distance
         # Predict next tile
         next_tx = int(next_px // TILE_SIZE)
         next_ty = int(next_py // TILE_SIZE)
         # Allow movement inside the same tile even if the next tile is wall; only block when crossing boundary
         cur_tx, cur_ty = self.current_tile()
         crossing_tile_boundary = (next_tx != cur_tx) or (next_ty != cur_ty)
-        if not crossing_tile_boundary or is_walkable(next_tx, next_ty):
+        # Leaving the map through a tunnel is fine; handle_tunnel() wraps it
+        topology = self.topology
+        off_map_in_tunnel = (
+            (next_ty in topology.tunnel_rows and not 0 <= next_tx < self.grid.width)
+            or (next_tx in topology.tunnel_cols and not 0 <= next_ty < self.grid.height)
+        )
+        if not crossing_tile_boundary or off_map_in_tunnel or is_walkable(next_tx, next_ty, self.grid):
             self.px = next_px
             self.py = next_py
+            return True
+        # Blocked by wall when attempting to leave current tile
+        # Snap to center of current tile and choose a new direction
+        self.px = cur_tx * TILE_SIZE + TILE_SIZE // 2
+        self.py = cur_ty * TILE_SIZE + TILE_SIZE // 2
+        self.dx = 0
+        self.dy = 0
+        if self.returning_to_base:
+            ns = self._next_tile_towards((cur_tx, cur_ty), self.spawn_tile)
+            if ns is not None:
+                self.choose_next_direction_to(ns)
         else:
-            # Blocked by wall when attempting to leave current tile
-            # Snap to center of current tile and choose a new direction
-            self.px = cur_tx * TILE_SIZE + TILE_SIZE // 2
-            self.py = cur_ty * TILE_SIZE + TILE_SIZE // 2
-            self.dx = 0
-            self.dy = 0
-            if self.returning_to_base:
-                ns = self._next_tile_towards((cur_tx, cur_ty), self.spawn_tile)
+            if (cur_tx, cur_ty) in self.nodes:
+                self.recompute_path_if_needed()
+            else:
+                ns = self._next_tile_to_nearest_node((cur_tx, cur_ty))
                 if ns is not None:
                     self.choose_next_direction_to(ns)
-            else:
-                if (cur_tx, cur_ty) in self.nodes:
-                    self.recompute_path_if_needed()
-                else:
-                    ns = self._next_tile_to_nearest_node((cur_tx, cur_ty))
-                    if ns is not None:
-                        self.choose_next_direction_to(ns)
+        return False
+
+    def update(self):
+        # Mouth/animation not needed for ghost; update path decisions at nodes
+        if self.at_tile_center():
+            self._decide_at_center()
+
+        # Move along current direction if walkable; else stop. A move that
+        # would run past a tile centre stops there to turn and then carries
+        # on, so a fast ghost (return_speed, or a scaled-up step) never skips
+        # a junction and overshoots into a wall.
+        remaining = self.speed
+        while True:
+            ahead = self._distance_to_next_center()
+            if ahead is None or ahead >= remaining:
+                self._move(remaining)
+                break
+            if not self._move(ahead):
+                break
+            remaining -= ahead
+            self._decide_at_center()
+            if self.returning_to_base and self.current_tile() == self.spawn_tile:
+                # Home: let the check below finish the return this tick
+                break
         # Handle tunnel wrapping like Pacman
         self.handle_tunnel()
 
         # Guard: if we ended up inside a wall tile (due to speed/overshoot), snap back
         ctx, cty = self.current_tile()
-        if not is_walkable(ctx, cty):
+        if not is_walkable(ctx, cty, self.grid):
             sx, sy = self.last_safe_tile
             self.px = sx * TILE_SIZE + TILE_SIZE // 2
             self.py = sy * TILE_SIZE + TILE_SIZE // 2
@@ -507,7 +540,7 @@ class Ghost:
 
         # Auto-exit scatter when time expires (unless returning to base)
         if self.scatter_active and not self.returning_to_base:
-            if self._scatter_until_ms is not None and pygame.time.get_ticks() >= self._scatter_until_ms:
+            if self._scatter_until_ms is not None and self.clock() >= self._scatter_until_ms:
                 self.scatter_active = False
                 self._scatter_until_ms = None
 
@@ -517,8 +550,11 @@ class Ghost:
                 self.reset_to_spawn()
                 self.returning_to_base = False
 
-    def draw(self):
-        cx, cy = int(self.px), int(self.py)
+    def draw(self, screen, offset=(0, 0)):
+        if not self._sprites_loaded:
+            self.load_sprites()
+        # Screen position: `offset` is the camera's top-left in world pixels
+        cx, cy = int(self.px) - offset[0], int(self.py) - offset[1]
         if self.scatter_active and self.scatter_image is not None:
             rect = self.scatter_image.get_rect(center=(cx, cy))
             screen.blit(self.scatter_image, rect)
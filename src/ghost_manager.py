@@ -0,0 +1,198 @@
+import time
+from array import array
+from maze import GRID
+from ghost import Ghost
+from profiler import PROFILER
+from topology import get_topology
+
+# (sprite, fallback circle colour) for each ghost, in spawn order
+GHOST_SPRITES = [
+    ("Ghost-red.png", (255, 0, 0)),
+    ("Ghost-pink.png", (255, 184, 255)),
+    ("Ghost-blue.png", (0, 255, 255)),
+    ("Ghost-orenge.png", (255, 184, 82)),
+]
+# Ghost i leaves the spawn i * GHOST_RELEASE_MS after the start
+GHOST_RELEASE_MS = 2000
+
+UNVISITED = -1
+
+
+class FlowField:
+    """BFS distance (in tiles, tunnel wrap included) from Pacman's tile to every tile.
+
+    Recomputed only when Pacman changes tile; every ghost then picks its
+    direction by looking at its neighbours' distances.
+    """
+
+    def __init__(self, grid=None):
+        self.grid = grid = grid if grid is not None else GRID
+        self.width = width = grid.width
+        self.height = height = grid.height
+        self.source = None
+        size = width * height
+        self._blank = array("i", [UNVISITED]) * size
+        self.dist = array("i", self._blank)
+        self.rebuilds = 0
+        # Walls never change: each tile's (neighbour index, direction) list
+        # comes from the level's shared topology
+        self.links = get_topology(grid).links()
+
+    def update(self, tile):
+        """Recompute the field if Pacman's tile changed; returns True if it did"""
+        if tile == self.source:
+            return False
+        self.source = tile
+        self.rebuilds += 1
+        if PROFILER.enabled:
+            PROFILER.count("flow_field_rebuild")
+        dist = self.dist
+        dist[:] = self._blank
+        x, y = tile
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return True
+        links = self.links
+        start = y * self.width + x
+        dist[start] = 0
+        frontier = [start]
+        d = 0
+        while frontier:
+            d += 1
+            next_frontier = []
+            for i in frontier:
+                for j, _ in links[i]:
+                    if dist[j] == UNVISITED:
+                        dist[j] = d
+                        next_frontier.append(j)
+            frontier = next_frontier
+        return True
+
+    def distance(self, tile):
+        x, y = tile
+        if 0 <= x < self.width and 0 <= y < self.height:
+            d = self.dist[y * self.width + x]
+            return None if d == UNVISITED else d
+        return None
+
+    def direction_from(self, tile, order):
+        """Direction of the neighbour closest to Pacman, or None if unreachable.
+
+        Ties are broken by `order`, so ghosts with different orders spread out.
+        """
+        x, y = tile
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i = y * self.width + x
+        dist = self.dist
+        here = dist[i]
+        if here == UNVISITED:
+            return None
+        if here == 0:
+            return (0, 0)
+        best = None
+        best_key = None
+        for j, direction in self.links[i]:
+            d = dist[j]
+            if d == UNVISITED:
+                continue
+            key = (d, order.index(direction))
+            if best_key is None or key < best_key:
+                best, best_key = direction, key
+        return best
+
+
+class GhostManager:
+    """Creates and drives N ghosts that share one graph and one flow field."""
+
+    def __init__(self, pacman, count=4, speed=2, clock=None, nav_table=None, graph=None,
+                 use_flow_field=True, release_interval_ms=GHOST_RELEASE_MS, grid=None, rng=None,
+                 plan_workers=None):
+        self.pacman = pacman
+        self.clock = clock
+        self.grid = grid if grid is not None else GRID
+        self.flow_field = FlowField(self.grid) if use_flow_field else None
+        # Optional plan_workers.PlanWorkers: each ghost's next search runs while it walks to the node
+        self.plan_workers = plan_workers
+        self.ghosts = []
+        # Release delays count from now (a new level starts mid-game)
+        start_ms = clock() if clock is not None else 0
+        for i in range(count):
+            sprite, color = GHOST_SPRITES[i % len(GHOST_SPRITES)]
+            ghost = Ghost(color=color, pacman=pacman, speed=speed, clock=clock,
+                          nav_table=nav_table, graph=graph, sprite=sprite, grid=self.grid,
+                          rng=rng)
+            ghost.flow_field = self.flow_field
+            ghost.plan_workers = plan_workers
+            # Rotate the tie-break order so ghosts do not all take the same route
+            order = ghost.direction_order
+            ghost.direction_order = order[i % 4:] + order[:i % 4]
+            ghost.release_ms = start_ms + i * release_interval_ms
+            self.ghosts.append(ghost)
+
+    def __iter__(self):
+        return iter(self.ghosts)
+
+    def __len__(self):
+        return len(self.ghosts)
+
+    def released(self, ghost):
+        return self.clock is None or self.clock() >= ghost.release_ms
+
+    def update(self):
+        if self.flow_field is not None:
+            self.flow_field.update(self.pacman.current_tile())
+        for ghost in self.ghosts:
+            if self.released(ghost):
+                ghost.update()
+
+    def enter_scatter_mode(self):
+        for ghost in self.ghosts:
+            ghost.enter_scatter_mode()
+
+    def draw(self, screen, offset=(0, 0)):
+        for ghost in self.ghosts:
+            ghost.draw(screen, offset)
+
+
+if __name__ == "__main__":
+    # AI (planning) cost per tick as the ghost count grows: shared flow field
+    # vs per-ghost dijkstra. Movement is linear in ghost count for both and is
+    # reported separately.
+    import random
+    from simulation import Simulation, random_controller
+
+    planning = [0.0]
+
+    def timed_planning(fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                planning[0] += time.perf_counter() - start
+        return wrapper
+
+    Ghost.recompute_path_if_needed = timed_planning(Ghost.recompute_path_if_needed)
+    FlowField.update = timed_planning(FlowField.update)
+
+    ticks = 3000
+    print(f"{'ghosts':>6} {'mode':>9} {'planning/tick':>14} {'total/tick':>11}")
+    for count in (1, 2, 4, 8, 16, 32, 64):
+        for mode in ("flow", "dijkstra"):
+            sim = Simulation(ghost_count=count, ghost_ai=mode, initial_lives=10 ** 9, seed=0)
+            for ghost in sim.ghosts:
+                ghost.release_ms = 0
+            controller = random_controller(random.Random(0))
+            planning[0] = 0.0
+            spent = 0.0
+            for _ in range(ticks):
+                direction = controller(sim)
+                if direction is not None:
+                    sim.pacman.queue_direction(*direction)
+                sim.pacman.update()
+                start = time.perf_counter()
+                sim.ghost_manager.update()
+                spent += time.perf_counter() - start
+                sim.tick += 1
+            print(f"{count:>6} {mode:>9} {planning[0] / ticks * 1e6:>11.1f} us "
+                  f"{spent / ticks * 1e6:>8.1f} us")
@@ -0,0 +1,485 @@
+"""Thousands of ghosts as parallel numpy arrays, for crowd stress tests.
+
+A Ghost is a Python object with its own attributes and a long chain of
+branches per update; GhostSwarm keeps the same state (position, direction,
+speeds, modes, timers) for every ghost in one array per field and advances
+all of them with a handful of array operations per step():
+
+1. Ghosts at a tile centre decide where to go (turns happen only there).
+2. Movement runs in rounds: every ghost that would pass a tile centre
+   moves up to it (or is stopped by a wall there) and decides again, and
+   the others move their full step. A round or two covers a tick.
+3. Tunnel wrap, the wall guard, scatter expiry and the end of a return.
+
+Decisions follow Ghost.update with GhostManager's flow field: at a node
+each ghost takes the neighbour closest to Pacman (its own tie-break
+order), read from the field for all of them at once. The rare cases the
+field doesn't answer (Pacman unreachable, a ghost returning to its spawn,
+a ghost stopped off the graph) go through the same planners as Ghost does,
+one ghost at a time. Fed the same seeded rng, a swarm moves exactly like a
+GhostManager of Ghost objects (see the check below).
+
+    python src/ghost_swarm.py    # match against GhostManager, then time 100..10000 ghosts
+"""
+import numpy as np
+import pygame
+import random
+from maze import GRID, TILE_SIZE
+from assets import SCATTER_SPRITE, get_sprite
+from grid import GHOST_SPAWN
+from ghost import direction_between
+from ghost_manager import FlowField, GHOST_SPRITES, GHOST_RELEASE_MS, UNVISITED
+from navigation import get_nav_graph
+from profiler import PROFILER
+from topology import DIRECTIONS, NO_NEIGHBOR, get_topology
+
+# Same as Ghost.return_speed
+RETURN_SPEED = 5
+# No target node / no scatter timer
+NONE = -1
+
+_DIRECTION_DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int8)
+_DIRECTION_DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int8)
+# Larger than any flow-field key (distance * 4 + tie-break rank)
+_NO_KEY = np.iinfo(np.int64).max
+
+
+class GhostSwarm:
+    """N ghosts on one level, stored as arrays and stepped together.
+
+    Ghost i has GHOST_SPRITES[i % 4]'s look, the tie-break order GhostManager
+    gives ghost i and leaves the spawn i * release_interval_ms after the
+    start. Tile indices (y * width + x) stand in for tiles throughout;
+    tiles off the map (mid tunnel wrap) get index width * height.
+    """
+
+    def __init__(self, pacman, count, speed=2, clock=None, grid=None, rng=None, graph=None,
+                 release_interval_ms=GHOST_RELEASE_MS):
+        self.pacman = pacman
+        self.count = count
+        self.grid = grid = grid if grid is not None else GRID
+        self.clock = clock if clock is not None else pygame.time.get_ticks
+        self.rng = rng if rng is not None else random
+        self.flow_field = FlowField(grid)
+        if graph is None:
+            graph = get_nav_graph(grid)
+        self.graph = graph
+        self.nodes = graph.nodes
+        self.topology = topology = get_topology(grid)
+        self.width, self.height = width, height = grid.width, grid.height
+        size = width * height
+
+        # Level tables, one extra entry for "off the map"
+        self._walkable = np.zeros(size + 1, dtype=bool)
+        self._walkable[:size] = np.frombuffer(grid.walkable, dtype=np.uint8) == 1
+        self._is_node = np.zeros(size + 1, dtype=bool)
+        self._is_node[[y * width + x for x, y in self.nodes]] = True
+        self._neighbor = np.full((size + 1, 4), NO_NEIGHBOR, dtype=np.int32)
+        self._neighbor[:size] = np.frombuffer(topology.neighbor, dtype=np.int32).reshape(size, 4)
+        self._tunnel_rows = np.zeros(height, dtype=bool)
+        self._tunnel_rows[list(topology.tunnel_rows)] = True
+        self._tunnel_cols = np.zeros(width, dtype=bool)
+        self._tunnel_cols[list(topology.tunnel_cols)] = True
+        # The field's distances, seen through numpy (FlowField.update() refills them in place)
+        self._dist = np.frombuffer(self.flow_field.dist, dtype=np.int32)
+        # Tile index -> first step toward the nearest node, (dx, dy) or None
+        self._to_node = {}
+
+        # Per-ghost state, created the way GhostManager creates its ghosts
+        spawn_tiles = grid.find_all(GHOST_SPAWN) or [(width // 2, height // 2)]
+        spawns = [self.rng.choice(spawn_tiles) for _ in range(count)]
+        self.spawn = np.array([y * width + x for x, y in spawns], dtype=np.int32).reshape(count)
+        self._return_planners = {y * width + x: graph.return_planner((x, y)) for x, y in set(spawns)}
+        center = TILE_SIZE // 2
+        self.px = (self.spawn % width * TILE_SIZE + center).astype(np.float64)
+        self.py = (self.spawn // width * TILE_SIZE + center).astype(np.float64)
+        self.dx = np.zeros(count, dtype=np.int8)
+        self.dy = np.zeros(count, dtype=np.int8)
+        self.speed = np.full(count, speed, dtype=np.float64)
+        self.normal_speed = self.speed.copy()
+        self.return_speed = np.full(count, RETURN_SPEED, dtype=np.float64)
+        self.scatter_active = np.zeros(count, dtype=bool)
+        self.returning_to_base = np.zeros(count, dtype=bool)
+        self.scatter_until_ms = np.full(count, NONE, dtype=np.int64)
+        start_ms = self.clock()
+        self.release_ms = start_ms + np.arange(count, dtype=np.int64) * release_interval_ms
+        # Tile index of the node being walked to (a planned path), or NONE
+        self.target = np.full(count, NONE, dtype=np.int32)
+        self.last_safe = self.spawn.copy()
+        # Rotation of DIRECTIONS used to break ties (GhostManager: i % 4)
+        self.order = (np.arange(count) % 4).astype(np.int8)
+        self._plan_move_from_non_node(np.arange(count))
+
+        self._images = None
+
+    def __len__(self):
+        return self.count
+
+    # Tiles
+
+    def _tiles(self, ids):
+        tx = (self.px[ids] // TILE_SIZE).astype(np.int64)
+        ty = (self.py[ids] // TILE_SIZE).astype(np.int64)
+        return self._tile_index(tx, ty)
+
+    def _tile_index(self, tx, ty):
+        inside = (tx >= 0) & (tx < self.width) & (ty >= 0) & (ty < self.height)
+        return np.where(inside, ty * self.width + tx, self.width * self.height)
+
+    def _xy(self, tile):
+        return tile % self.width, tile // self.width
+
+    def current_tiles(self):
+        """(tx, ty) arrays of every ghost's tile"""
+        return (self.px // TILE_SIZE).astype(np.int64), (self.py // TILE_SIZE).astype(np.int64)
+
+    def _at_center(self, ids):
+        center = TILE_SIZE // 2
+        return ((np.abs(self.px[ids] % TILE_SIZE - center) <= 1)
+                & (np.abs(self.py[ids] % TILE_SIZE - center) <= 1))
+
+    def _snap(self, ids, tiles):
+        center = TILE_SIZE // 2
+        self.px[ids] = tiles % self.width * TILE_SIZE + center
+        self.py[ids] = tiles // self.width * TILE_SIZE + center
+
+    # Decisions (Ghost.recompute_path_if_needed and friends)
+
+    def _step_to(self, i, tile, next_tile):
+        self.dx[i], self.dy[i] = direction_between(self._xy(tile), next_tile, self.grid)
+
+    def _to_nearest_node(self, ids, tiles):
+        # Ghost._next_tile_to_nearest_node, then choose_next_direction_to; cached per tile
+        for i, tile in zip(ids.tolist(), tiles.tolist()):
+            if tile not in self._to_node:
+                step = self.graph.tile_planner.step_to_nearest(self._xy(tile), self.nodes)
+                self._to_node[tile] = step and direction_between(self._xy(tile), step, self.grid)
+            direction = self._to_node[tile]
+            if direction is not None:
+                self.dx[i], self.dy[i] = direction
+
+    def _plan_move_from_non_node(self, ids):
+        tiles = self._tiles(ids)
+        off = ~self._is_node[tiles]
+        self._to_nearest_node(ids[off], tiles[off])
+
+    def _follow_path(self, i, tile, path):
+        if len(path) >= 2:
+            self.target[i] = path[1][1] * self.width + path[1][0]
+            self._step_to(i, tile, path[1])
+        else:
+            self.target[i] = NONE
+            self.dx[i] = self.dy[i] = 0
+
+    def _recompute(self, ids, tiles):
+        # Only at nodes, as in Ghost
+        at_node = self._is_node[tiles]
+        ids, tiles = ids[at_node], tiles[at_node]
+        if not ids.size:
+            return
+        returning = self.returning_to_base[ids]
+        for i, tile in zip(ids[returning].tolist(), tiles[returning].tolist()):
+            spawn = int(self.spawn[i])
+            if PROFILER.enabled:
+                PROFILER.count("dijkstra")
+            path = self._return_planners[spawn].path(self._xy(tile), self._xy(spawn))
+            self._follow_path(i, tile, path)
+        ids, tiles = ids[~returning], tiles[~returning]
+
+        # FlowField.direction_from for all of them: the neighbour closest to
+        # Pacman, ties to the earliest direction in the ghost's own order
+        dist = self._dist
+        here = dist[tiles]
+        neighbor = self._neighbor[tiles]
+        near = np.where(neighbor != NO_NEIGHBOR, dist[neighbor], UNVISITED)
+        rank = (np.arange(4) - self.order[ids, None]) % 4
+        key = np.where(near != UNVISITED, near.astype(np.int64) * 4 + rank, _NO_KEY)
+        best = key.argmin(axis=1)
+        found = key[np.arange(len(ids)), best] != _NO_KEY
+        arrived = here == 0
+        turn = (here != UNVISITED) & ~arrived & found
+        self.dx[ids[turn]] = _DIRECTION_DX[best[turn]]
+        self.dy[ids[turn]] = _DIRECTION_DY[best[turn]]
+        self.dx[ids[arrived]] = 0
+        self.dy[ids[arrived]] = 0
+        self.target[ids[turn | arrived]] = NONE
+
+        # No answer from the field: search toward the node nearest Pacman
+        lost = ~(turn | arrived)
+        if lost.any():
+            pacman_tile = (int(self.pacman.px // TILE_SIZE), int(self.pacman.py // TILE_SIZE))
+            goal = self.graph.tile_planner.nearest(pacman_tile, self.nodes)
+            if goal is None:
+                goal = next(iter(self.nodes))
+            for i, tile in zip(ids[lost].tolist(), tiles[lost].tolist()):
+                if PROFILER.enabled:
+                    PROFILER.count("dijkstra")
+                self._follow_path(i, tile, self.graph.planner.path(self._xy(tile), goal))
+
+    def _decide(self, ids):
+        # Ghost._decide_at_center
+        tiles = self._tiles(ids)
+        self._snap(ids, tiles)
+        walkable = self._walkable[tiles]
+        self.last_safe[ids[walkable]] = tiles[walkable]
+        replan = (self.target[ids] == tiles) | self._is_node[tiles]
+        self._recompute(ids[replan], tiles[replan])
+        stuck = ~replan & (self.dx[ids] == 0) & (self.dy[ids] == 0)
+        self._to_nearest_node(ids[stuck], tiles[stuck])
+
+    # Movement
+
+    def _ahead(self, ids):
+        # Ghost._distance_to_next_center for moving ghosts
+        center = TILE_SIZE // 2
+        dx, dy = self.dx[ids], self.dy[ids]
+        offset = np.where(dx != 0, self.px[ids] % TILE_SIZE, self.py[ids] % TILE_SIZE)
+        forward = (dx > 0) | ((dx == 0) & (dy > 0))
+        ahead = np.where(forward, (center - offset) % TILE_SIZE, (offset - center) % TILE_SIZE)
+        return np.where(ahead == 0, TILE_SIZE, ahead)
+
+    def _move(self, ids, distance):
+        """Ghost._move for each of ids; returns the mask of ghosts that weren't stopped by a wall"""
+        width, height = self.width, self.height
+        px, py = self.px[ids], self.py[ids]
+        next_px = px + self.dx[ids] * distance
+        next_py = py + self.dy[ids] * distance
+        next_tx = (next_px // TILE_SIZE).astype(np.int64)
+        next_ty = (next_py // TILE_SIZE).astype(np.int64)
+        cur_tx = (px // TILE_SIZE).astype(np.int64)
+        cur_ty = (py // TILE_SIZE).astype(np.int64)
+        crossing = (next_tx != cur_tx) | (next_ty != cur_ty)
+        row_ok = (next_ty >= 0) & (next_ty < height)
+        col_ok = (next_tx >= 0) & (next_tx < width)
+        off_map_in_tunnel = (
+            (row_ok & self._tunnel_rows[np.clip(next_ty, 0, height - 1)] & ~col_ok)
+            | (col_ok & self._tunnel_cols[np.clip(next_tx, 0, width - 1)] & ~row_ok)
+        )
+        moved = ~crossing | off_map_in_tunnel | self._walkable[self._tile_index(next_tx, next_ty)]
+        self.px[ids[moved]] = next_px[moved]
+        self.py[ids[moved]] = next_py[moved]
+
+        # Blocked: back to the centre, stopped, and choose again
+        blocked = ids[~moved]
+        if blocked.size:
+            tiles = self._tile_index(cur_tx[~moved], cur_ty[~moved])
+            self._snap(blocked, tiles)
+            self.dx[blocked] = 0
+            self.dy[blocked] = 0
+            returning = self.returning_to_base[blocked]
+            for i, tile in zip(blocked[returning].tolist(), tiles[returning].tolist()):
+                spawn = self._xy(int(self.spawn[i]))
+                step = self.graph.tile_planner.first_step(self._xy(tile), spawn)
+                if step is not None:
+                    self._step_to(i, tile, step)
+            chasing, tiles = blocked[~returning], tiles[~returning]
+            at_node = self._is_node[tiles]
+            self._recompute(chasing[at_node], tiles[at_node])
+            self._to_nearest_node(chasing[~at_node], tiles[~at_node])
+        return moved
+
+    def _handle_tunnel(self, ids):
+        tx, ty = self.current_tiles()
+        tx, ty = tx[ids], ty[ids]
+        width, height = self.width, self.height
+        center = TILE_SIZE // 2
+        px, py, dx, dy = self.px[ids], self.py[ids], self.dx[ids], self.dy[ids]
+        in_row = (ty >= 0) & (ty < height) & self._tunnel_rows[np.clip(ty, 0, height - 1)]
+        in_col = (tx >= 0) & (tx < width) & self._tunnel_cols[np.clip(tx, 0, width - 1)]
+        far_x, far_y = (width - 1) * TILE_SIZE + center, (height - 1) * TILE_SIZE + center
+        west = in_row & (px < center) & (dx < 0)
+        east = in_row & ~west & (px > far_x) & (dx > 0)
+        north = in_col & (py < center) & (dy < 0)
+        south = in_col & ~north & (py > far_y) & (dy > 0)
+        self.px[ids[west]] = far_x
+        self.px[ids[east]] = center
+        self.py[ids[north]] = far_y
+        self.py[ids[south]] = center
+
+    def _guard(self, ids):
+        # Inside a wall after all (overshoot): back to the last safe tile
+        tiles = self._tiles(ids)
+        bad = ~self._walkable[tiles]
+        ids = ids[bad]
+        if not ids.size:
+            return
+        tiles = self.last_safe[ids]
+        self._snap(ids, tiles)
+        self.dx[ids] = 0
+        self.dy[ids] = 0
+        # Returning ghosts replan at their spawn too (a no-op there, as in Ghost)
+        replan = self._is_node[tiles] | (self.returning_to_base[ids] & (tiles == self.spawn[ids]))
+        self._recompute(ids[replan], tiles[replan])
+        self._to_nearest_node(ids[~replan], tiles[~replan])
+
+    def step(self):
+        """One tick for every released ghost (GhostManager.update)"""
+        self.flow_field.update(self.pacman.current_tile())
+        now = self.clock()
+        ids = np.flatnonzero(self.release_ms <= now)
+        if not ids.size:
+            return
+        self._decide(ids[self._at_center(ids)])
+
+        # Rounds: ghosts that reach a centre before their step is used up stop
+        # there, decide, and go on with the rest in the next round
+        moving = ids[(self.dx[ids] != 0) | (self.dy[ids] != 0)]
+        remaining = self.speed[moving]
+        while moving.size:
+            ahead = self._ahead(moving)
+            last = ahead >= remaining
+            self._move(moving[last], remaining[last])
+            moving, remaining, ahead = moving[~last], remaining[~last], ahead[~last]
+            moved = self._move(moving, ahead)
+            moving, remaining = moving[moved], (remaining - ahead)[moved]
+            self._decide(moving)
+            home = self.returning_to_base[moving] & (self._tiles(moving) == self.spawn[moving])
+            moving, remaining = moving[~home], remaining[~home]
+            still = (self.dx[moving] != 0) | (self.dy[moving] != 0)
+            moving, remaining = moving[still], remaining[still]
+
+        self._handle_tunnel(ids)
+        self._guard(ids)
+
+        expired = (self.scatter_active[ids] & ~self.returning_to_base[ids]
+                   & (self.scatter_until_ms[ids] != NONE) & (now >= self.scatter_until_ms[ids]))
+        self.scatter_active[ids[expired]] = False
+        self.scatter_until_ms[ids[expired]] = NONE
+
+        returning = ids[self.returning_to_base[ids]]
+        home = returning[self._at_center(returning) & (self._tiles(returning) == self.spawn[returning])]
+        self.reset_to_spawn(home)
+        self.returning_to_base[home] = False
+
+    # Mode changes (the Ghost methods of the same names)
+
+    def enter_scatter_mode(self):
+        now = self.clock()
+        self.scatter_active[:] = True
+        self.returning_to_base[:] = False
+        # One draw per ghost in order, as GhostManager's ghosts do
+        self.scatter_until_ms[:] = [now + self.rng.randint(5000, 8000) for _ in range(self.count)]
+
+    def take_down_and_return_to_base(self, ids):
+        ids = np.atleast_1d(ids)
+        self.scatter_active[ids] = True
+        self.returning_to_base[ids] = True
+        self.speed[ids] = self.return_speed[ids]
+        self._plan_move_from_non_node(ids)
+
+    def reset_to_spawn(self, ids):
+        ids = np.atleast_1d(ids)
+        self._snap(ids, self.spawn[ids])
+        self.dx[ids] = 0
+        self.dy[ids] = 0
+        self.target[ids] = NONE
+        self.speed[ids] = self.normal_speed[ids]
+        self.scatter_active[ids] = False
+        self._plan_move_from_non_node(ids)
+        self.last_safe[ids] = self.spawn[ids]
+
+    # Drawing
+
+    def draw(self, screen, offset=(0, 0)):
+        """Blit every ghost on screen in one call (atlas sprites; circles if they're missing)"""
+        if self._images is None:
+            self._images = [get_sprite(sprite) for sprite, _ in GHOST_SPRITES] + [get_sprite(SCATTER_SPRITE)]
+        cx = self.px.astype(np.int64) - offset[0]
+        cy = self.py.astype(np.int64) - offset[1]
+        margin = TILE_SIZE
+        width, height = screen.get_size()
+        shown = np.flatnonzero((cx > -margin) & (cx < width + margin) & (cy > -margin) & (cy < height + margin))
+        looks = np.where(self.scatter_active[shown], len(GHOST_SPRITES), shown % len(GHOST_SPRITES))
+        blits = []
+        for i, look, x, y in zip(shown.tolist(), looks.tolist(), cx[shown].tolist(), cy[shown].tolist()):
+            image = self._images[look]
+            if image is None and look == len(GHOST_SPRITES):
+                look = i % len(GHOST_SPRITES)
+                image = self._images[look]
+            if image is None:
+                pygame.draw.circle(screen, GHOST_SPRITES[look][1], (x, y), TILE_SIZE // 2 - 2)
+                continue
+            w, h = image.get_size()
+            blits.append((image, (x - w // 2, y - h // 2)))
+        screen.blits(blits, doreturn=False)
+
+
+if __name__ == "__main__":
+    import time
+    from ghost_manager import GhostManager
+    from maze import load_level
+    from maze_gen import grid_of_size
+    from pacman import Pacman
+    from simulation import DIRECTIONS as PACMAN_DIRECTIONS, TICK_RATE
+
+    def game(level, make_ghosts, ticks, seed=0):
+        # Same Pacman moves, power pills and take-downs for either kind of ghosts
+        grid = level.copy()
+        pacman = Pacman(grid)
+        tick = [0]
+        ghosts = make_ghosts(pacman, grid, lambda: tick[0] * 1000 // TICK_RATE, random.Random(seed))
+        moves = random.Random(seed + 1)
+        for t in range(ticks):
+            tick[0] = t
+            if t % 30 == 0:
+                pacman.queue_direction(*moves.choice(PACMAN_DIRECTIONS))
+            pacman.update()
+            if t % 700 == 350:
+                ghosts.enter_scatter_mode()
+            if t % 700 == 500:
+                for i in range(0, len(ghosts), 3):
+                    if isinstance(ghosts, GhostSwarm):
+                        ghosts.take_down_and_return_to_base(i)
+                    else:
+                        ghosts.ghosts[i].take_down_and_return_to_base()
+            if isinstance(ghosts, GhostSwarm):
+                ghosts.step()
+            else:
+                ghosts.update()
+            yield ghosts
+
+    def objects(pacman, grid, clock, rng):
+        return GhostManager(pacman, count=count, speed=1.5, clock=clock, grid=grid, rng=rng,
+                            release_interval_ms=200)
+
+    def swarm(pacman, grid, clock, rng):
+        return GhostSwarm(pacman, count, speed=1.5, clock=clock, grid=grid, rng=rng, release_interval_ms=200)
+
+    def state(ghosts):
+        if isinstance(ghosts, GhostSwarm):
+            return list(zip(ghosts.px.tolist(), ghosts.py.tolist(), ghosts.dx.tolist(), ghosts.dy.tolist(),
+                            ghosts.scatter_active.tolist(), ghosts.returning_to_base.tolist()))
+        return [(g.px, g.py, g.dx, g.dy, g.scatter_active, g.returning_to_base) for g in ghosts]
+
+    count = 12
+    levels = [("level " + level_id, load_level(level_id)) for level_id in ("1", "2", "3")]
+    levels.append(("61x61", grid_of_size(61)))
+    for name, level in levels:
+        ticks = 3000
+        mismatch = None
+        for t, (a, b) in enumerate(zip(game(level, objects, ticks), game(level, swarm, ticks))):
+            if state(a) != state(b):
+                mismatch = t
+                break
+        print(f"{name}: {count} ghosts, {ticks} ticks: "
+              f"{'same as GhostManager' if mismatch is None else f'DIFFERS at tick {mismatch}'}")
+
+    ticks = 200
+    level = grid_of_size(201)
+    print(f"\nper tick on {level.width}x{level.height}, every ghost released")
+    for count in (100, 1000, 10000):
+        for kind, make in (("objects", objects), ("swarm", swarm)):
+            if kind == "objects" and count > 1000:
+                continue
+            run = game(level, make, ticks)
+            ghosts = next(run)
+            if isinstance(ghosts, GhostSwarm):
+                ghosts.release_ms[:] = 0
+            else:
+                for ghost in ghosts:
+                    ghost.release_ms = 0
+            start = time.perf_counter()
+            for _ in run:
+                pass
+            per_tick = (time.perf_counter() - start) / (ticks - 1)
+            print(f"{count:>6} ghosts {kind:>8}: {per_tick * 1000:7.2f} ms")
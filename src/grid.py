@@ -0,0 +1,135 @@
+# Tile values used in data/maze.json
+EMPTY = 0
+WALL = 1
+PILL = 2
+POWER_PILL = 3
+GHOST_SPAWN = 5
+PACMAN_START = 9
+
+# bytes.translate() tables: tile value -> 0/1
+_WALKABLE_TABLE = bytes(0 if v == WALL else 1 for v in range(256))
+_PELLET_TABLE = bytes(1 if v in (PILL, POWER_PILL) else 0 for v in range(256))
+_DIGIT_TABLE = bytes((v - 48) % 256 for v in range(256))
+# 0/1 -> bit k set
+_BIT_TABLES = [bytes([0, 1 << k]) + bytes(254) for k in range(8)]
+
+
+class Grid:
+    """Compact tile map: one byte per tile plus a walkability mask and a pellet bitset.
+
+    Tiles are stored row-major (index = y * width + x). The walkability mask
+    never changes during a level, so copies share it; tile bytes and pellet
+    bits are per copy, and pellets_remaining is kept up to date so "level
+    cleared" is a plain comparison.
+    """
+
+    def __init__(self, width, height, tiles, walkable=None):
+        self.width = width
+        self.height = height
+        self.tiles = bytearray(tiles)
+        if walkable is None:
+            walkable = self.tiles.translate(_WALKABLE_TABLE)
+        self.walkable = bytes(walkable)
+        # Pack the 0/1 pellet mask into bits: byte j of the bitset ORs bit k
+        # from mask[8 * j + k], done with slices and big-int ORs instead of a
+        # per-tile loop so huge generated mazes load quickly
+        pellet_mask = self.tiles.translate(_PELLET_TABLE)
+        self.pellets_remaining = pellet_mask.count(1)
+        pellet_mask += bytes(-len(pellet_mask) % 8)
+        packed = 0
+        for k in range(8):
+            packed |= int.from_bytes(pellet_mask[k::8].translate(_BIT_TABLES[k]), "little")
+        self.pellets = bytearray(packed.to_bytes(len(pellet_mask) // 8, "little"))
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a grid from maze.json style rows ("1222...")"""
+        height = len(rows)
+        width = len(rows[0])
+        for y, row in enumerate(rows):
+            if len(row) != width:
+                raise ValueError(f"map row {y} has {len(row)} tiles, expected {width}")
+        # "0".."9" -> 0..9 without a per-character int()
+        text = "".join(rows).encode("ascii")
+        if not text.isdigit():
+            raise ValueError("map rows may only contain the digits 0-9")
+        return cls(width, height, text.translate(_DIGIT_TABLE))
+
+    def copy(self):
+        """Independent tiles and pellets, shared walkability mask"""
+        grid = Grid.__new__(Grid)
+        grid.width = self.width
+        grid.height = self.height
+        grid.tiles = bytearray(self.tiles)
+        grid.walkable = self.walkable
+        grid.pellets = bytearray(self.pellets)
+        grid.pellets_remaining = self.pellets_remaining
+        return grid
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        """Tile value at (x, y); out of bounds counts as wall"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.tiles[y * self.width + x]
+        return WALL
+
+    def set(self, x, y, value):
+        """Change a tile that keeps its walkability (markers, pellets)"""
+        i = y * self.width + x
+        if (value == WALL) != (self.tiles[i] == WALL):
+            raise ValueError("walls are fixed for the lifetime of a grid")
+        had = self.pellets[i >> 3] >> (i & 7) & 1
+        has = 1 if value == PILL or value == POWER_PILL else 0
+        if had != has:
+            self.pellets[i >> 3] ^= 1 << (i & 7)
+            self.pellets_remaining += has - had
+        self.tiles[i] = value
+
+    def is_walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.walkable[y * self.width + x] == 1
+
+    def has_pellet(self, x, y):
+        i = y * self.width + x
+        return self.pellets[i >> 3] >> (i & 7) & 1 == 1
+
+    def eat(self, x, y):
+        """Clear the pellet at (x, y); returns the eaten tile value or 0"""
+        i = y * self.width + x
+        bit = 1 << (i & 7)
+        if not self.pellets[i >> 3] & bit:
+            return 0
+        self.pellets[i >> 3] ^= bit
+        self.pellets_remaining -= 1
+        value = self.tiles[i]
+        self.tiles[i] = EMPTY
+        return value
+
+    @property
+    def cleared(self):
+        return self.pellets_remaining == 0
+
+    def find(self, value):
+        """First (x, y) holding `value`, or None"""
+        i = self.tiles.find(value)
+        if i < 0:
+            return None
+        return i % self.width, i // self.width
+
+    def find_all(self, value):
+        """Every (x, y) holding `value`, in row-major order"""
+        found = []
+        i = self.tiles.find(value)
+        while i >= 0:
+            found.append((i % self.width, i // self.width))
+            i = self.tiles.find(value, i + 1)
+        return found
+
+    def row(self, y):
+        """Tile values of row y as bytes"""
+        return bytes(self.tiles[y * self.width:(y + 1) * self.width])
+
+    def rows(self):
+        for y in range(self.height):
+            yield self.row(y)
@@ -0,0 +1,80 @@
+import os
+from collections import OrderedDict
+import pygame
+from assets import LIFE_ICON_SIZE, LIFE_ICON_SPRITE, get_sprite
+from maze import TILE_SIZE
+
+FONT_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "fonts", "CascadiaCode-VariableFont_wght.ttf")
+)
+FONT_SIZE = 22
+SCORE_COLOR = (0, 255, 0)
+LIFE_ICON_SPACING = 6
+
+
+def load_font(size=FONT_SIZE):
+    """Load the HUD font relative to this file (not the working directory)"""
+    if not pygame.font.get_init():
+        pygame.font.init()
+    try:
+        return pygame.font.Font(FONT_PATH, size)
+    except Exception as e:
+        print("Font init failed, using the default font:", e)
+        return pygame.font.Font(None, size)
+
+
+def load_life_icon():
+    # Shared with the rest of the sprites (assets.get_atlas())
+    return get_sprite(LIFE_ICON_SPRITE, LIFE_ICON_SIZE)
+
+
+class Hud:
+    """Score and lives strip along the top row.
+
+    The font and life icon are loaded when the HUD is created (at startup,
+    after the display exists). Rendered score text is kept in a small LRU
+    cache keyed by the value, and the strip itself is recomposited only when
+    the score or the number of lives changes.
+    """
+
+    def __init__(self, width, height=TILE_SIZE, cache_size=32):
+        self.font = load_font()
+        self.life_icon = load_life_icon()
+        self.strip = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.rect = self.strip.get_rect()
+        self.cache_size = cache_size
+        self._text_cache = OrderedDict()
+        self._state = None
+
+    def render_text(self, text):
+        surface = self._text_cache.get(text)
+        if surface is not None:
+            self._text_cache.move_to_end(text)
+            return surface
+        surface = self.font.render(text, True, SCORE_COLOR)
+        self._text_cache[text] = surface
+        if len(self._text_cache) > self.cache_size:
+            self._text_cache.popitem(last=False)
+        return surface
+
+    def update(self, score, lives):
+        """Recomposite the strip if the score or lives changed; returns True if it did"""
+        state = (score, lives)
+        if state == self._state:
+            return False
+        self._state = state
+        self.strip.fill((0, 0, 0, 0))
+        # Score in the top-left tile
+        self.strip.blit(self.render_text(str(score)), (0, 0))
+        # One icon per life, right-aligned
+        if self.life_icon is not None and lives > 0:
+            spacing = self.life_icon.get_width() + LIFE_ICON_SPACING
+            width = self.strip.get_width()
+            for i in range(min(lives, width // spacing)):
+                rect = self.life_icon.get_rect()
+                rect.topright = (width - i * spacing, 0)
+                self.strip.blit(self.life_icon, rect)
+        return True
+
+    def draw(self, screen):
+        screen.blit(self.strip, self.rect)
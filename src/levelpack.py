@@ -0,0 +1,286 @@
+"""Compiled level pack: maze.json plus precomputed navigation data in one binary file.
+
+    python src/levelpack.py build [--tables] [--maze data/maze.json] [--out data/levels.pack]
+    python src/levelpack.py info [data/levels.pack]
+
+Layout (little endian):
+
+    header   magic "PMLP", version, level count, sha256 of the source
+             maze.json, directory offset/size and the directory's CRC32
+    levels   per level, 8-byte aligned sections: tiles (1 byte each), node
+             coordinates (uint16 x, y), the adjacency in CSR form (uint32
+             offsets, targets, weights) and, with --tables, the NavTable tile
+             list (uint16 x, y), directions (1 byte per pair) and distances
+             (uint16 per pair)
+    directory  JSON: per level its size, markers, nav key, section offsets
+             and a CRC32 of the level's bytes
+
+The game opens the pack with mmap and reads the arrays through memoryviews,
+so nothing is parsed or copied until a level is used. A level's CRC is
+checked the first time it is opened; a pack built from a different
+maze.json (or an older format) is ignored.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from grid import Grid, PACMAN_START, GHOST_SPAWN
+
+MAGIC = b"PMLP"
+PACK_VERSION = 1
+PACK_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "levels.pack"))
+MAZE_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "maze.json"))
+# magic, version, reserved, level count, source sha256, directory offset, size, crc32
+HEADER = struct.Struct("<4sHHI32sQQI")
+ALIGN = 8
+
+# memoryview.cast() reads the arrays in native byte order
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+class PackError(Exception):
+    pass
+
+
+def source_hash(maze_bytes):
+    return hashlib.sha256(maze_bytes).digest()
+
+
+def _le_bytes(values, typecode):
+    arr = array(typecode, values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+class PackedLevel:
+    """One level of an open pack. Array attributes are memoryviews into the mmap."""
+
+    def __init__(self, pack, entry):
+        self.pack = pack
+        self.level_id = entry["id"]
+        self.width = entry["width"]
+        self.height = entry["height"]
+        self.key = entry["key"]
+        self.graph_version = entry["graph_version"]
+        self.pacman_start = tuple(entry["pacman_start"]) if entry["pacman_start"] else None
+        self.ghost_spawns = [tuple(p) for p in entry["ghost_spawns"]]
+        self.adj_count = entry["adj_count"]
+        self._sections = entry["sections"]
+
+    def section(self, name, typecode="B"):
+        """Zero-copy view of a section (None if the pack doesn't have it)"""
+        span = self._sections.get(name)
+        if span is None:
+            return None
+        offset, size = span
+        view = self.pack.view[offset:offset + size]
+        return view if typecode == "B" else view.cast(typecode)
+
+    def grid(self):
+        """A new Grid with this level's tiles"""
+        return Grid(self.width, self.height, self.section("tiles"))
+
+    def nav_graph(self, grid):
+        """navigation.NavGraph rebuilt from the CSR arrays (no tile scan)"""
+        from navigation import NavGraph
+        xy = self.section("nodes", "H").tolist()
+        node_list = list(zip(xy[0::2], xy[1::2]))
+        offsets = self.section("adj_offsets", "I").tolist()
+        targets = self.section("adj_targets", "I").tolist()
+        edges = list(zip(map(node_list.__getitem__, targets), self.section("adj_weights", "I").tolist()))
+        adj = {node_list[i]: edges[offsets[i]:offsets[i + 1]] for i in range(self.adj_count)}
+        return NavGraph(set(node_list), adj, self.key, grid)
+
+    def nav_table(self, grid):
+        """navigation.NavTable reading its arrays straight from the pack, or None"""
+        if "table_directions" not in self._sections:
+            return None
+        from navigation import NavTable
+        xy = self.section("table_tiles", "H").tolist()
+        tiles = list(zip(xy[0::2], xy[1::2]))
+        return NavTable.from_arrays(tiles, self.section("table_directions"),
+                                    self.section("table_distances", "H"), grid)
+
+
+class LevelPack:
+    """A compiled pack opened with mmap."""
+
+    def __init__(self, path=PACK_PATH):
+        if not _NATIVE_LITTLE_ENDIAN:
+            raise PackError("level packs are read zero-copy and need a little-endian CPU")
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._mmap)
+        if len(self.view) < HEADER.size:
+            raise PackError("file too short")
+        magic, version, _, count, self.source_hash, dir_offset, dir_size, dir_crc = \
+            HEADER.unpack_from(self.view)
+        if magic != MAGIC:
+            raise PackError("not a level pack")
+        if version != PACK_VERSION:
+            raise PackError(f"pack version {version}, expected {PACK_VERSION}")
+        directory = self.view[dir_offset:dir_offset + dir_size]
+        if len(directory) != dir_size or zlib.crc32(directory) != dir_crc:
+            raise PackError("directory checksum mismatch")
+        entries = json.loads(bytes(directory).decode("utf-8"))
+        if len(entries) != count:
+            raise PackError("level count mismatch")
+        self._entries = {e["id"]: e for e in entries}
+        self._by_key = {e["key"]: e["id"] for e in entries}
+        self._levels = {}
+
+    @property
+    def level_ids(self):
+        return list(self._entries)
+
+    def __contains__(self, level_id):
+        return str(level_id) in self._entries
+
+    def level(self, level_id):
+        """PackedLevel for `level_id`, checking its CRC on first use"""
+        level_id = str(level_id)
+        level = self._levels.get(level_id)
+        if level is None:
+            entry = self._entries[level_id]
+            start, end = entry["span"]
+            if zlib.crc32(self.view[start:end]) != entry["crc"]:
+                raise PackError(f"level {level_id} checksum mismatch")
+            level = self._levels[level_id] = PackedLevel(self, entry)
+        return level
+
+    def level_for_key(self, key):
+        """PackedLevel whose walls hash to navigation.grid_key() `key`, or None"""
+        level_id = self._by_key.get(key)
+        return None if level_id is None else self.level(level_id)
+
+
+def open_pack(path=PACK_PATH, maze_bytes=None):
+    """Open the pack if it exists and was built from `maze_bytes`; otherwise None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        pack = LevelPack(path)
+    except (OSError, ValueError, PackError) as e:
+        print(f"Ignoring level pack {path}: {e}")
+        return None
+    if maze_bytes is not None and pack.source_hash != source_hash(maze_bytes):
+        print(f"Ignoring level pack {path}: built from another maze.json (rebuild with src/levelpack.py build)")
+        return None
+    return pack
+
+
+def compile_pack(maze_path=MAZE_PATH, out_path=PACK_PATH, with_tables=False):
+    """Build a pack from a maze.json file; returns the number of bytes written"""
+    with open(maze_path, "rb") as f:
+        maze_bytes = f.read()
+    return build_pack(maze_bytes, out_path, with_tables)
+
+
+def build_pack(maze_bytes, out_path, with_tables=False):
+    """Build a pack from maze.json contents (e.g. maze_gen output); returns the bytes written"""
+    from ghost import build_graph
+    from navigation import GRAPH_CACHE_VERSION, NavTable, grid_key
+
+    levels = json.loads(maze_bytes.decode("utf-8"))
+
+    body = bytearray(HEADER.size)
+    entries = []
+
+    def add_section(sections, name, data):
+        body.extend(bytes(-len(body) % ALIGN))
+        sections[name] = [len(body), len(data)]
+        body.extend(data)
+
+    for level_id, level in levels.items():
+        grid = Grid.from_rows(level["map"])
+        nodes, adj = build_graph(grid)
+        # Nodes with adjacency lists first, in adj order, so the rebuilt
+        # dict iterates (and dijkstra breaks ties) exactly as build_graph's
+        node_list = list(adj) + sorted(n for n in nodes if n not in adj)
+        node_index = {n: i for i, n in enumerate(node_list)}
+        offsets, targets, weights = [0], [], []
+        for u in node_list[:len(adj)]:
+            for v, w in adj[u]:
+                targets.append(node_index[v])
+                weights.append(w)
+            offsets.append(len(targets))
+
+        body.extend(bytes(-len(body) % ALIGN))
+        start = len(body)
+        sections = {}
+        add_section(sections, "tiles", bytes(grid.tiles))
+        add_section(sections, "nodes", _le_bytes([c for n in node_list for c in n], "H"))
+        add_section(sections, "adj_offsets", _le_bytes(offsets, "I"))
+        add_section(sections, "adj_targets", _le_bytes(targets, "I"))
+        add_section(sections, "adj_weights", _le_bytes(weights, "I"))
+        if with_tables:
+            table = NavTable(nodes, adj, grid=grid)
+            add_section(sections, "table_tiles", _le_bytes([c for t in table.tiles for c in t], "H"))
+            add_section(sections, "table_directions", bytes(table.directions))
+            add_section(sections, "table_distances", _le_bytes(table.distances, "H"))
+        end = len(body)
+        entries.append({
+            "id": level_id,
+            "width": grid.width,
+            "height": grid.height,
+            "key": grid_key(grid),
+            "graph_version": GRAPH_CACHE_VERSION,
+            "pacman_start": grid.find(PACMAN_START),
+            "ghost_spawns": grid.find_all(GHOST_SPAWN),
+            "adj_count": len(adj),
+            "span": [start, end],
+            "crc": zlib.crc32(body[start:end]),
+            "sections": sections,
+        })
+
+    directory = json.dumps(entries, separators=(",", ":")).encode("utf-8")
+    body.extend(bytes(-len(body) % ALIGN))
+    dir_offset = len(body)
+    body.extend(directory)
+    HEADER.pack_into(body, 0, MAGIC, PACK_VERSION, 0, len(entries), source_hash(maze_bytes),
+                     dir_offset, len(directory), zlib.crc32(directory))
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, out_path)
+    return len(body)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Level pack compiler")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="compile maze.json into a pack")
+    build.add_argument("--maze", default=MAZE_PATH)
+    build.add_argument("--out", default=PACK_PATH)
+    build.add_argument("--tables", action="store_true", help="include the all-pairs NavTables")
+    info = sub.add_parser("info", help="list the levels in a pack and time loading them")
+    info.add_argument("path", nargs="?", default=PACK_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        size = compile_pack(args.maze, args.out, args.tables)
+        print(f"Wrote {args.out} ({size} bytes)")
+    else:
+        import navigation  # noqa: F401  (keep its import out of the timings)
+        start = time.perf_counter()
+        pack = LevelPack(args.path)
+        print(f"opened {args.path} in {(time.perf_counter() - start) * 1000:.2f} ms")
+        for level_id in pack.level_ids:
+            start = time.perf_counter()
+            level = pack.level(level_id)
+            grid = level.grid()
+            graph = level.nav_graph(grid)
+            table = level.nav_table(grid)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"level {level_id}: {level.width}x{level.height}, {len(graph.nodes)} nodes, "
+                  f"table {'yes' if table is not None else 'no'}, loaded in {elapsed:.2f} ms")
@@ -0,0 +1,74 @@
+import threading
+from maze import load_level
+from grid import GHOST_SPAWN
+from navigation import NavTable, NavTableTooLarge, get_nav_graph
+from ghost_manager import FlowField
+
+
+class PreparedLevel:
+    """Everything a level needs before play starts, apart from surfaces: grid and nav data."""
+
+    def __init__(self, level_id, grid, graph, nav_table=None):
+        self.level_id = level_id
+        self.grid = grid
+        self.graph = graph
+        self.nav_table = nav_table
+
+
+class LevelPrefetcher:
+    """Prepares upcoming levels on a background thread.
+
+    prefetch(level_id) starts the work and returns at once; get(level_id)
+    waits for it (or does it on the spot if it was never started). The nav
+    graph and flow-field neighbour lists land in their process caches, so
+    the ghosts of the new level find them ready. No pygame surfaces are
+    made here: SDL isn't thread-safe, so the renderer is built on the main
+    thread when the level starts.
+    """
+
+    def __init__(self, with_nav_table=False):
+        self.with_nav_table = with_nav_table
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._prepared = {}
+        self._errors = {}
+
+    def _prepare(self, level_id):
+        try:
+            grid = load_level(level_id)
+            graph = get_nav_graph(grid)
+            for spawn in grid.find_all(GHOST_SPAWN):
+                graph.return_graph(spawn)
+            FlowField(grid)
+            nav_table = None
+            if self.with_nav_table:
+                try:
+                    nav_table = NavTable.for_grid(grid)
+                except NavTableTooLarge as e:
+                    print("Nav table disabled:", e)
+            self._prepared[level_id] = PreparedLevel(level_id, grid, graph, nav_table)
+        except Exception as e:
+            # Re-raised from get() on the thread that needs the level
+            self._errors[level_id] = e
+
+    def prefetch(self, level_id):
+        with self._lock:
+            if level_id in self._threads or level_id in self._prepared:
+                return
+            thread = threading.Thread(target=self._prepare, args=(level_id,),
+                                      name=f"prefetch-level-{level_id}", daemon=True)
+            self._threads[level_id] = thread
+        thread.start()
+
+    def get(self, level_id):
+        """The prepared level, waiting for (or doing) the work if needed"""
+        with self._lock:
+            thread = self._threads.pop(level_id, None)
+        if thread is not None:
+            thread.join()
+        elif level_id not in self._prepared:
+            self._prepare(level_id)
+        if level_id in self._errors:
+            raise self._errors.pop(level_id)
+        # Hand it over once; a later visit to the level prepares it again
+        return self._prepared.pop(level_id)
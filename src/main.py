@@ -1,57 +1,125 @@
 import pygame
-from sys import exit
-from maze import draw_smooth_map
-from pacman import Pacman
-from ghost import Ghost
-from lavel_system import LevelSystem
+import random
+from sys import argv, exit
+from assets import get_atlas
+from maze import init_display, screen_size, SCREEN_WIDTH
+from hud import Hud
+from levels import LevelPrefetcher
+from plan_workers import PlanWorkers
+from profiler import PROFILER, ProfilerOverlay
+from renderer import MazeRenderer
+from replay import InputRecorder
+from simulation import Simulation, GHOST_SPEED, GHOST_COUNT, INITIAL_LIVES, TICK_RATE
+
+# Fixed timestep: the game always advances TICK_RATE ticks per real second.
+# A slow frame runs several ticks (at most this many) instead of slowing the game down.
+MAX_TICKS_PER_FRAME = 5
+
+
+def arg_value(name, default=None):
+    """Value following `name` on the command line (e.g. --seed 42)"""
+    if name in argv[:-1]:
+        return argv[argv.index(name) + 1]
+    return default
 
-# Config variables
-GHOST_SPEED = 1.5
-INITIAL_LIVES = 3
 
 # Initialize pygame
 pygame.init()
+screen = init_display()
 clock = pygame.time.Clock()
+# Every sprite is read and scaled once, here, however many ghosts get spawned
+get_atlas()
+
+
+# Game state and logic (Pacman, ghosts, lives) run headless in the simulation.
+# --seed N replays the same ghost decisions; --record FILE saves the inputs
+# on exit for `python src/replay.py play FILE`.
+seed = int(arg_value("--seed", random.randrange(2 ** 32)))
+# Clearing a level moves on to the next one in maze.json; its grid and nav
+# data are prepared on a background thread. Surfaces are only ever made here,
+# on the main thread (SDL isn't thread-safe), when the level starts.
+prefetcher = LevelPrefetcher()
+record_path = arg_value("--record")
+# --async-plan: each ghost's path search runs on a worker thread while it
+# walks to the node, so a burst of replans doesn't stall the frame
+plan_workers = PlanWorkers() if "--async-plan" in argv else None
+sim = Simulation(ghost_speed=GHOST_SPEED, initial_lives=INITIAL_LIVES, ghost_count=GHOST_COUNT, seed=seed,
+                 advance_levels=True, prefetcher=prefetcher, plan_workers=plan_workers)
+recorder = InputRecorder(sim) if record_path else None
+
+# Score/lives strip; the font and icon are loaded here rather than on the first frame
+hud = Hud(SCREEN_WIDTH)
 
-# Create Pacman
-pacman = Pacman()
+# Cached maze background, scrolled to follow Pacman on maps bigger than the
+# window; only the tiles around moving entities are redrawn while it stays put
+renderer = MazeRenderer(sim.grid, hud)
 
-# Create Red Ghost (chasing)
-red_ghost = Ghost(color=(255, 0, 0), pacman=pacman, speed=GHOST_SPEED)
 
-# Level/Lives system
-level = LevelSystem(initial_lives=INITIAL_LIVES)
+# Frame profiler: F3 toggles the overlay (and recording), F4 writes the
+# recorded frames to profiles/*.jsonl. --profile records from the start.
+overlay = ProfilerOverlay(PROFILER)
+PROFILER.enabled = "--profile" in argv
+overlay_rect = None
+
+tick_seconds = 1.0 / TICK_RATE
+accumulator = tick_seconds
+# Last arrow key pressed, handed to the next tick
+pending_direction = None
 
 # Main game loop
 while True:
+    PROFILER.begin_frame()
     # Event handling
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if PROFILER.frames:
+                print("Frame profile written to", PROFILER.flush_jsonl())
+            if recorder is not None:
+                print("Input recording written to", recorder.save(record_path, sim.tick))
             pygame.quit()
             exit()
-        
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            overlay.toggle()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and PROFILER.frames:
+            print("Frame profile written to", PROFILER.flush_jsonl())
+
         # Handle Pacman input
-        pacman.handle_input(event)
-    
-    # Update Pacman first
-    pacman.update()
-    # If Pacman ate a power pellet this frame, enter scatter BEFORE collisions
-    if getattr(pacman, 'last_ate_power', False):
-        if hasattr(red_ghost, 'enter_scatter_mode'):
-            red_ghost.enter_scatter_mode()
-        pacman.last_ate_power = False
-    # Then update ghost and check collisions
-    red_ghost.update()
-    level.check_collision_and_reset(pacman, red_ghost)
-    
-    # Draw everything
-    draw_smooth_map()
-    pacman.draw()
-    red_ghost.draw()
-    level.draw_lives()
-    
-    # Update display
-    pygame.display.flip()
-    
-    # Limit frame rate to 60 FPS
-    clock.tick(60)
+        direction = sim.pacman.direction_for_event(event)
+        if direction is not None:
+            pending_direction = direction
+    PROFILER.mark("events")
+
+    # Update Pacman, ghosts and collisions, as many ticks as real time calls for
+    while accumulator >= tick_seconds:
+        sim.step(pending_direction)
+        pending_direction = None
+        accumulator -= tick_seconds
+
+    if sim.prepared_level is not None:
+        # New level (its nav data prepared while the last one played). Chunks
+        # are drawn as they come into view, so a fresh renderer costs little.
+        sim.prepared_level = None
+        renderer = MazeRenderer(sim.grid)
+        size = screen_size(sim.grid)
+        if screen.get_size() != size:
+            screen = pygame.display.set_mode(size)
+        screen.fill((0, 0, 0))
+        pygame.display.flip()
+        overlay_rect = None
+
+    # Draw everything and push only the changed areas to the display
+    dirty_rects = []
+    if overlay_rect is not None:
+        # Clear last frame's (translucent) overlay before drawing on top again
+        dirty_rects.append(renderer.restore(screen, overlay_rect))
+    dirty_rects += renderer.draw_frame(screen, sim.pacman, sim.ghosts, sim.level)
+    overlay_rect = overlay.draw(screen)
+    if overlay_rect is not None:
+        dirty_rects.append(overlay_rect)
+    pygame.display.update(dirty_rects)
+    PROFILER.mark("display.update")
+    PROFILER.end_frame()
+
+    # Limit frame rate to 60 FPS and bank the elapsed time for the next ticks
+    elapsed = clock.tick(60) / 1000.0
+    accumulator = min(accumulator + elapsed, MAX_TICKS_PER_FRAME * tick_seconds)
@@ -2,10 +2,74 @@ import pygame
 import json
 import os
 import sys
+from grid import Grid
+from levelpack import PackError, open_pack
 
 # --- Configuration ---
 TILE_SIZE = 30
 
+_JSON_WHITESPACE = " \t\r\n"
+
+
+def _skip_ws(text, i):
+    while i < len(text) and text[i] in _JSON_WHITESPACE:
+        i += 1
+    return i
+
+
+def _skip_value(text, i):
+    """End offset of the JSON value starting at i, without building it"""
+    if text[i] not in "{[":
+        return json.JSONDecoder().raw_decode(text, i)[1]
+    depth = 0
+    while True:
+        c = text[i]
+        if c == '"':
+            i = json.decoder.scanstring(text, i + 1)[1]
+            continue
+        if c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+
+
+def index_levels(text):
+    """{level id: (start, end)} offsets of each level in maze.json text.
+
+    Only the top-level object is scanned here; a level's map is parsed the
+    first time load_level() asks for it.
+    """
+    index = {}
+    try:
+        i = _skip_ws(text, 0)
+        if text[i] != "{":
+            raise json.JSONDecodeError("maze file must be a JSON object", text, i)
+        i = _skip_ws(text, i + 1)
+        if text[i] == "}":
+            return index
+        while True:
+            if text[i] != '"':
+                raise json.JSONDecodeError("expected a level id", text, i)
+            level_id, i = json.decoder.scanstring(text, i + 1)
+            i = _skip_ws(text, i)
+            if text[i] != ":":
+                raise json.JSONDecodeError("expected ':'", text, i)
+            start = _skip_ws(text, i + 1)
+            end = _skip_value(text, start)
+            index[level_id] = (start, end)
+            i = _skip_ws(text, end)
+            if text[i] == "}":
+                return index
+            if text[i] != ",":
+                raise json.JSONDecodeError("expected ',' or '}'", text, i)
+            i = _skip_ws(text, i + 1)
+    except IndexError:
+        raise json.JSONDecodeError("unexpected end of file", text, len(text))
+
+
 # Map with string
 # Define the Map Array: 1=Wall, 2=Normal Pill, 3=Special Pill, 0=Empty Path
 
@@ -14,91 +78,171 @@ try:
     maze_file_path = os.path.normpath(
         os.path.join(os.path.dirname(__file__), "..", "data", "maze.json")
     )
-    with open(maze_file_path, "r", encoding="utf-8") as f:
-        y = json.load(f)
-    map01 = y["1"]["map"]
+    with open(maze_file_path, "rb") as f:
+        _maze_bytes = f.read()
+    _maze_text = _maze_bytes.decode("utf-8")
+    _level_index = index_levels(_maze_text)
 except FileNotFoundError as e:
     print(f"Map file not found: {e.filename}")
     sys.exit(1)
 except json.JSONDecodeError as e:
     print(f"Invalid JSON in maze file at line {e.lineno}, col {e.colno}: {e.msg}")
     sys.exit(1)
+except Exception as e:
+    print(f"Unexpected error loading maze: {e}")
+    sys.exit(1)
+
+# Every level in maze.json, in file order
+LEVEL_IDS = list(_level_index)
+
+# Compiled data/levels.pack (see levelpack.py), if present and built from
+# this maze.json; levels and nav graphs come from it instead of the JSON
+LEVEL_PACK = open_pack(maze_bytes=_maze_bytes)
+
+# Parsed levels by id; filled on demand (also from the prefetch thread)
+_levels = {}
+
+
+def load_level(level_id):
+    """Grid for a level in maze.json, parsed on first use.
+
+    The grid is shared and must not be played on: games work on a copy().
+    Raises KeyError for an unknown level and ValueError for a bad map.
+    """
+    level_id = str(level_id)
+    grid = _levels.get(level_id)
+    if grid is None:
+        if LEVEL_PACK is not None and level_id in LEVEL_PACK:
+            try:
+                grid = LEVEL_PACK.level(level_id).grid()
+            except PackError as e:
+                print("Level pack:", e)
+        if grid is None:
+            start, end = _level_index[level_id]
+            grid = Grid.from_rows(json.loads(_maze_text[start:end])["map"])
+        _levels[level_id] = grid
+    return grid
+
+
+def next_level_id(level_id):
+    """Level after `level_id` in file order, wrapping back to the first"""
+    i = LEVEL_IDS.index(str(level_id))
+    return LEVEL_IDS[(i + 1) % len(LEVEL_IDS)]
+
+
+# Convert the first level's rows to a compact tile grid (walls, pellets,
+# markers). This copy is never played on: each game works on GRID.copy().
+try:
+    GRID = load_level("1")
+except json.JSONDecodeError as e:
+    print(f"Invalid JSON in maze file at line {e.lineno}, col {e.colno}: {e.msg}")
+    sys.exit(1)
 except KeyError as e:
     print(f"Missing expected key in maze file: {e}")
     sys.exit(1)
-except Exception as e:
-    print(f"Unexpected error loading maze: {e}")
+except ValueError as e:
+    print(f"Invalid map in maze file: {e}")
     sys.exit(1)
-    
 
-# Convart STRING TO LIST
-MAP_DATA = [[int(j) for j in i] for i in map01]
 
-MAP_WIDTH = len(MAP_DATA[0])
-MAP_HEIGHT = len(MAP_DATA)
+MAP_WIDTH = GRID.width
+MAP_HEIGHT = GRID.height
 
-SCREEN_WIDTH = MAP_WIDTH * TILE_SIZE
-SCREEN_HEIGHT = MAP_HEIGHT * TILE_SIZE
+# Largest window, in tiles; bigger maps scroll (see camera.Camera)
+MAX_VIEW_COLUMNS = 32
+MAX_VIEW_ROWS = 24
 
-# --- Pygame Initialization ---
 
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('Pacman')
+def screen_size(grid):
+    """Window size in pixels for a level: the whole map, up to the largest view"""
+    return (min(grid.width, MAX_VIEW_COLUMNS) * TILE_SIZE,
+            min(grid.height, MAX_VIEW_ROWS) * TILE_SIZE)
 
-# --- Functions ---
 
-def draw_smooth_map():
-    # --- Color Definitions ---
-    WALL_BORDER_COLOR = (0, 0, 255) # Blue (The border color)
-    WALL_BODY_COLOR = (216, 216, 230) # Light Blue (The wall interior color)
-    PATH_COLOR = (0, 0, 0) # Black
-    NORMAL_PILL_COLOR = (255, 255, 0) # Yellow
-    SPECIAL_PILL_COLOR = (255, 165, 0) # Orange/Power
+SCREEN_WIDTH, SCREEN_HEIGHT = screen_size(GRID)
 
-    # 1. Fill the entire screen with the WALL_BORDER_COLOR. 
-    # This acts as the *base layer* for both the walls' border and the path's background.
-    screen.fill(WALL_BORDER_COLOR)
+# --- Pygame Initialization ---
 
-    # Define the thickness of the border (e.g., 2 pixels on each side)
-    BORDER_THICKNESS = 4 
+# The window is created on demand so the game logic can be imported and run
+# without a display (see simulation.py).
+screen = None
 
-    for row_index, row in enumerate(MAP_DATA):
-        for col_index, tile_value in enumerate(row):
-            x = col_index * TILE_SIZE
-            y = row_index * TILE_SIZE
-            center_x = x + TILE_SIZE // 2
-            center_y = y + TILE_SIZE // 2
-
-            if tile_value == 1:
-                # --- WALL TILE DRAWING (Bordered) ---
-                # Draw the Light Blue wall body *inside* the Blue border area
-                
-                # New rectangle is shifted inward by BORDER_THICKNESS/2 
-                # and reduced in size by BORDER_THICKNESS to create the border effect.
-                wall_rect = pygame.Rect(
-                    x + BORDER_THICKNESS // 2, 
-                    y + BORDER_THICKNESS // 2, 
-                    TILE_SIZE - BORDER_THICKNESS, 
-                    TILE_SIZE - BORDER_THICKNESS
-                )
-                pygame.draw.rect(screen, WALL_BODY_COLOR, wall_rect)
-
-            elif tile_value in [0, 2, 3, 5, 6, 7, 8, 9]:
-                # --- PATH TILE DRAWING ---
-                # Draw a black rectangle that covers the tile space entirely
-                # (You used TILE_SIZE+4 previously, TILE_SIZE should be fine 
-                # unless you want overlapping paths)
-                path_rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                pygame.draw.rect(screen, PATH_COLOR, path_rect) 
-                
-                # Now, draw the pills on the black path
-                if tile_value == 2:
-                    PILL_RADIUS = 4
-                    pygame.draw.circle(screen, NORMAL_PILL_COLOR, (center_x, center_y), PILL_RADIUS)
-                
-                elif tile_value == 3:
-                    POWER_RADIUS = 8
-                    pygame.draw.circle(screen, SPECIAL_PILL_COLOR, (center_x, center_y), POWER_RADIUS)# --- Main Game Loop ---
+
+def init_display():
+    """Create the game window once and return its surface"""
+    global screen
+    if screen is None:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption('Pacman')
     return screen
 
+# --- Color Definitions ---
+WALL_BORDER_COLOR = (0, 0, 255) # Blue (The border color)
+WALL_BODY_COLOR = (216, 216, 230) # Light Blue (The wall interior color)
+PATH_COLOR = (0, 0, 0) # Black
+NORMAL_PILL_COLOR = (255, 255, 0) # Yellow
+SPECIAL_PILL_COLOR = (255, 165, 0) # Orange/Power
+
+# Define the thickness of the border (e.g., 2 pixels on each side)
+BORDER_THICKNESS = 4
+PILL_RADIUS = 4
+POWER_RADIUS = 8
 
+# --- Functions ---
+
+def draw_tile(surface, col_index, row_index, tile_value, pills=True):
+    """Draw one map tile (wall or path, plus its pill when `pills` is set)"""
+    x = col_index * TILE_SIZE
+    y = row_index * TILE_SIZE
+    center_x = x + TILE_SIZE // 2
+    center_y = y + TILE_SIZE // 2
+
+    # The WALL_BORDER_COLOR is the *base layer* for both the walls' border
+    # and the path's background.
+    surface.fill(WALL_BORDER_COLOR, (x, y, TILE_SIZE, TILE_SIZE))
+
+    if tile_value == 1:
+        # --- WALL TILE DRAWING (Bordered) ---
+        # Draw the Light Blue wall body *inside* the Blue border area
+
+        # New rectangle is shifted inward by BORDER_THICKNESS/2
+        # and reduced in size by BORDER_THICKNESS to create the border effect.
+        wall_rect = pygame.Rect(
+            x + BORDER_THICKNESS // 2,
+            y + BORDER_THICKNESS // 2,
+            TILE_SIZE - BORDER_THICKNESS,
+            TILE_SIZE - BORDER_THICKNESS
+        )
+        pygame.draw.rect(surface, WALL_BODY_COLOR, wall_rect)
+
+    elif tile_value in [0, 2, 3, 5, 6, 7, 8, 9]:
+        # --- PATH TILE DRAWING ---
+        # Draw a black rectangle that covers the tile space entirely
+        path_rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
+        pygame.draw.rect(surface, PATH_COLOR, path_rect)
+
+        # Now, draw the pills on the black path
+        if pills:
+            draw_pill(surface, col_index, row_index, tile_value)
+
+
+def draw_pill(surface, col_index, row_index, tile_value):
+    center_x = col_index * TILE_SIZE + TILE_SIZE // 2
+    center_y = row_index * TILE_SIZE + TILE_SIZE // 2
+    if tile_value == 2:
+        pygame.draw.circle(surface, NORMAL_PILL_COLOR, (center_x, center_y), PILL_RADIUS)
+    elif tile_value == 3:
+        pygame.draw.circle(surface, SPECIAL_PILL_COLOR, (center_x, center_y), POWER_RADIUS)
+
+
+def draw_smooth_map(surface=None, grid=None):
+    """Redraw the whole map; renderer.MazeRenderer caches this for the game loop"""
+    if surface is None:
+        surface = init_display()
+    if grid is None:
+        grid = GRID
+
+    for row_index, row in enumerate(grid.rows()):
+        for col_index, tile_value in enumerate(row):
+            draw_tile(surface, col_index, row_index, tile_value)
+    return surface
@@ -0,0 +1,192 @@
+"""Seeded procedural mazes in the maze.json tile vocabulary, for scale and soak tests.
+
+    python src/maze_gen.py 1001 --seed 7 --out data/generated.json
+    python src/maze_gen.py 301 --levels 3 --out data/generated.pack [--tables]
+
+Every step is a numpy operation over the whole tile array, so a million
+tiles take well under a second:
+
+1. Cells sit on odd (x, y); the tiles between them start out as walls.
+2. A binary-tree spanning tree: every cell opens the wall to its north or
+   its west neighbour (the first row and column have only one choice).
+   Every cell is then reachable from every other one.
+3. loop_chance of the remaining inner walls are opened, so there are
+   cycles to run around instead of a single tree.
+4. Each dead end opens one more (random) inner wall. Pac-Man mazes don't
+   have dead ends, and opening walls never disconnects anything.
+5. The tunnel rows (and columns) are opened at both map edges; the game
+   finds them from the map (topology.py). Power pills go in the
+   corner cells, the ghost spawn in the centre cell and Pacman's start
+   in the middle of the bottom row. Every other open tile holds a pill.
+
+Even sizes get one extra wall column/row on the right/bottom.
+"""
+import json
+import os
+import sys
+from functools import lru_cache
+import numpy as np
+from grid import Grid, EMPTY, WALL, PILL, POWER_PILL, GHOST_SPAWN, PACMAN_START
+
+# The hand-made levels' tunnel row, used by default
+TUNNEL_ROW = 9
+MIN_SIZE = 7
+DEFAULT_LOOP_CHANCE = 0.15
+
+
+def generate(width, height=None, seed=None, loop_chance=DEFAULT_LOOP_CHANCE, tunnel_rows=None,
+             tunnel_cols=()):
+    """(height, width) uint8 array of tile values for a connected maze.
+
+    tunnel_rows defaults to TUNNEL_ROW when the maze is tall enough for it.
+    """
+    if height is None:
+        height = width
+    if width < MIN_SIZE or height < MIN_SIZE:
+        raise ValueError(f"mazes are at least {MIN_SIZE}x{MIN_SIZE} tiles")
+    rng = np.random.default_rng(seed)
+    # Odd core; an even size is padded with walls afterwards
+    core_w = width - (1 - width % 2)
+    core_h = height - (1 - height % 2)
+    cells_w = (core_w - 1) // 2
+    cells_h = (core_h - 1) // 2
+
+    tiles = np.full((height, width), WALL, dtype=np.uint8)
+    tiles[1:core_h:2, 1:core_w:2] = PILL
+    # Walls north of / west of each cell (row 0 / column 0 are the border)
+    north = tiles[0:core_h - 1:2, 1:core_w:2]
+    west = tiles[1:core_h:2, 0:core_w - 1:2]
+
+    # Spanning tree: open north or west, never into the border
+    go_north = rng.random((cells_h, cells_w)) < 0.5
+    go_north[0, :] = False
+    go_north[1:, 0] = True
+    go_west = ~go_north
+    go_west[0, 0] = False
+    north[go_north] = PILL
+    west[go_west] = PILL
+
+    # Extra openings for loops (inner walls only)
+    inner_north = north[1:, :]
+    inner_west = west[:, 1:]
+    inner_north[(inner_north == WALL) & (rng.random(inner_north.shape) < loop_chance)] = PILL
+    inner_west[(inner_west == WALL) & (rng.random(inner_west.shape) < loop_chance)] = PILL
+
+    _remove_dead_ends(tiles, core_w, core_h, rng)
+
+    if tunnel_rows is None:
+        tunnel_rows = (TUNNEL_ROW,) if TUNNEL_ROW < core_h - 1 else ()
+    for row in tunnel_rows:
+        if row % 2 == 0 or not 0 < row < core_h - 1:
+            raise ValueError(f"tunnel row {row} is not a cell row of a {width}x{height} maze")
+        tiles[row, 0] = EMPTY
+        tiles[row, core_w - 1:] = EMPTY
+    for col in tunnel_cols:
+        if col % 2 == 0 or not 0 < col < core_w - 1:
+            raise ValueError(f"tunnel column {col} is not a cell column of a {width}x{height} maze")
+        tiles[0, col] = EMPTY
+        tiles[core_h - 1:, col] = EMPTY
+
+    last_x, last_y = core_w - 2, core_h - 2
+    for x, y in ((1, 1), (last_x, 1), (1, last_y), (last_x, last_y)):
+        tiles[y, x] = POWER_PILL
+    cx, cy = cells_w // 2 * 2 + 1, cells_h // 2 * 2 + 1
+    tiles[cy, cx] = GHOST_SPAWN
+    tiles[last_y, cx] = PACMAN_START
+    return tiles
+
+
+def _remove_dead_ends(tiles, core_w, core_h, rng):
+    # Wall between a cell and its neighbour, per direction: N, S, W, E
+    walls = [
+        tiles[0:core_h - 1:2, 1:core_w:2],
+        tiles[2:core_h:2, 1:core_w:2],
+        tiles[1:core_h:2, 0:core_w - 1:2],
+        tiles[1:core_h:2, 2:core_w:2],
+    ]
+    closed = np.stack([w == WALL for w in walls])
+    # Border walls can't be opened
+    openable = closed.copy()
+    openable[0, 0, :] = False
+    openable[1, -1, :] = False
+    openable[2, :, 0] = False
+    openable[3, :, -1] = False
+    dead_end = (~closed).sum(axis=0) == 1
+    # Random pick among each cell's openable walls
+    keys = np.where(openable, rng.random(closed.shape), 2.0)
+    choice = keys.argmin(axis=0)
+    for direction, wall in enumerate(walls):
+        wall[dead_end & (choice == direction) & (keys[direction] < 2.0)] = PILL
+
+
+def to_rows(tiles):
+    """maze.json style rows ("1222...") from a tile array"""
+    width = tiles.shape[1]
+    text = (tiles + ord("0")).astype(np.uint8).tobytes().decode("ascii")
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+
+def to_grid(tiles):
+    height, width = tiles.shape
+    return Grid(width, height, tiles.tobytes())
+
+
+@lru_cache(maxsize=8)
+def _cached_tiles(width, height, seed):
+    tiles = generate(width, height, seed)
+    tiles.setflags(write=False)
+    return tiles
+
+
+def grid_of_size(width, height=None, seed=0):
+    """A fresh Grid of a generated maze; the same (size, seed) is generated once per process"""
+    if height is None:
+        height = width
+    return to_grid(_cached_tiles(width, height, seed))
+
+
+def levels_json(levels):
+    """maze.json bytes for {level_id: tile array}"""
+    data = {str(level_id): {"map": to_rows(tiles)} for level_id, tiles in levels.items()}
+    return json.dumps(data, indent=1).encode("utf-8")
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Procedural maze generator")
+    parser.add_argument("width", type=int)
+    parser.add_argument("height", type=int, nargs="?", default=None)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first level (then seed+1, ...)")
+    parser.add_argument("--levels", type=int, default=1)
+    parser.add_argument("--loops", type=float, default=DEFAULT_LOOP_CHANCE,
+                        help="chance of opening each inner wall left by the spanning tree")
+    parser.add_argument("--out", default=None, help=".json (maze.json layout) or .pack (compiled level pack)")
+    parser.add_argument("--tables", action="store_true", help="with a .pack: include the NavTables")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        levels = {str(i + 1): generate(args.width, args.height, args.seed + i, args.loops)
+                  for i in range(args.levels)}
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    tiles = levels["1"]
+    print(f"Generated {args.levels} x {tiles.shape[1]}x{tiles.shape[0]} "
+          f"({tiles.size * args.levels} tiles) in {elapsed:.2f}s")
+    if args.out is None:
+        if tiles.size <= 80 * 80:
+            print("\n".join(to_rows(tiles)))
+        sys.exit(0)
+    maze_bytes = levels_json(levels)
+    if os.path.splitext(args.out)[1] == ".pack":
+        from levelpack import build_pack
+        start = time.perf_counter()
+        size = build_pack(maze_bytes, args.out, args.tables)
+        print(f"Wrote {args.out} ({size} bytes) in {time.perf_counter() - start:.2f}s")
+    else:
+        with open(args.out, "wb") as f:
+            f.write(maze_bytes)
+        print(f"Wrote {args.out} ({len(maze_bytes)} bytes)")
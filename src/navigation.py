@@ -0,0 +1,398 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from maze import GRID, LEVEL_PACK
+from levelpack import PackError
+from ghost import (
+    build_graph,
+    build_return_graph,
+    direction_between,
+    is_walkable,
+    nearest_node_from_tile,
+)
+from planner import MAX_TREES, Planner, SearchTree, node_astar, tile_astar
+from topology import get_topology
+
+# Direction codes stored in the table
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)]
+STAY = 4  # already at the target node (or it is unreachable): stand still
+NO_DIRECTION = 255
+DIRECTION_CODES = {d: i for i, d in enumerate(DIRECTIONS)}
+UNREACHABLE = 0xFFFF
+
+# Refuse to build tables larger than this; callers fall back to dijkstra()
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Bump when build_graph() output changes so existing cache files are rebuilt
+GRAPH_CACHE_VERSION = 3
+CACHE_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "cache"))
+
+
+def grid_key(grid):
+    """Hash of a grid's size and walls (pellets don't affect navigation)"""
+    h = hashlib.sha256(f"{grid.width}x{grid.height}:".encode("ascii"))
+    h.update(grid.walkable)
+    return h.hexdigest()
+
+
+class NavGraph:
+    """Node graph of one maze (nodes + weighted adjacency), shared by all ghosts."""
+
+    def __init__(self, nodes, adj, key=None, grid=None):
+        self.nodes = nodes
+        self.adj = adj
+        self.key = key
+        self.grid = grid
+        # Return-to-base graphs, one per spawn tile
+        self._return_graphs = {}
+        self.reset_planners()
+
+    def return_graph(self, spawn_tile):
+        if spawn_tile not in self._return_graphs:
+            self._return_graphs[spawn_tile] = build_return_graph(
+                self.nodes, self.adj, spawn_tile, self.grid
+            )
+        return self._return_graphs[spawn_tile]
+
+    def reset_planners(self, max_trees=MAX_TREES, astar=None):
+        """Fresh search planners (planner.py) shared by the ghosts: nodes, tiles, and per spawn.
+
+        Graphs with more nodes (tiles) than max_trees search with A*, since a
+        kept tree per start wouldn't fit; astar=True/False forces either way.
+        """
+        adj = self.adj
+        self.topology = topology = get_topology(self.grid if self.grid is not None else GRID)
+        neighbors = topology.neighbors
+        self.max_trees = max_trees
+        self.use_astar = len(self.nodes) > max_trees if astar is None else astar
+        tile_astar_ok = sum(topology.walkable) > max_trees if astar is None else astar
+        self.planner = Planner(lambda u: adj.get(u, ()), max_trees=max_trees,
+                               astar=node_astar(adj, topology) if self.use_astar else None)
+        self.tile_planner = Planner(lambda tile: neighbors(*tile), weighted=False, max_trees=max_trees,
+                                    astar=tile_astar(topology) if tile_astar_ok else None)
+        self._return_planners = {}
+
+    def return_planner(self, spawn_tile):
+        planner = self._return_planners.get(spawn_tile)
+        if planner is None:
+            adj = self.return_graph(spawn_tile)[1]
+            planner = self._return_planners[spawn_tile] = Planner(
+                lambda u: adj.get(u, ()), max_trees=self.max_trees,
+                astar=node_astar(adj, self.topology) if self.use_astar else None,
+            )
+        return planner
+
+    def to_json(self):
+        return {
+            "version": GRAPH_CACHE_VERSION,
+            "key": self.key,
+            "nodes": [list(n) for n in self.nodes],
+            "adj": [[u[0], u[1], [[v[0], v[1], w] for v, w in vs]] for u, vs in self.adj.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data, key, grid=None):
+        if data.get("version") != GRAPH_CACHE_VERSION or data.get("key") != key:
+            raise ValueError("cache was built for another maze or format version")
+        nodes = {(x, y) for x, y in data["nodes"]}
+        adj = {(x, y): [((vx, vy), w) for vx, vy, w in vs] for x, y, vs in data["adj"]}
+        return cls(nodes, adj, key, grid)
+
+
+def _packed_level(key):
+    """levelpack.PackedLevel with the walls `key` and a current graph, or None"""
+    if LEVEL_PACK is None:
+        return None
+    try:
+        level = LEVEL_PACK.level_for_key(key)
+    except PackError as e:
+        print("Level pack:", e)
+        return None
+    if level is None or level.graph_version != GRAPH_CACHE_VERSION:
+        return None
+    return level
+
+
+# Graphs already built or loaded in this process, by grid_key(), least
+# recently used first. Each one carries its planners' search state, so only
+# the last few mazes are kept (soak and batch runs go through hundreds).
+MAX_GRAPHS = 8
+_graphs = OrderedDict()
+_graphs_lock = threading.Lock()
+
+
+def graph_cache_path(key):
+    return os.path.join(CACHE_DIR, f"navgraph-{key[:16]}.json")
+
+
+def prune_graph_cache(keep=MAX_GRAPHS):
+    """Delete all but the `keep` most recently used graph files (loads touch them)"""
+    try:
+        names = [n for n in os.listdir(CACHE_DIR) if n.startswith("navgraph-") and n.endswith(".json")]
+        paths = sorted((os.path.join(CACHE_DIR, n) for n in names), key=os.path.getmtime, reverse=True)
+    except OSError:
+        return
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Gone already (another process pruning too)
+            pass
+
+
+def load_or_build_graph(grid=None, use_disk_cache=True):
+    """Load the graph for `grid` from the disk cache, rebuilding it if missing or stale"""
+    if grid is None:
+        grid = GRID
+    key = grid_key(grid)
+    # A compiled level pack already has the graph
+    packed = _packed_level(key)
+    if packed is not None:
+        return packed.nav_graph(grid)
+
+    path = graph_cache_path(key)
+    if use_disk_cache:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                graph = NavGraph.from_json(json.load(f), key, grid)
+            try:
+                # Most recently used now, so pruning keeps it
+                os.utime(path)
+            except OSError:
+                pass
+            return graph
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Rebuilding nav graph cache {path}: {e}")
+
+    nodes, adj = build_graph(grid)
+    graph = NavGraph(nodes, adj, key, grid)
+    if use_disk_cache:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(graph.to_json(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("Could not write nav graph cache:", e)
+        # One file per maze ever seen would pile up over soak and bench runs
+        prune_graph_cache()
+    return graph
+
+
+def get_nav_graph(grid=None, use_disk_cache=True):
+    """Graph for `grid` (default: the current maze), built or loaded once per process"""
+    if grid is None:
+        grid = GRID
+    key = grid_key(grid)
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is not None:
+            _graphs.move_to_end(key)
+            return graph
+    graph = load_or_build_graph(grid, use_disk_cache)
+    with _graphs_lock:
+        # Loaded by another thread meanwhile: keep the one already handed out
+        graph = _graphs.setdefault(key, graph)
+        _graphs.move_to_end(key)
+        while len(_graphs) > MAX_GRAPHS:
+            _graphs.popitem(last=False)
+    return graph
+
+
+def _dijkstra_tree(adj, start):
+    """Full single-source version of ghost.dijkstra(); returns the parent map.
+
+    SearchTree pops in the same order as dijkstra(), so for every goal the
+    path read from this tree is the path dijkstra(adj, start, goal) returns.
+    """
+    tree = SearchTree(start, lambda u: adj.get(u, ()))
+    while tree.expand():
+        pass
+    return tree.parent
+
+
+def _step_to_nearest_node(tile, nodes, grid=None):
+    """First step of the BFS Ghost._next_tile_to_nearest_node() performs."""
+    neighbors = get_topology(grid if grid is not None else GRID).neighbors
+    tree = SearchTree(tile, lambda t: neighbors(*t), weighted=False)
+    found = tree.nearest(nodes)
+    return None if found is None else tree.first_step(found)
+
+
+class NavTableTooLarge(ValueError):
+    """The level has too many tiles for a NavTable within the byte limit"""
+
+
+class NavTable:
+    """All-pairs (walkable tile, target tile) -> next direction and distance.
+
+    Built once per level from the node graph. The direction for a pair is the
+    one Ghost.recompute_path_if_needed() would pick when chasing a Pacman on
+    the target tile; the distance is the shortest walking distance in tiles,
+    tunnel wrap included. Both live in flat arrays indexed by
+    source * size + target: one byte plus one uint16 per pair.
+    """
+
+    def __init__(self, nodes, adj, max_bytes=DEFAULT_MAX_BYTES, grid=None):
+        self.grid = grid = grid if grid is not None else GRID
+        self.tiles = [
+            (x, y) for y in range(grid.height) for x in range(grid.width) if is_walkable(x, y, grid)
+        ]
+        self.size = n = len(self.tiles)
+        needed = n * n * 3
+        if needed > max_bytes:
+            raise NavTableTooLarge(
+                f"nav table for {n} tiles needs {needed} bytes (limit {max_bytes})"
+            )
+        self.index = {tile: i for i, tile in enumerate(self.tiles)}
+        self.directions = bytearray([NO_DIRECTION]) * (n * n)
+        self.distances = array("H", [UNREACHABLE]) * (n * n)
+        self._fill_distances()
+        self._fill_directions(nodes, adj)
+
+    @classmethod
+    def for_grid(cls, grid=None, max_bytes=DEFAULT_MAX_BYTES):
+        graph = get_nav_graph(grid)
+        packed = _packed_level(graph.key)
+        if packed is not None:
+            table = packed.nav_table(graph.grid)
+            if table is not None:
+                return table
+        return cls(graph.nodes, graph.adj, max_bytes=max_bytes, grid=graph.grid)
+
+    @classmethod
+    def from_arrays(cls, tiles, directions, distances, grid):
+        """Table over prebuilt arrays (e.g. memoryviews into a level pack)"""
+        table = cls.__new__(cls)
+        table.grid = grid
+        table.tiles = tiles
+        table.size = len(tiles)
+        table.index = {tile: i for i, tile in enumerate(tiles)}
+        table.directions = directions
+        table.distances = distances
+        return table
+
+    @classmethod
+    def for_current_map(cls, max_bytes=DEFAULT_MAX_BYTES):
+        return cls.for_grid(None, max_bytes)
+
+    @property
+    def nbytes(self):
+        """Bytes used by the direction and distance arrays"""
+        return len(self.directions) + self.distances.itemsize * len(self.distances)
+
+    def describe(self):
+        return f"nav table: {self.size} tiles, {self.size * self.size} pairs, {self.nbytes / 1024:.1f} KiB"
+
+    def _fill_distances(self):
+        n = self.size
+        index = self.index
+        distances = self.distances
+        neighbors = get_topology(self.grid).neighbors
+        for s, tile in enumerate(self.tiles):
+            row = s * n
+            distances[row + s] = 0
+            dq = deque([tile])
+            seen = {tile: 0}
+            while dq:
+                cur = dq.popleft()
+                d = seen[cur] + 1
+                for nb in neighbors(*cur):
+                    if nb not in seen:
+                        seen[nb] = d
+                        distances[row + index[nb]] = min(d, UNREACHABLE - 1)
+                        dq.append(nb)
+
+    def _fill_directions(self, nodes, adj):
+        n = self.size
+        tiles = self.tiles
+        directions = self.directions
+        grid = self.grid
+        # Chase target of every tile: its nearest graph node
+        target_nodes = [nearest_node_from_tile(t, nodes, grid) for t in tiles]
+
+        for s, tile in enumerate(tiles):
+            row = s * n
+            if tile not in nodes:
+                # Off-graph ghosts head for the nearest node whatever the target
+                step = _step_to_nearest_node(tile, nodes, grid)
+                code = NO_DIRECTION if step is None else DIRECTION_CODES[direction_between(tile, step, grid)]
+                directions[row:row + n] = bytes([code]) * n
+                continue
+
+            prev = _dijkstra_tree(adj, tile)
+            first_hop = {}
+
+            def hop(goal):
+                # First node after `tile` on the tree path to goal (memoized)
+                chain = []
+                while goal not in first_hop:
+                    parent = prev[goal]
+                    if parent == tile:
+                        first_hop[goal] = goal
+                        break
+                    chain.append(goal)
+                    goal = parent
+                result = first_hop[goal]
+                for g in chain:
+                    first_hop[g] = result
+                return result
+
+            for t, goal in enumerate(target_nodes):
+                if goal == tile or goal not in prev:
+                    # dijkstra() returns [start]: the ghost stops
+                    directions[row + t] = STAY
+                else:
+                    directions[row + t] = DIRECTION_CODES[direction_between(tile, hop(goal), grid)]
+
+    def lookup(self, tile, target):
+        """Return the (dx, dy) to take from `tile` when chasing `target`, or None"""
+        s = self.index.get(tile)
+        t = self.index.get(target)
+        if s is None or t is None:
+            return None
+        code = self.directions[s * self.size + t]
+        if code == NO_DIRECTION:
+            return None
+        return DIRECTIONS[code]
+
+    def distance(self, tile, target):
+        """Walking distance in tiles, or None if unreachable/unknown"""
+        s = self.index.get(tile)
+        t = self.index.get(target)
+        if s is None or t is None:
+            return None
+        d = self.distances[s * self.size + t]
+        return None if d == UNREACHABLE else d
+
+
+if __name__ == "__main__":
+    # Startup timing with and without the on-disk graph cache
+    from ghost import Ghost
+
+    def timed(label, fn, repeat=20):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        print(f"{label}: {(time.perf_counter() - start) / repeat * 1000:.2f} ms")
+        return result
+
+    timed("build_graph (no cache)", lambda: load_or_build_graph(use_disk_cache=False))
+    load_or_build_graph()  # make sure the cache file exists
+    timed("load from disk cache", lambda: load_or_build_graph())
+
+    def spawn_ghosts():
+        _graphs.clear()
+        return [Ghost() for _ in range(4)]
+
+    timed("4 ghosts, shared graph (cold process cache)", spawn_ghosts)
+    timed("4 ghosts, shared graph (warm process cache)", lambda: [Ghost() for _ in range(4)])
+    table = timed("nav table", NavTable.for_current_map, repeat=1)
+    print(table.describe())
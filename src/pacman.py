@@ -1,15 +1,82 @@
 import pygame
 import time
 import math
-from maze import MAP_DATA, TILE_SIZE, MAP_WIDTH, MAP_HEIGHT, screen
+from maze import GRID, TILE_SIZE
+from grid import PACMAN_START, POWER_PILL
+from topology import get_topology
+
+PACMAN_COLOR = (255, 255, 0)
+# The mouth opening (0-60 degrees) is quantized to this many frames
+MOUTH_FRAMES = 16
+MAX_MOUTH_ANGLE = 60
+# direction angle for each (dx, dy)
+DIRECTION_ANGLES = {(1, 0): 0, (-1, 0): 180, (0, -1): 90, (0, 1): 270}
+
+# radius -> {direction angle or None: [frame surfaces]}
+_frame_cache = {}
+
+
+def render_pacman_frame(radius, direction_angle, mouth_angle):
+    """Render one Pacman frame on a transparent surface centred at (radius + 1, radius + 1)"""
+    c = radius + 1
+    surface = pygame.Surface((2 * c + 1, 2 * c + 1), pygame.SRCALPHA)
+    if direction_angle is None:
+        # Stationary - full circle
+        pygame.draw.circle(surface, PACMAN_COLOR, (c, c), radius)
+        return surface
+
+    # Draw Pacman as a filled arc (pie slice)
+    points = []
+    num_points = 30
+
+    # Start at center
+    points.append((c, c))
+
+    # Calculate the large arc (the Pacman body, not the mouth)
+    start_rad = math.radians(direction_angle + mouth_angle / 2)
+    end_rad = math.radians(direction_angle - mouth_angle / 2 + 360)
+
+    # Generate points along the arc
+    for i in range(num_points + 1):
+        t = i / num_points
+        angle = start_rad + (end_rad - start_rad) * t
+        x = c + radius * math.cos(angle)
+        y = c - radius * math.sin(angle)  # Negative because pygame y increases downward
+        points.append((x, y))
+
+    pygame.draw.polygon(surface, PACMAN_COLOR, points)
+    return surface
+
+
+def get_pacman_frames(radius):
+    """Frames for every direction and mouth opening, rendered once per radius.
+
+    Frames depend on nothing but the radius, so nothing else invalidates
+    them; clear_frame_cache() drops them all.
+    """
+    frames = _frame_cache.get(radius)
+    if frames is None:
+        frames = {None: [render_pacman_frame(radius, None, 0)]}
+        for angle in DIRECTION_ANGLES.values():
+            frames[angle] = [
+                render_pacman_frame(radius, angle, MAX_MOUTH_ANGLE * i / (MOUTH_FRAMES - 1))
+                for i in range(MOUTH_FRAMES)
+            ]
+        _frame_cache[radius] = frames
+    return frames
+
+
+def clear_frame_cache():
+    _frame_cache.clear()
 
-# Defer font/text creation until pygame font is initialized
-font = None
-text_surface = None
-text_rect = None
 
 class Pacman:
-    def __init__(self):
+    def __init__(self, grid=None):
+        # Tile grid this Pacman plays on (pellets are eaten from it). Without
+        # one it gets its own copy of maze.GRID, which others still read pristine
+        self.grid = grid if grid is not None else GRID.copy()
+        # Neighbour table and tunnels of this level's walls
+        self.topology = get_topology(self.grid)
         # Find Pacman's starting position (tile with value 9 in maze)
         self.start_pos = self.find_start_position()
         self.reset_position()
@@ -39,18 +106,17 @@ class Pacman:
         self.in_tunnel = False
         # Power pellet flag (set true for a single frame when eaten)
         self.last_ate_power = False
-        
-        print(f"Pacman starting at tile: {self.start_pos}")
+        # Tiles whose pellet was eaten since the renderer last looked
+        self.eaten_tiles = []
 
     def find_start_position(self):
         """Find Pacman's starting position (tile with value 9)"""
-        for y in range(MAP_HEIGHT):
-            for x in range(MAP_WIDTH):
-                if MAP_DATA[y][x] == 9:  # 9 indicates Pacman starting position
-                    # Clear the starting marker
-                    MAP_DATA[y][x] = 0
-                    return x, y
-        
+        start = self.grid.find(PACMAN_START)  # 9 indicates Pacman starting position
+        if start is not None:
+            # Clear the starting marker
+            self.grid.set(start[0], start[1], 0)
+            return start
+
         # Fallback if no 9 found
         print("Warning: Pacman start position (9) not found, using default")
         return 9, 1
@@ -73,9 +139,7 @@ class Pacman:
 
     def get_tile_at(self, x, y):
         """Get tile value at coordinates"""
-        if 0 <= x < MAP_WIDTH and 0 <= y < MAP_HEIGHT:
-            return MAP_DATA[y][x]
-        return 1  # Treat out of bounds as wall
+        return self.grid.get(x, y)  # Out of bounds counts as wall
 
     def is_wall(self, x, y):
         """Check if tile is a wall"""
@@ -86,32 +150,66 @@ class Pacman:
         if dx == 0 and dy == 0:
             return False
         
+        # Walls and tunnels both come from the precomputed neighbour table
         current_x, current_y = self.current_tile()
-        next_x = current_x + dx
-        next_y = current_y + dy
-        
-        # Special case: tunnels (row 9)
-        if next_y == 9:  # Tunnel row
-            if next_x < 0 or next_x >= MAP_WIDTH:
-                return True
-        
-        # Check if next tile is within bounds
-        if 0 <= next_x < MAP_WIDTH and 0 <= next_y < MAP_HEIGHT:
-            return not self.is_wall(next_x, next_y)
-        
-        return False
+        return self.topology.step(current_x, current_y, dx, dy) is not None
 
-    def handle_input(self, event):
-        """Handle keyboard input for movement"""
+    def queue_direction(self, dx, dy):
+        """Queue the next direction; applied at the next tile center"""
+        self.next_dx, self.next_dy = dx, dy
+
+    @staticmethod
+    def direction_for_event(event):
+        """(dx, dy) for an arrow key press, else None"""
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_UP:
-                self.next_dx, self.next_dy = 0, -1
+                return 0, -1
             elif event.key == pygame.K_DOWN:
-                self.next_dx, self.next_dy = 0, 1
+                return 0, 1
             elif event.key == pygame.K_LEFT:
-                self.next_dx, self.next_dy = -1, 0
+                return -1, 0
             elif event.key == pygame.K_RIGHT:
-                self.next_dx, self.next_dy = 1, 0
+                return 1, 0
+        return None
+
+    def handle_input(self, event):
+        """Handle keyboard input for movement"""
+        direction = self.direction_for_event(event)
+        if direction is not None:
+            self.queue_direction(*direction)
+
+    def _arrive_at_center(self, current_x, current_y):
+        """Eat the pellet here and take the queued turn (Pacman is at the tile centre)"""
+        # Eat pellet at current position and count it
+        if self.grid.in_bounds(current_x, current_y):
+            tile_value = self.grid.eat(current_x, current_y)
+            if tile_value:
+                self.eaten_tiles.append((current_x, current_y))
+                if tile_value == POWER_PILL:
+                    self.pallet_count += 50
+                    self.last_ate_power = True
+                else:
+                    self.pallet_count += 10
+
+        # Try to change to queued direction if it's valid
+        if self.can_move_in_direction(self.next_dx, self.next_dy):
+            self.dx, self.dy = self.next_dx, self.next_dy
+            # Clear queued direction
+            self.next_dx = 0
+            self.next_dy = 0
+
+    def _distance_to_next_center(self):
+        """Pixels to the next tile centre ahead (None when not moving)"""
+        center = TILE_SIZE // 2
+        if self.dx:
+            offset = self.px % TILE_SIZE
+            ahead = (center - offset) % TILE_SIZE if self.dx > 0 else (offset - center) % TILE_SIZE
+        elif self.dy:
+            offset = self.py % TILE_SIZE
+            ahead = (center - offset) % TILE_SIZE if self.dy > 0 else (offset - center) % TILE_SIZE
+        else:
+            return None
+        return ahead or TILE_SIZE
 
     def update(self):
         """Update Pacman's position - SIMPLE AND RELIABLE"""
@@ -137,33 +235,29 @@ class Pacman:
             # Snap to exact center
             self.px = current_x * TILE_SIZE + center_x
             self.py = current_y * TILE_SIZE + center_y
-            
-            # Eat pellet at current position and count it
-            if 0 <= current_x < MAP_WIDTH and 0 <= current_y < MAP_HEIGHT:
-                tile_value = MAP_DATA[current_y][current_x]
-                if tile_value == 2 or tile_value == 3:
-                    MAP_DATA[current_y][current_x] = 0
-                    if tile_value == 2:
-                        self.pallet_count += 10
-                    else:
-                        self.pallet_count += 50
-                        self.last_ate_power = True
-                    # screen.blit()
-            
-            # Try to change to queued direction if it's valid
-            if self.can_move_in_direction(self.next_dx, self.next_dy):
-                self.dx, self.dy = self.next_dx, self.next_dy
-                # Clear queued direction
-                self.next_dx = 0
-                self.next_dy = 0
+            self._arrive_at_center(current_x, current_y)
         
         # Handle tunnel teleportation
         self.handle_tunnel()
-        
+
+        # A step that runs past a tile centre stops there first (eat, turn),
+        # so a bigger step can't skip a pellet or a turn
+        distance = self.speed
+        ahead = self._distance_to_next_center()
+        while ahead is not None and ahead < distance and self.can_move_in_direction(self.dx, self.dy):
+            self.px += self.dx * ahead
+            self.py += self.dy * ahead
+            distance -= ahead
+            current_x, current_y = self.current_tile()
+            is_at_center = True
+            self._arrive_at_center(current_x, current_y)
+            self.handle_tunnel()
+            ahead = self._distance_to_next_center()
+
         # Check if we can continue moving in current direction
         if self.can_move_in_direction(self.dx, self.dy):
-            self.px += self.dx * self.speed
-            self.py += self.dy * self.speed
+            self.px += self.dx * distance
+            self.py += self.dy * distance
         else:
             # If we can't move, stop and snap to center
             if is_at_center:
@@ -173,124 +267,68 @@ class Pacman:
                 # Move to center first, then stop
                 if self.dx > 0:
                     if self.px < current_x * TILE_SIZE + center_x:
-                        self.px += self.speed
+                        self.px += distance
                     else:
                         self.px = current_x * TILE_SIZE + center_x
                         self.dx = 0
                 elif self.dx < 0:
                     if self.px > current_x * TILE_SIZE + center_x:
-                        self.px -= self.speed
+                        self.px -= distance
                     else:
                         self.px = current_x * TILE_SIZE + center_x
                         self.dx = 0
                 elif self.dy > 0:
                     if self.py < current_y * TILE_SIZE + center_y:
-                        self.py += self.speed
+                        self.py += distance
                     else:
                         self.py = current_y * TILE_SIZE + center_y
                         self.dy = 0
                 elif self.dy < 0:
                     if self.py > current_y * TILE_SIZE + center_y:
-                        self.py -= self.speed
+                        self.py -= distance
                     else:
                         self.py = current_y * TILE_SIZE + center_y
                         self.dy = 0
 
     def handle_tunnel(self):
         """Handle tunnel teleportation - SIMPLE VERSION"""
-        # Check if we're in the tunnel row (row 9)
+        # Tunnels are the rows/columns open at both map edges (see topology.py)
         current_x, current_y = self.current_tile()
-        
-        if current_y != 9:
+        in_row = current_y in self.topology.tunnel_rows
+        in_col = current_x in self.topology.tunnel_cols
+
+        if not (in_row or in_col):
             self.in_tunnel = False
             return
         
-        # Get pixel position within tile
-        pixel_in_tile = self.px % TILE_SIZE
-        
         # Check if at left tunnel entrance and moving left
-        if current_x == 0 and self.dx < 0:
-            # When we reach the left side of the tile
-            if pixel_in_tile < TILE_SIZE // 2:
-                # Teleport to right side
-                self.px = (MAP_WIDTH - 1) * TILE_SIZE + TILE_SIZE // 2
+        # (past the middle of the edge tile, or off the map after a big step)
+        if in_row and self.px < TILE_SIZE // 2 and self.dx < 0:
+            # Teleport to right side
+            self.px = (self.grid.width - 1) * TILE_SIZE + TILE_SIZE // 2
         
         # Check if at right tunnel entrance and moving right
-        elif current_x == MAP_WIDTH - 1 and self.dx > 0:
-            # When we reach the right side of the tile
-            if pixel_in_tile > TILE_SIZE // 2:
-                # Teleport to left side
-                self.px = TILE_SIZE+10 // 2
-
-    def draw(self):
-        """Draw Pacman and pallet_count text in the top tile"""
-        # Lazily initialize font once
-        global font
-        if font is None:
-            try:
-                if not pygame.font.get_init():
-                    pygame.font.init()
-                font = pygame.font.Font("src/fonts/CascadiaCode-VariableFont_wght.ttf", 22)
-            except Exception as e:
-                print("Font init failed:", e)
-        # Calculate mouth opening
-        if self.dx == 0 and self.dy == 0:
-            # Closed mouth when stationary
-            mouth_angle = 0
+        elif in_row and self.px > (self.grid.width - 1) * TILE_SIZE + TILE_SIZE // 2 and self.dx > 0:
+            # Teleport to left side
+            self.px = TILE_SIZE // 2
+
+        # Same for the top and bottom of a column tunnel
+        if in_col and self.py < TILE_SIZE // 2 and self.dy < 0:
+            self.py = (self.grid.height - 1) * TILE_SIZE + TILE_SIZE // 2
+        elif in_col and self.py > (self.grid.height - 1) * TILE_SIZE + TILE_SIZE // 2 and self.dy > 0:
+            self.py = TILE_SIZE // 2
+
+    def draw(self, screen, offset=(0, 0)):
+        """Draw Pacman (the score is drawn by hud.Hud); `offset` is the camera's top-left"""
+        # Pick the pre-rendered frame for the direction and mouth opening
+        direction_angle = DIRECTION_ANGLES.get((self.dx, self.dy))
+        frames = get_pacman_frames(self.radius)[direction_angle]
+        if direction_angle is None:
+            # Stationary - full circle
+            frame = frames[0]
         else:
             # Animated mouth (0-60 degrees)
             mouth_angle = 30 + 30 * math.sin(self.mouth_phase)
-
-        center_x = int(self.px)
-        center_y = int(self.py)
-
-        # Determine direction for mouth
-        if self.dx == 1:  # Right
-            direction_angle = 0
-        elif self.dx == -1:  # Left
-            direction_angle = 180
-        elif self.dy == -1:  # Up
-            direction_angle = 90
-        elif self.dy == 1:  # Down
-            direction_angle = 270
-        else:
-            # Stationary - draw full circle
-            pygame.draw.circle(screen, (255, 255, 0), (center_x, center_y), self.radius)
-            # Render dynamic pallet_count in the top-left tile
-            if font:
-                title_surface = font.render(str(self.pallet_count), True, (0, 255, 0))
-                screen.blit(title_surface, (0, 0))
-            return
-
-        # Draw Pacman as a filled arc (pie slice)
-        points = []
-        num_points = 30
-
-        # Start at center
-        points.append((center_x, center_y))
-
-        # Calculate the large arc (the Pacman body, not the mouth)
-        start_angle = direction_angle + mouth_angle / 2
-        end_angle = direction_angle - mouth_angle / 2 + 360
-
-        # Convert to radians
-        start_rad = math.radians(start_angle)
-        end_rad = math.radians(end_angle)
-
-        # Generate points along the arc
-        for i in range(num_points + 1):
-            t = i / num_points
-            angle = start_rad + (end_rad - start_rad) * t
-
-            x = center_x + self.radius * math.cos(angle)
-            y = center_y - self.radius * math.sin(angle)  # Negative because pygame y increases downward
-
-            points.append((x, y))
-
-        # Draw the filled polygon
-        pygame.draw.polygon(screen, (255, 255, 0), points)
-
-        # Render dynamic pallet_count in the top-left tile each frame
-        if font:
-            title_surface = font.render(str(self.pallet_count), True, (0, 255, 0))
-            screen.blit(title_surface, (0, 0))
+            frame = frames[round(mouth_angle / MAX_MOUTH_ANGLE * (MOUTH_FRAMES - 1))]
+        half = self.radius + 1
+        screen.blit(frame, (int(self.px) - offset[0] - half, int(self.py) - offset[1] - half))
@@ -0,0 +1,153 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 2
+
+
+class PlanWorkers:
+    """Ghost path searches on a small thread pool, a node ahead of the ghost.
+
+    When a ghost leaves a node it submit()s the search for the node it is
+    heading to, toward where its target is at that moment, and picks the
+    answer up with result() on arrival. The search runs while the ghost
+    walks the corridor, so a burst of replans on one frame costs the frame
+    almost nothing. An answer that isn't ready on arrival is waited for, so
+    a ghost never walks through a junction without its plan.
+
+    Python runs one thread at a time, so this moves the searches off the
+    frame rather than making them faster: the workers get the time the game
+    thread spends waiting for the display and the frame clock. Searches only
+    read what they were given when submitted, so a seeded game plays the
+    same however the threads are scheduled (replays and batch runs match).
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ghost-plan")
+        # Futures submitted and not yet taken or dropped
+        self._pending = set()
+        self.submitted = 0
+        # Answers ready on arrival, answers waited for (and for how long), answers not used
+        self.ready = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.dropped = 0
+
+    def submit(self, fn, *args):
+        """Run fn(*args) on a worker; returns the future to hand to result() or drop()"""
+        self.submitted += 1
+        future = self._executor.submit(fn, *args)
+        self._pending.add(future)
+        return future
+
+    def result(self, future):
+        """The search's answer, waiting for it if need be (worker errors are raised here)"""
+        self._pending.discard(future)
+        if future.done():
+            self.ready += 1
+            return future.result()
+        self.waited += 1
+        start = time.perf_counter()
+        try:
+            return future.result()
+        finally:
+            self.wait_seconds += time.perf_counter() - start
+
+    def drop(self, future):
+        """The answer won't be used (the ghost changed mode or was reset)"""
+        self._pending.discard(future)
+        future.cancel()
+        self.dropped += 1
+
+    def discard(self):
+        """Forget every search in flight (the ghosts that asked are gone, e.g. a new level)"""
+        for future in self._pending:
+            future.cancel()
+        self._pending = set()
+
+    def pending(self):
+        return len(self._pending)
+
+    def shutdown(self):
+        self.discard()
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    # 1. Ghosts on the pool must still chase like inline ones (tiles walked,
+    #    lives taken), paced or not, and the game must not depend on thread
+    #    timing. Exits non-zero if any check fails.
+    # 2. Tick time on big maps, inline vs on the pool. Frames are paced like
+    #    the game's (a tick, then wait out the rest of the frame), since that
+    #    wait is where the workers get to run.
+    import random
+    import sys
+    from maze_gen import grid_of_size
+    from simulation import Simulation, TICK_RATE, greedy_controller, random_controller
+
+    frame_seconds = 1.0 / TICK_RATE
+
+    def play(pool, ticks, grid=None, count=4, paced=False, ghost_ai="dijkstra", seed=5, lives=10 ** 9,
+             controller=None):
+        """Seeded game: (ghost tile moves, lives lost, sorted tick times, state hash, workers)"""
+        workers = PlanWorkers() if pool else None
+        sim = Simulation(ghost_count=count, ghost_ai=ghost_ai, grid=grid, seed=seed,
+                         initial_lives=lives, plan_workers=workers)
+        if lives == 10 ** 9:
+            for ghost in sim.ghosts:
+                ghost.release_ms = 0
+        if controller is None:
+            controller = random_controller(random.Random(seed))
+        tiles = [ghost.current_tile() for ghost in sim.ghosts]
+        moves = 0
+        times = []
+        for _ in range(ticks):
+            start = time.perf_counter()
+            sim.step(controller(sim))
+            spent = time.perf_counter() - start
+            times.append(spent)
+            now = [ghost.current_tile() for ghost in sim.ghosts]
+            moves += sum(a != b for a, b in zip(tiles, now))
+            tiles = now
+            if paced:
+                time.sleep(max(0.0, frame_seconds - spent))
+            if sim.game_over or sim.level_cleared:
+                break
+        if workers is not None:
+            workers.shutdown()
+        return moves, lives - sim.level.get_lives(), sorted(times), sim.state_hash(), workers
+
+    failed = False
+
+    def check(name, ok):
+        global failed
+        failed |= not ok
+        print(f"  {name}: {'ok' if ok else 'FAILED'}")
+
+    print("level 1, dijkstra, 4 ghosts")
+    base_moves, base_lives, _, _, _ = play(False, 4000)
+    moves, lives, _, fast_hash, workers = play(True, 4000)
+    print(f"  inline: {base_moves} tile moves, {base_lives} lives; pool: {moves} tile moves, {lives} lives "
+          f"(answers ready {workers.ready}, waited for {workers.waited}, dropped {workers.dropped})")
+    # Planning from a node ahead may cost a turn now and then, not the chase
+    check("pool ghosts chase", moves >= 0.9 * base_moves and lives >= 0.5 * base_lives)
+    check("same game run again", play(True, 4000)[3] == fast_hash)
+    _, _, _, paced_hash, _ = play(True, 600, paced=True)
+    check("same game paced at 60 Hz", paced_hash == play(True, 600)[3])
+
+    print("level 1, flow, greedy bot, 50 lives")
+    results = [play(pool, 20000, ghost_ai="flow", seed=7, lives=50, controller=greedy_controller())
+               for pool in (False, True)]
+    print(f"  lives lost: inline {results[0][1]}, pool {results[1][1]}")
+    check("returning ghosts on the pool", results[1][1] >= 0.5 * results[0][1])
+
+    frames = 300
+    print(f"\n{'map':>7} {'ghosts':>6} {'planning':>9} {'mean':>9} {'p99':>9} {'max':>9} {'moves':>6}")
+    for size, count in ((201, 64), (401, 128)):
+        grid = grid_of_size(size)
+        for pool in (False, True):
+            moves, _, times, _, _ = play(pool, frames, grid, count, paced=True)
+            p99 = times[int(len(times) * 0.99)]
+            print(f"{size:>4}^2 {count:>6} {'pool' if pool else 'inline':>9} {sum(times) / frames * 1000:>6.2f} ms "
+                  f"{p99 * 1000:>6.2f} ms {times[-1] * 1000:>6.2f} ms {moves:>6}")
+    sys.exit(1 if failed else 0)
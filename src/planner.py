@@ -0,0 +1,469 @@
+import heapq
+import math
+import threading
+from array import array
+from collections import OrderedDict, deque
+
+# Searches a Planner keeps, and how many found tiles/nodes they may hold in total
+MAX_TREES = 256
+MAX_ENTRIES = 1_000_000
+# Beyond this many wrap combinations TunnelHeuristic falls back to a torus distance
+MAX_PORTALS = 64
+
+
+class SearchTree:
+    """One search from `start`, kept so the next query from there carries on where it stopped.
+
+    weighted: Dijkstra over neighbors(u) -> [(v, weight)], popping in the
+    same order as the old per-call dijkstra(), so path_to() gives exactly
+    its path. Otherwise a BFS over neighbors(u) -> [v], discovering tiles
+    in the same order as the old per-call tile searches.
+
+    A query grows the tree only until its answer is final. When the goal
+    moves (Pacman stepped to the next tile), the answer is usually already
+    in the tree or a few expansions past its frontier.
+    """
+
+    __slots__ = ("start", "neighbors", "weighted", "parent", "dist", "settled", "order",
+                 "frontier", "expansions")
+
+    def __init__(self, start, neighbors, weighted=True):
+        self.start = start
+        self.neighbors = neighbors
+        self.weighted = weighted
+        # Everything found so far -> the tile/node it was reached from
+        self.parent = {start: None}
+        self.expansions = 0
+        if weighted:
+            self.dist = {start: 0}
+            self.settled = set()
+            self.frontier = [(0, start)]
+        else:
+            # Discovery order (nearest() returns the first goal found)
+            self.order = [start]
+            self.frontier = deque([start])
+
+    def expand(self):
+        """Expand one more node; False once everything reachable has been"""
+        frontier = self.frontier
+        parent = self.parent
+        if self.weighted:
+            dist = self.dist
+            while frontier:
+                d, u = heapq.heappop(frontier)
+                if d != dist.get(u, math.inf):
+                    continue
+                self.settled.add(u)
+                self.expansions += 1
+                for v, w in self.neighbors(u):
+                    nd = d + w
+                    if nd < dist.get(v, math.inf):
+                        dist[v] = nd
+                        parent[v] = u
+                        heapq.heappush(frontier, (nd, v))
+                return True
+            return False
+        if not frontier:
+            return False
+        u = frontier.popleft()
+        self.expansions += 1
+        order = self.order
+        for v in self.neighbors(u):
+            if v not in parent:
+                parent[v] = u
+                order.append(v)
+                frontier.append(v)
+        return True
+
+    def reach(self, goal):
+        """Grow the tree until the path to `goal` is final; False if it is unreachable"""
+        if not self.weighted:
+            # A BFS path is final as soon as the tile is found
+            parent = self.parent
+            while goal not in parent:
+                if not self.expand():
+                    return False
+            return True
+        # Dijkstra's is final once the goal is popped (expand() inlined: this is the hot loop)
+        settled = self.settled
+        if goal in settled:
+            return True
+        frontier, dist, parent, neighbors = self.frontier, self.dist, self.parent, self.neighbors
+        heappop, heappush, inf = heapq.heappop, heapq.heappush, math.inf
+        expansions = 0
+        while frontier:
+            d, u = heappop(frontier)
+            if d != dist.get(u, inf):
+                continue
+            settled.add(u)
+            expansions += 1
+            for v, w in neighbors(u):
+                nd = d + w
+                if nd < dist.get(v, inf):
+                    dist[v] = nd
+                    parent[v] = u
+                    heappush(frontier, (nd, v))
+            if u == goal:
+                break
+        self.expansions += expansions
+        return goal in settled
+
+    def path_to(self, goal):
+        """[start, ..., goal], or [start] if goal is unreachable"""
+        if goal == self.start or not self.reach(goal):
+            return [self.start]
+        parent = self.parent
+        path = [goal]
+        while goal != self.start:
+            goal = parent[goal]
+            path.append(goal)
+        path.reverse()
+        return path
+
+    def first_step(self, goal):
+        """The tile/node after start on the way to `goal`, or None"""
+        if goal == self.start or not self.reach(goal):
+            return None
+        parent = self.parent
+        while parent[goal] != self.start:
+            goal = parent[goal]
+        return goal
+
+    def nearest(self, goals):
+        """First of `goals` the BFS finds (start itself doesn't count), or None"""
+        order = self.order
+        i = 1
+        while True:
+            while i < len(order):
+                if order[i] in goals:
+                    return order[i]
+                i += 1
+            if not self.expand():
+                return None
+
+
+class TunnelHeuristic:
+    """Lower bound on walking distance between tiles of one level, tunnels included.
+
+    It is the exact distance with every wall removed: the smaller of the
+    plain Manhattan distance and the distance through each tunnel (walk to
+    one mouth, one step to the other, walk on), or through a row tunnel and
+    a column tunnel in either order. That is the shortest path of a graph
+    containing every maze edge, so A* with it is admissible and consistent.
+    """
+
+    def __init__(self, topology):
+        width, height = topology.width, topology.height
+        self.mouths = []
+        for y in sorted(topology.tunnel_rows):
+            self.mouths += [((0, y), (width - 1, y), "row"), ((width - 1, y), (0, y), "row")]
+        for x in sorted(topology.tunnel_cols):
+            self.mouths += [((x, 0), (x, height - 1), "col"), ((x, height - 1), (x, 0), "col")]
+        rows = sum(1 for m in self.mouths if m[2] == "row")
+        # With many tunnels both ways, bound each axis by its wrapped distance instead
+        self.torus = rows * (len(self.mouths) - rows) * 2 > MAX_PORTALS
+        self.wrap_x = width if topology.tunnel_rows else None
+        self.wrap_y = height if topology.tunnel_cols else None
+
+    def to(self, goal):
+        """h(tile) toward `goal`, with the goal-side parts worked out once"""
+        gx, gy = goal
+        if self.torus:
+            wrap_x, wrap_y = self.wrap_x, self.wrap_y
+
+            def h(tile):
+                dx = abs(tile[0] - gx)
+                dy = abs(tile[1] - gy)
+                return min(dx, wrap_x - dx) + min(dy, wrap_y - dy)
+            return h
+
+        # (entry mouth x, y, cost from entering there to the goal)
+        portals = []
+        for (px, py), (qx, qy), _ in self.mouths:
+            portals.append((px, py, 1 + abs(qx - gx) + abs(qy - gy)))
+        for (px, py), (qx, qy), kind in self.mouths:
+            for (rx, ry), (sx, sy), other in self.mouths:
+                if other != kind:
+                    portals.append((px, py, 2 + abs(qx - rx) + abs(qy - ry) + abs(sx - gx) + abs(sy - gy)))
+
+        def h(tile):
+            x, y = tile
+            best = abs(x - gx) + abs(y - gy)
+            for px, py, rest in portals:
+                d = abs(x - px) + abs(y - py) + rest
+                if d < best:
+                    best = d
+            return best
+        return h
+
+
+class AStar:
+    """A* over one graph whose bookkeeping is allocated once and reused by every search.
+
+    Vertices are numbered 0..size-1: key(v) gives the number (None if v
+    isn't in the graph), vertex(i) the vertex, and links(i) the
+    [(j, cost)] edges out of it. The cost-so-far, parent and open/closed
+    marks live in flat arrays; each search bumps `generation` and an entry
+    only counts if its stamp matches, so nothing is cleared or allocated
+    per search apart from the heap and the returned path.
+    """
+
+    def __init__(self, size, links, key, vertex, heuristic):
+        self.size = size
+        self.links = links
+        self.key = key
+        self.vertex = vertex
+        self.heuristic = heuristic
+        self.cost = array("q", [0]) * size
+        self.parent = array("i", [-1]) * size
+        # Generation in which cost/parent were set (open) and the vertex was expanded (closed)
+        self.opened = array("I", [0]) * size
+        self.closed = array("I", [0]) * size
+        self.generation = 0
+        self._heap = []
+        self.expansions = 0
+
+    def _next_generation(self):
+        self.generation += 1
+        if self.generation > 0xFFFFFFFF:
+            # Stamps wrapped around: wipe them once and start over
+            self.opened = array("I", [0]) * self.size
+            self.closed = array("I", [0]) * self.size
+            self.generation = 1
+        return self.generation
+
+    def search(self, start, goal):
+        """(path [start, ..., goal], cost); ([start], None) if goal can't be reached"""
+        s = self.key(start)
+        t = self.key(goal)
+        if s is None or t is None:
+            return [start], None
+        if s == t:
+            return [start], 0
+        gen = self._next_generation()
+        cost, parent, opened, closed, links = self.cost, self.parent, self.opened, self.closed, self.links
+        h = self.heuristic.to(goal)
+        vertex = self.vertex
+        heap = self._heap
+        heap.clear()
+        heappush, heappop = heapq.heappush, heapq.heappop
+        cost[s] = 0
+        parent[s] = -1
+        opened[s] = gen
+        # (f, -g, vertex): among equal f, the one further along goes first
+        heappush(heap, (h(start), 0, s))
+        expansions = 0
+        found = False
+        while heap:
+            f, neg_g, u = heappop(heap)
+            if closed[u] == gen or -neg_g != cost[u]:
+                continue
+            closed[u] = gen
+            expansions += 1
+            if u == t:
+                found = True
+                break
+            g = -neg_g
+            for v, w in links(u):
+                if closed[v] == gen:
+                    continue
+                nd = g + w
+                if opened[v] != gen or nd < cost[v]:
+                    opened[v] = gen
+                    cost[v] = nd
+                    parent[v] = u
+                    heappush(heap, (nd + h(vertex(v)), -nd, v))
+        self.expansions += expansions
+        if not found:
+            return [start], None
+        path = []
+        u = t
+        while u != -1:
+            path.append(vertex(u))
+            u = parent[u]
+        path.reverse()
+        return path, cost[t]
+
+
+def node_astar(adj, topology):
+    """AStar over a node graph ({node: [(node, tiles)]}) of the level `topology` describes"""
+    vertices = sorted(set(adj) | {v for vs in adj.values() for v, _ in vs})
+    index = {v: i for i, v in enumerate(vertices)}
+    links = [[(index[v], w) for v, w in adj.get(u, ())] for u in vertices]
+    return AStar(len(vertices), links.__getitem__, index.get, vertices.__getitem__, TunnelHeuristic(topology))
+
+
+def tile_astar(topology):
+    """AStar over a level's tiles, straight off the topology's neighbour table"""
+    width, height = topology.width, topology.height
+    neighbor = topology.neighbor
+
+    def key(tile):
+        x, y = tile
+        return y * width + x if 0 <= x < width and 0 <= y < height else None
+
+    def links(i):
+        return [(j, 1) for j in neighbor[i * 4:i * 4 + 4] if j != -1]
+
+    def vertex(i):
+        return i % width, i // width
+
+    return AStar(width * height, links, key, vertex, TunnelHeuristic(topology))
+
+
+class Planner:
+    """SearchTrees from recently used starts on one graph, shared by every ghost on it.
+
+    Ghosts replan from the node they just reached, and there are few nodes,
+    so after a while most queries are answered from an existing tree
+    without expanding anything. Trees are dropped least recently used
+    first, past max_trees or max_entries found tiles/nodes in total;
+    max_trees=0 keeps none (every query is a fresh search).
+
+    On a graph with far more starts than trees to keep, pass an AStar:
+    path() and first_step() then run a goal-directed search instead, and
+    only nearest() (a fixed set of goals) keeps using trees.
+
+    Queries hold a lock, so ghosts planning on worker threads
+    (plan_workers.py) can share a planner with the game thread.
+    """
+
+    def __init__(self, neighbors, weighted=True, max_trees=MAX_TREES, max_entries=MAX_ENTRIES, astar=None):
+        self.neighbors = neighbors
+        self.weighted = weighted
+        self.astar = astar
+        self.max_trees = max_trees
+        self.max_entries = max_entries
+        self._trees = OrderedDict()
+        self._entries = 0
+        self._lock = threading.Lock()
+        # For comparing with a fresh search per query (see stats())
+        self.queries = 0
+        self.expansions = 0
+
+    def _tree(self, start):
+        tree = self._trees.get(start)
+        if tree is not None:
+            self._trees.move_to_end(start)
+            return tree
+        tree = SearchTree(start, self.neighbors, self.weighted)
+        if self.max_trees:
+            self._trees[start] = tree
+            self._entries += 1
+        return tree
+
+    def _account(self, tree, expansions, entries):
+        # Book-keeping after a query on `tree`; evicts old trees when over budget
+        self.queries += 1
+        self.expansions += tree.expansions - expansions
+        if tree.start not in self._trees:
+            return
+        self._entries += len(tree.parent) - entries
+        trees = self._trees
+        while len(trees) > 1 and (len(trees) > self.max_trees or self._entries > self.max_entries):
+            _, old = trees.popitem(last=False)
+            self._entries -= len(old.parent)
+
+    def _search(self, start, goal):
+        astar = self.astar
+        before = astar.expansions
+        path, _ = astar.search(start, goal)
+        self.queries += 1
+        self.expansions += astar.expansions - before
+        return path
+
+    def path(self, start, goal):
+        """A shortest path, as dijkstra(adj, start, goal) (the same one, without an AStar)"""
+        with self._lock:
+            if self.astar is not None:
+                return self._search(start, goal)
+            tree = self._tree(start)
+            before = tree.expansions, len(tree.parent)
+            path = tree.path_to(goal)
+            self._account(tree, *before)
+            return path
+
+    def first_step(self, start, goal):
+        with self._lock:
+            if self.astar is not None:
+                path = self._search(start, goal)
+                return path[1] if len(path) > 1 else None
+            tree = self._tree(start)
+            before = tree.expansions, len(tree.parent)
+            step = tree.first_step(goal)
+            self._account(tree, *before)
+            return step
+
+    def nearest(self, start, goals):
+        """Nearest of `goals` by BFS (start itself if it is one), or None"""
+        with self._lock:
+            if start in goals:
+                return start
+            tree = self._tree(start)
+            before = tree.expansions, len(tree.parent)
+            found = tree.nearest(goals)
+            self._account(tree, *before)
+            return found
+
+    def step_to_nearest(self, start, goals):
+        """First step toward the nearest of `goals`; None if start is one or none is reachable"""
+        with self._lock:
+            if start in goals:
+                return None
+            tree = self._tree(start)
+            before = tree.expansions, len(tree.parent)
+            found = tree.nearest(goals)
+            step = None if found is None else tree.first_step(found)
+            self._account(tree, *before)
+            return step
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self._entries = 0
+
+    def stats(self):
+        return {
+            "queries": self.queries,
+            "expansions": self.expansions,
+            "expansions_per_query": self.expansions / self.queries if self.queries else 0.0,
+            "trees": len(self._trees),
+        }
+
+
+if __name__ == "__main__":
+    # Expansions per replan in dijkstra mode: a fresh search every time (as
+    # before any of this), kept trees, and A*. Fresh and kept trees give the
+    # same paths, so they play the same game; A* may pick another of several
+    # equally short paths.
+    import random
+    import sys
+    import time
+    from navigation import get_nav_graph
+    from simulation import Simulation, random_controller
+    from maze import load_level
+    from maze_gen import grid_of_size
+
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    maps = [(f"level{i}", load_level(i)) for i in ("1", "2", "3")]
+    maps += [(f"gen{n}", grid_of_size(n)) for n in (101, 201, 401)]
+    print(f"{'map':>8} {'planner':>7} {'replans':>8} {'expansions/replan':>18} "
+          f"{'tile searches':>14} {'expansions/search':>18} {'ms':>7}")
+    for name, grid in maps:
+        scores = {}
+        for label, max_trees, astar in (("fresh", 0, False), ("kept", MAX_TREES, False),
+                                        ("A*", MAX_TREES, True)):
+            graph = get_nav_graph(grid)
+            graph.reset_planners(max_trees, astar)
+            sim = Simulation(ghost_ai="dijkstra", ghost_count=4, initial_lives=10 ** 9, seed=0, grid=grid)
+            controller = random_controller(random.Random(0))
+            start = time.perf_counter()
+            sim.run(ticks, controller)
+            elapsed = time.perf_counter() - start
+            node = graph.planner.stats()
+            tile = graph.tile_planner.stats()
+            scores[label] = sim.pacman.pallet_count
+            print(f"{name:>8} {label:>7} {node['queries']:>8} {node['expansions_per_query']:>18.2f} "
+                  f"{tile['queries']:>14} {tile['expansions_per_query']:>18.2f} {elapsed * 1000:>7.0f}")
+        assert scores["fresh"] == scores["kept"], "kept trees changed the game"
+        get_nav_graph(grid).reset_planners()
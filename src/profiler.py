@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from collections import deque
+
+PROFILE_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "profiles"))
+OVERLAY_REFRESH_FRAMES = 30
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+class FrameProfiler:
+    """Per-phase frame timings in a ring buffer, plus per-frame call counters.
+
+    Call begin_frame(), then mark(phase) after each phase (the time since the
+    previous mark is charged to it), then end_frame(). Hot functions report
+    with `if PROFILER.enabled: PROFILER.count("name")`. While disabled every
+    method returns immediately.
+    """
+
+    def __init__(self, enabled=False, history=600):
+        self.enabled = enabled
+        self.frames = deque(maxlen=history)
+        self.frame_index = 0
+        self._phases = {}
+        self._counts = {}
+        self._frame_start = 0.0
+        self._last = 0.0
+        # Enabling mid-frame starts recording with the next begin_frame()
+        self._in_frame = False
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._phases = {}
+        self._counts = {}
+        self._in_frame = True
+        self._frame_start = self._last = time.perf_counter()
+
+    def mark(self, phase):
+        if not self.enabled or not self._in_frame:
+            return
+        now = time.perf_counter()
+        self._phases[phase] = self._phases.get(phase, 0.0) + (now - self._last) * 1000.0
+        self._last = now
+
+    def count(self, name, n=1):
+        self._counts[name] = self._counts.get(name, 0) + n
+
+    def end_frame(self):
+        if not self.enabled or not self._in_frame:
+            return
+        self._in_frame = False
+        total = (time.perf_counter() - self._frame_start) * 1000.0
+        self.frames.append({
+            "frame": self.frame_index,
+            "total_ms": total,
+            "phases_ms": self._phases,
+            "counts": self._counts,
+        })
+        self.frame_index += 1
+
+    def summary(self):
+        """{phase: (p50, p95, p99)} in ms over the frames in the ring buffer"""
+        series = {}
+        for frame in self.frames:
+            for phase, ms in frame["phases_ms"].items():
+                series.setdefault(phase, []).append(ms)
+            series.setdefault("total", []).append(frame["total_ms"])
+        result = {}
+        for phase, values in series.items():
+            values.sort()
+            result[phase] = tuple(percentile(values, q) for q in (50, 95, 99))
+        return result
+
+    def mean_counts(self):
+        """Average per-frame call count of each counter"""
+        totals = {}
+        for frame in self.frames:
+            for name, n in frame["counts"].items():
+                totals[name] = totals.get(name, 0) + n
+        frames = max(1, len(self.frames))
+        return {name: n / frames for name, n in totals.items()}
+
+    def flush_jsonl(self, path=None):
+        """Append the buffered frames to a JSONL file and empty the buffer"""
+        if path is None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"frames_{int(time.time())}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            for frame in self.frames:
+                f.write(json.dumps(frame) + "\n")
+        self.frames.clear()
+        return path
+
+
+class ProfilerOverlay:
+    """Box in the corner with rolling p50/p95/p99 per phase."""
+
+    def __init__(self, profiler, position=(4, 34)):
+        import pygame
+        self.pygame = pygame
+        self.profiler = profiler
+        self.visible = False
+        self.position = position
+        self.font = pygame.font.Font(None, 18)
+        self.surface = None
+        self._frames_since_refresh = OVERLAY_REFRESH_FRAMES
+
+    @property
+    def rect(self):
+        if self.surface is None:
+            return self.pygame.Rect(self.position, (0, 0))
+        return self.surface.get_rect(topleft=self.position)
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.profiler.enabled = self.visible
+        self.surface = None
+        self._frames_since_refresh = OVERLAY_REFRESH_FRAMES
+
+    def _render(self):
+        lines = [f"{'phase':<16}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+        for phase, (p50, p95, p99) in self.profiler.summary().items():
+            lines.append(f"{phase:<16}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+        for name, n in sorted(self.profiler.mean_counts().items()):
+            lines.append(f"{name:<16}{n:>7.1f} calls/frame")
+        rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(r.get_width() for r in rendered) + 8
+        height = sum(r.get_height() for r in rendered) + 8
+        surface = self.pygame.Surface((width, height))
+        surface.set_alpha(200)
+        surface.fill((20, 20, 20))
+        y = 4
+        for r in rendered:
+            surface.blit(r, (4, y))
+            y += r.get_height()
+        self.surface = surface
+
+    def draw(self, screen):
+        """Draw the overlay; returns the rect it covers (or None when hidden)"""
+        if not self.visible:
+            return None
+        self._frames_since_refresh += 1
+        if self.surface is None or self._frames_since_refresh >= OVERLAY_REFRESH_FRAMES:
+            self._render()
+            self._frames_since_refresh = 0
+        screen.blit(self.surface, self.position)
+        return self.rect
+
+
+# Shared instance used by the game loop and the hot functions
+PROFILER = FrameProfiler()
@@ -0,0 +1,204 @@
+from collections import OrderedDict
+import pygame
+from camera import Camera
+from hud import Hud
+from profiler import PROFILER
+from grid import PACMAN_START
+from maze import GRID, TILE_SIZE, draw_tile, screen_size
+
+# Board chunks are CHUNK_TILES x CHUNK_TILES tiles; a full-size view touches
+# at most 3x3 of them, so the cache holds a couple of views' worth
+CHUNK_TILES = 16
+MAX_CHUNKS = 24
+
+
+class BoardChunks:
+    """The maze with its pellets, cut into square chunk surfaces.
+
+    A chunk is drawn from the grid the first time it comes into view and
+    kept in an LRU cache. The grid is the source of truth (eaten pellets are
+    gone from it), so an evicted chunk is simply drawn again when needed.
+    """
+
+    def __init__(self, grid, chunk_tiles=CHUNK_TILES, max_chunks=MAX_CHUNKS):
+        self.grid = grid
+        self.chunk_tiles = chunk_tiles
+        self.chunk_pixels = chunk_tiles * TILE_SIZE
+        self.max_chunks = max_chunks
+        self._chunks = OrderedDict()
+
+    def _render(self, cx, cy):
+        grid = self.grid
+        col0, row0 = cx * self.chunk_tiles, cy * self.chunk_tiles
+        cols = min(self.chunk_tiles, grid.width - col0)
+        rows = min(self.chunk_tiles, grid.height - row0)
+        surface = pygame.Surface((cols * TILE_SIZE, rows * TILE_SIZE)).convert()
+        for row in range(rows):
+            for col in range(cols):
+                draw_tile(surface, col, row, grid.get(col0 + col, row0 + row))
+        return surface
+
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        surface = self._chunks.get(key)
+        if surface is not None:
+            self._chunks.move_to_end(key)
+            return surface
+        surface = self._chunks[key] = self._render(cx, cy)
+        if len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+        return surface
+
+    def _chunk_range(self, rect):
+        size = self.chunk_pixels
+        last_cx = (self.grid.width * TILE_SIZE - 1) // size
+        last_cy = (self.grid.height * TILE_SIZE - 1) // size
+        xs = range(max(0, rect.left // size), min(last_cx, (rect.right - 1) // size) + 1)
+        ys = range(max(0, rect.top // size), min(last_cy, (rect.bottom - 1) // size) + 1)
+        return xs, ys
+
+    def prepare(self, rect):
+        """Draw (or touch) every chunk under the world rect"""
+        xs, ys = self._chunk_range(rect)
+        for cy in ys:
+            for cx in xs:
+                self.chunk(cx, cy)
+
+    def blit(self, screen, rect, dest):
+        """Copy the world rect of the board onto `screen` at `dest`"""
+        size = self.chunk_pixels
+        xs, ys = self._chunk_range(rect)
+        for cy in ys:
+            for cx in xs:
+                chunk_rect = pygame.Rect(cx * size, cy * size, size, size)
+                part = rect.clip(chunk_rect)
+                if part.width and part.height:
+                    screen.blit(self.chunk(cx, cy),
+                                (dest[0] + part.x - rect.x, dest[1] + part.y - rect.y),
+                                part.move(-chunk_rect.x, -chunk_rect.y))
+
+    def clear_tile(self, col_index, row_index):
+        """Redraw a tile whose pellet was eaten (only if its chunk is cached)"""
+        cx, cy = col_index // self.chunk_tiles, row_index // self.chunk_tiles
+        surface = self._chunks.get((cx, cy))
+        if surface is not None:
+            draw_tile(surface, col_index - cx * self.chunk_tiles, row_index - cy * self.chunk_tiles,
+                      self.grid.get(col_index, row_index), pills=False)
+
+
+class MazeRenderer:
+    """Draws the visible part of the maze from cached chunks and reports the dirty rects.
+
+    A Camera follows Pacman over maps bigger than the window; only the chunks
+    in view are ever drawn, and entities outside it are skipped, so a frame
+    costs the same on a huge map as on a small one. While the camera stays
+    put (always, on a map that fits the window) each frame restores the board
+    under last frame's entities, draws the entities again and returns just
+    those rects for pygame.display.update(); a scroll repaints the window.
+    """
+
+    def __init__(self, grid=None, hud=None):
+        self.chunks = None
+        self.camera = None
+        self.grid = grid if grid is not None else GRID
+        # Score/lives strip over the top row; created with the board if not given
+        self.hud = hud
+        self._prev_rects = []
+        self._full_redraw = True
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid):
+        self._grid = grid
+        if self.chunks is not None:
+            self.chunks.grid = grid
+
+    def build(self, view_size=None):
+        """Set up the camera and draw the chunks of the opening view"""
+        if view_size is None:
+            view_size = screen_size(self.grid)
+        self.chunks = BoardChunks(self.grid)
+        self.camera = Camera(view_size[0], view_size[1],
+                             self.grid.width * TILE_SIZE, self.grid.height * TILE_SIZE)
+        start = self.grid.find(PACMAN_START)
+        if start is not None:
+            self.camera.follow(start[0] * TILE_SIZE + TILE_SIZE // 2, start[1] * TILE_SIZE + TILE_SIZE // 2)
+        self.chunks.prepare(self.camera.view)
+        if self.hud is None:
+            self.hud = Hud(view_size[0])
+        self._full_redraw = True
+
+    def invalidate(self):
+        """Rebuild everything on the next frame (new level, map reset, ...)"""
+        self.chunks = None
+
+    def sync_pellets(self, pacman):
+        for col_index, row_index in pacman.eaten_tiles:
+            self.chunks.clear_tile(col_index, row_index)
+        pacman.eaten_tiles.clear()
+
+    @staticmethod
+    def entity_rect(entity):
+        # One tile around the entity centre covers Pacman and the ghost sprites
+        rect = pygame.Rect(0, 0, TILE_SIZE + 2, TILE_SIZE + 2)
+        rect.center = (int(entity.px), int(entity.py))
+        return rect
+
+    def draw_frame(self, screen, pacman, ghosts, level):
+        """Draw one frame and return the list of rects that changed"""
+        if self.chunks is None:
+            self.build(screen.get_size())
+        elif self.camera.view.size != screen.get_size():
+            # Window resized: same chunks, new view
+            self.camera = Camera(*screen.get_size(), self.camera.world_width, self.camera.world_height)
+            self._full_redraw = True
+        self.sync_pellets(pacman)
+        camera = self.camera
+        if camera.follow(pacman.px, pacman.py):
+            self._full_redraw = True
+
+        screen_rect = screen.get_rect()
+        hud_changed = self.hud.update(pacman.pallet_count, level.get_lives())
+        # Entities outside the view are neither restored nor drawn
+        visible = [e for e in [pacman] + list(ghosts) if camera.sees(self.entity_rect(e))]
+        entity_rects = [camera.to_screen(self.entity_rect(e)) for e in visible]
+        if self._full_redraw:
+            self.chunks.blit(screen, camera.view, (0, 0))
+            dirty = [screen_rect]
+            self._full_redraw = False
+        else:
+            dirty = []
+            restore = self._prev_rects + entity_rects
+            if hud_changed:
+                restore.append(self.hud.rect)
+            for rect in restore:
+                rect = self.restore(screen, rect)
+                if rect.width and rect.height:
+                    dirty.append(rect)
+
+        PROFILER.mark("draw map")
+
+        offset = camera.offset
+        for entity in visible:
+            entity.draw(screen, offset)
+        # The HUD goes on top; blit it again only if it changed or was painted over
+        hud_rect = self.hud.rect
+        if hud_changed or any(hud_rect.colliderect(r) for r in dirty):
+            self.hud.draw(screen)
+            if hud_rect not in dirty:
+                dirty.append(hud_rect)
+
+        PROFILER.mark("draw entities")
+
+        self._prev_rects = entity_rects
+        return dirty
+
+    def restore(self, screen, rect):
+        """Copy the board back over the screen rect `rect` (e.g. under an overlay); returns the clipped rect"""
+        rect = rect.clip(screen.get_rect())
+        if self.chunks is not None and rect.width and rect.height:
+            self.chunks.blit(screen, self.camera.to_world(rect), rect.topleft)
+        return rect
@@ -0,0 +1,198 @@
+"""Input recordings and headless replays.
+
+A recording is the simulation settings plus the inputs, stored only on the
+ticks where a direction was pressed, and a state hash every few ticks:
+
+    b"PMRP" | u32 header length | header JSON | zlib(level tiles) | events
+
+Each event is a varint tick delta (since the previous event) followed by one
+byte: 0-3 for a direction (index into simulation.DIRECTIONS), HASH_EVENT and
+the 8-byte state hash, or END_EVENT at the final tick.
+
+    python src/replay.py record out.pmr [ticks] [seed]   # record a random run
+    python src/replay.py play file.pmr [...]             # replay at full speed and check hashes
+"""
+import json
+import struct
+import sys
+import time
+import zlib
+from grid import Grid
+from plan_workers import PlanWorkers
+from simulation import Simulation, DIRECTIONS, TICK_RATE, random_controller
+
+MAGIC = b"PMRP"
+FORMAT_VERSION = 2
+HASH_EVENT = 0xFE
+END_EVENT = 0xFF
+# State hash interval for new recordings, in ticks
+DEFAULT_HASH_EVERY = TICK_RATE
+
+_DIRECTION_CODES = {d: i for i, d in enumerate(DIRECTIONS)}
+
+
+class ReplayError(Exception):
+    pass
+
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+class InputRecorder:
+    """Attach to a Simulation (sim.recorder) to log its inputs and state hashes."""
+
+    def __init__(self, sim, hash_every=DEFAULT_HASH_EVERY):
+        self.header = {
+            "version": FORMAT_VERSION,
+            "seed": sim.seed,
+            "ghost_speed": sim.ghost_speed,
+            "ghost_count": sim.ghost_count,
+            "ghost_ai": sim.ghost_ai,
+            "initial_lives": sim.initial_lives,
+            "tick_rate": TICK_RATE,
+            "start_tick": sim.tick,
+            "level_id": sim.level.level_id,
+            "advance_levels": sim.advance_levels,
+            "step_ticks": sim.step_ticks,
+            "async_plan": sim.plan_workers is not None,
+            "width": sim.base_grid.width,
+            "height": sim.base_grid.height,
+        }
+        if sim.seed is None:
+            print("Warning: recording an unseeded simulation; the replay will not match")
+        self.tiles = bytes(sim.base_grid.tiles)
+        self.hash_every = hash_every
+        self.events = bytearray()
+        self._last_tick = sim.tick
+        sim.recorder = self
+
+    def _event(self, tick, code):
+        _write_varint(self.events, tick - self._last_tick)
+        self.events.append(code)
+        self._last_tick = tick
+
+    def record_input(self, tick, direction):
+        if direction is not None:
+            self._event(tick, _DIRECTION_CODES[direction])
+
+    def after_tick(self, sim):
+        if sim.tick % self.hash_every < sim.step_ticks:
+            self._event(sim.tick, HASH_EVENT)
+            self.events += sim.state_hash()
+
+    def to_bytes(self, end_tick):
+        header = json.dumps(self.header, separators=(",", ":")).encode("utf-8")
+        tiles = zlib.compress(self.tiles, 9)
+        end = bytearray()
+        _write_varint(end, end_tick - self._last_tick)
+        end.append(END_EVENT)
+        return (MAGIC + struct.pack("<I", len(header)) + header
+                + struct.pack("<I", len(tiles)) + tiles + bytes(self.events) + bytes(end))
+
+    def save(self, path, end_tick):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes(end_tick))
+        return path
+
+
+def load_recording(data):
+    """Split a recording into (header, Grid, events bytes)"""
+    if data[:4] != MAGIC:
+        raise ReplayError("not a replay file")
+    pos = 4
+    (n,) = struct.unpack_from("<I", data, pos)
+    header = json.loads(data[pos + 4:pos + 4 + n].decode("utf-8"))
+    if header.get("version") != FORMAT_VERSION:
+        raise ReplayError(f"unsupported replay version {header.get('version')}")
+    pos += 4 + n
+    (n,) = struct.unpack_from("<I", data, pos)
+    tiles = zlib.decompress(data[pos + 4:pos + 4 + n])
+    grid = Grid(header["width"], header["height"], tiles)
+    return header, grid, memoryview(data)[pos + 4 + n:]
+
+
+def replay(data, check=True):
+    """Re-run a recording headless as fast as possible.
+
+    Returns the finished Simulation; raises ReplayError at the first state
+    hash that differs (when `check` is set).
+    """
+    header, grid, events = load_recording(data)
+    if header["tick_rate"] != TICK_RATE:
+        raise ReplayError(f"recorded at {header['tick_rate']} ticks/s, running at {TICK_RATE}")
+    sim = Simulation(ghost_speed=header["ghost_speed"], initial_lives=header["initial_lives"],
+                     ghost_count=header["ghost_count"], ghost_ai=header["ghost_ai"],
+                     grid=grid, seed=header["seed"], level_id=header["level_id"],
+                     advance_levels=header["advance_levels"],
+                     step_ticks=header.get("step_ticks", 1),
+                     plan_workers=PlanWorkers() if header.get("async_plan") else None)
+    sim.tick = header["start_tick"]
+    pos = 0
+    tick = sim.tick
+    while True:
+        delta, pos = _read_varint(events, pos)
+        tick += delta
+        code = events[pos]
+        pos += 1
+        # Run up to the event's tick with no input
+        while sim.tick < tick:
+            sim.step()
+        if code == END_EVENT:
+            return sim
+        if code == HASH_EVENT:
+            expected = bytes(events[pos:pos + 8])
+            pos += 8
+            if check and sim.state_hash() != expected:
+                raise ReplayError(f"state hash mismatch at tick {tick}")
+        else:
+            sim.step(DIRECTIONS[code])
+
+
+if __name__ == "__main__":
+    import random
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "play"):
+        print(__doc__)
+        sys.exit(2)
+
+    if sys.argv[1] == "record":
+        path = sys.argv[2]
+        ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 36000
+        seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+        sim = Simulation(seed=seed)
+        recorder = InputRecorder(sim)
+        sim.run(ticks, random_controller(random.Random(seed)))
+        recorder.save(path, sim.tick)
+        print(f"Recorded {sim.tick} ticks to {path} ({len(recorder.to_bytes(sim.tick))} bytes)")
+    else:
+        failed = False
+        for path in sys.argv[2:]:
+            with open(path, "rb") as f:
+                data = f.read()
+            start = time.perf_counter()
+            try:
+                sim = replay(data)
+            except ReplayError as e:
+                print(f"{path}: FAIL {e}")
+                failed = True
+                continue
+            elapsed = time.perf_counter() - start
+            print(f"{path}: OK {sim.tick} ticks in {elapsed:.2f}s "
+                  f"({sim.tick / TICK_RATE / max(elapsed, 1e-9):.0f}x real time), "
+                  f"score={sim.pacman.pallet_count} lives={sim.level.get_lives()}")
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,285 @@
+import hashlib
+import random
+import struct
+import time
+from collections import deque
+from maze import LEVEL_IDS, load_level, next_level_id
+from ghost import direction_between
+from topology import get_topology
+from pacman import Pacman
+from ghost_manager import GhostManager
+from lavel_system import LevelSystem
+from collision import CollisionSystem
+from levels import LevelPrefetcher
+from navigation import NavTable, NavTableTooLarge
+from profiler import PROFILER
+
+# Config variables
+GHOST_SPEED = 1.5
+GHOST_COUNT = 4
+INITIAL_LIVES = 3
+# Ghost chase planning: "flow" (shared distance field), "table" (NavTable)
+# or "dijkstra" (per-ghost search at every node; A* on big maps, see NavGraph.reset_planners)
+GHOST_AI = "flow"
+# Logic ticks per simulated second. Every speed (Pacman.speed, GHOST_SPEED)
+# is in pixels per tick; main.py runs a fixed number of ticks per second of
+# real time however fast it renders.
+TICK_RATE = 60
+
+DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+
+class Simulation:
+    """Game state and per-tick logic, with no window and no rendering.
+
+    main.py is one client of this class; test harnesses and batch jobs can
+    call step() as fast as the CPU allows. Time is the tick counter and all
+    randomness comes from self.rng, so the same seed and the same inputs give
+    the same game (see replay.py).
+
+    With advance_levels=True, clearing a level starts the next one from
+    maze.json (score and lives carry over); the next level is prepared on a
+    background thread while the current one plays.
+
+    step_ticks > 1 is a fast-forward mode: each step() covers that many ticks
+    with every speed scaled up to match. Movement still stops at each tile
+    centre it passes (pellets, turns) and contacts are swept along the whole
+    move, so games play out the same way at a fraction of the steps. Inputs
+    and timers only get step granularity, so results are close, not
+    identical, to step_ticks=1.
+    """
+
+    def __init__(self, ghost_speed=GHOST_SPEED, initial_lives=INITIAL_LIVES, ghost_count=GHOST_COUNT,
+                 ghost_ai=GHOST_AI, nav_table=None, grid=None, seed=None, level_id=None,
+                 advance_levels=False, prefetcher=None, step_ticks=1, plan_workers=None):
+        if step_ticks < 1:
+            raise ValueError("step_ticks must be at least 1")
+        self.step_ticks = step_ticks
+        self.ghost_speed = ghost_speed
+        self.initial_lives = initial_lives
+        self.ghost_count = ghost_count
+        self.ghost_ai = ghost_ai
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.tick = 0
+        # Optional replay.InputRecorder, told about every tick's input
+        self.recorder = None
+        # Optional plan_workers.PlanWorkers for the ghosts' path searches (a
+        # node ahead; the game stays reproducible with or without threads)
+        self.plan_workers = plan_workers
+
+        if level_id is None:
+            level_id = LEVEL_IDS[0]
+        if grid is None:
+            grid = load_level(level_id)
+
+        # Level/Lives system
+        self.level = LevelSystem(initial_lives=initial_lives, level_id=level_id)
+
+        self._start_level(grid, nav_table)
+
+        self.advance_levels = advance_levels
+        self.prefetcher = prefetcher
+        # The PreparedLevel of the last level change (main.py watches for it to switch renderers)
+        self.prepared_level = None
+        # Tick at which to start preparing the following level (None: done)
+        self._prefetch_at = None
+        if advance_levels:
+            if self.prefetcher is None:
+                self.prefetcher = LevelPrefetcher(with_nav_table=(ghost_ai == "table"))
+            self.prefetcher.prefetch(next_level_id(level_id))
+
+    def _start_level(self, grid, nav_table=None):
+        # Pristine level (kept for recordings); each game eats pellets from its own copy
+        self.base_grid = grid
+        self.grid = grid.copy()
+
+        # Static navigation table for the level (walls never change)
+        if nav_table is None and self.ghost_ai == "table":
+            try:
+                nav_table = NavTable.for_grid(self.grid)
+            except NavTableTooLarge as e:
+                print("Nav table disabled:", e)
+        self.nav_table = nav_table
+
+        # Create Pacman
+        self.pacman = Pacman(self.grid)
+
+        # Create the ghosts (chasing); scatter timing follows simulated time
+        if self.plan_workers is not None:
+            # Searches still running for the last level's ghosts
+            self.plan_workers.discard()
+        self.ghost_manager = GhostManager(
+            self.pacman, count=self.ghost_count, speed=self.ghost_speed, clock=self.now_ms,
+            nav_table=nav_table, use_flow_field=(self.ghost_ai == "flow"), grid=self.grid,
+            rng=self.rng, plan_workers=self.plan_workers,
+        )
+        self.ghosts = self.ghost_manager.ghosts
+        if self.step_ticks != 1:
+            self._scale_speeds(self.step_ticks)
+
+        # Pacman/ghost contacts, resolved through the level system
+        self.collisions = CollisionSystem(self.level, self.pacman, self.ghosts)
+
+    def _scale_speeds(self, factor):
+        # Speeds are pixels per tick; a step of `factor` ticks moves that much further
+        self.pacman.speed *= factor
+        self.pacman.animation_speed *= factor
+        for ghost in self.ghosts:
+            ghost.speed *= factor
+            ghost.normal_speed *= factor
+            ghost.return_speed *= factor
+
+    def next_level(self):
+        """Start the next level, keeping the score and lives"""
+        level_id = self.level.advance()
+        prepared = self.prefetcher.get(level_id)
+        score = self.pacman.pallet_count
+        self._start_level(prepared.grid, prepared.nav_table)
+        self.pacman.pallet_count = score
+        self.prepared_level = prepared
+        # Start on the level after this one a second in, not during the change itself
+        self._prefetch_at = self.tick + TICK_RATE
+
+    def now_ms(self):
+        """Simulated milliseconds since start"""
+        return self.tick * 1000 // TICK_RATE
+
+    @property
+    def game_over(self):
+        return self.level.get_lives() <= 0
+
+    @property
+    def level_cleared(self):
+        """True once every pellet is eaten (never seen with advance_levels)"""
+        return self.grid.cleared
+
+    def step(self, direction=None):
+        """Advance the game by step_ticks ticks; `direction` is this step's (dx, dy) input or None"""
+        pacman = self.pacman
+        if self.recorder is not None:
+            self.recorder.record_input(self.tick, direction)
+        if direction is not None:
+            pacman.queue_direction(*direction)
+        # Update Pacman first
+        pacman.update()
+        # If Pacman ate a power pellet this tick, enter scatter BEFORE collisions
+        if pacman.last_ate_power:
+            self.ghost_manager.enter_scatter_mode()
+            pacman.last_ate_power = False
+        PROFILER.mark("pacman.update")
+        # Then update ghosts and check collisions
+        self.ghost_manager.update()
+        PROFILER.mark("ghost.update")
+        self.collisions.update(self.tick)
+        PROFILER.mark("collision")
+        if self.advance_levels:
+            if self.grid.cleared:
+                self.next_level()
+            elif self._prefetch_at is not None and self.tick >= self._prefetch_at:
+                self._prefetch_at = None
+                self.prefetcher.prefetch(next_level_id(self.level.level_id))
+        self.tick += self.step_ticks
+        if self.recorder is not None:
+            self.recorder.after_tick(self)
+
+    def state_hash(self):
+        """64-bit hash of everything that decides the rest of the game"""
+        pacman = self.pacman
+        h = hashlib.blake2b(digest_size=8)
+        h.update(struct.pack("<qqqq", self.tick, self.level.get_lives(), pacman.pallet_count,
+                             self.level.levels_cleared))
+        h.update(struct.pack("<ddiiii", pacman.px, pacman.py, pacman.dx, pacman.dy,
+                             pacman.next_dx, pacman.next_dy))
+        for ghost in self.ghosts:
+            h.update(struct.pack("<dddd??", ghost.px, ghost.py, ghost.dx, ghost.dy,
+                                 ghost.scatter_active, ghost.returning_to_base))
+        h.update(self.grid.pellets)
+        return h.digest()
+
+    def run(self, ticks, controller=None):
+        """Play up to `ticks` more ticks, stopping early on game over or a cleared level.
+
+        `controller(sim)` may return a (dx, dy) direction to queue, or None.
+        """
+        end = self.tick + ticks
+        while self.tick < end:
+            direction = controller(self) if controller is not None else None
+            self.step(direction)
+            if self.game_over or self.level_cleared:
+                break
+        return self.tick
+
+
+def random_controller(rng, change_every=30):
+    """Controller that queues a random direction every few ticks"""
+    def controller(sim):
+        # "<" rather than "==" so a bigger step_ticks can't skip the tick
+        if sim.tick % change_every < sim.step_ticks:
+            return rng.choice(DIRECTIONS)
+        return None
+    return controller
+
+
+def scripted_controller(directions, change_every=30):
+    """Controller that cycles through a fixed list of directions"""
+    def controller(sim):
+        if sim.tick % change_every < sim.step_ticks:
+            return directions[sim.tick // change_every % len(directions)]
+        return None
+    return controller
+
+
+def greedy_controller():
+    """Bot that heads for the nearest pellet (BFS over the maze, tunnels included).
+
+    Replans when Pacman enters a new tile or stands still. Returns a fresh
+    controller per game since it remembers the last tile.
+    """
+    last_tile = [None]
+
+    def controller(sim):
+        pacman = sim.pacman
+        tile = pacman.current_tile()
+        grid = sim.grid
+        moving = pacman.dx != 0 or pacman.dy != 0
+        if (tile == last_tile[0] and moving) or not grid.in_bounds(*tile):
+            return None
+        last_tile[0] = tile
+        neighbors = get_topology(grid).neighbors
+        parent = {tile: None}
+        dq = deque([tile])
+        while dq:
+            cur = dq.popleft()
+            if cur != tile and grid.has_pellet(*cur):
+                while parent[cur] != tile:
+                    cur = parent[cur]
+                return direction_between(tile, cur, grid)
+            for nb in neighbors(*cur):
+                if nb not in parent:
+                    parent[nb] = cur
+                    dq.append(nb)
+        return None
+    return controller
+
+
+if __name__ == "__main__":
+    # Headless soak run: python src/simulation.py [ticks] [seed] [maze size]
+    # (a size plays on a generated NxN maze instead of level 1)
+    import sys
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    grid = None
+    if len(sys.argv) > 3:
+        from maze_gen import grid_of_size
+        grid = grid_of_size(int(sys.argv[3]), seed=seed)
+    sim = Simulation(seed=seed, grid=grid)
+    if sim.nav_table is not None:
+        print(sim.nav_table.describe())
+    start = time.perf_counter()
+    done = sim.run(ticks, random_controller(random.Random(seed)))
+    elapsed = time.perf_counter() - start
+    print(f"{done} ticks in {elapsed:.2f}s ({done / elapsed:.0f} ticks/s, "
+          f"{done / elapsed / TICK_RATE:.0f}x real time)")
+    print(f"score={sim.pacman.pallet_count} lives={sim.level.get_lives()} "
+          f"pellets left={sim.grid.pellets_remaining}")
@@ -0,0 +1,125 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+# Neighbour order everywhere (BFS tie-breaks depend on it): east, west, south, north
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+EAST, WEST, SOUTH, NORTH = range(4)
+_DIRECTION_INDEX = {d: k for k, d in enumerate(DIRECTIONS)}
+NO_NEIGHBOR = -1
+
+# Topologies by (width, height, walkability mask), least recently used first;
+# copies of a level share one. Soak runs over many generated mazes would
+# otherwise keep every one of them (a 1001x1001 topology is tens of MB).
+MAX_TOPOLOGIES = 8
+_topologies = OrderedDict()
+# Asked for from the level prefetcher and plan workers too
+_topologies_lock = threading.Lock()
+
+
+class Topology:
+    """Which tile leads to which, for one level's walls: built once, shared by everything.
+
+    neighbor[i * 4 + k] is the index (y * width + x) of the tile reached from
+    tile i by DIRECTIONS[k], or NO_NEIGHBOR if that is a wall or the map
+    edge. Tunnels come from the map itself: a row whose first and last
+    tiles are both walkable wraps around horizontally, and a column whose
+    top and bottom tiles are both walkable wraps vertically.
+
+    As in the original per-call neighbour code, a tile's neighbours are the
+    walkable tiles next to it whether or not the tile itself is walkable.
+    """
+
+    def __init__(self, width, height, walkable):
+        self.width = width
+        self.height = height
+        self.walkable = walkable
+        size = width * height
+        last_x = width - 1
+        self.tunnel_rows = frozenset(
+            y for y in range(height) if walkable[y * width] and walkable[y * width + last_x]
+        )
+        self.tunnel_cols = frozenset(
+            x for x in range(width) if walkable[x] and walkable[(height - 1) * width + x]
+        )
+
+        # One comprehension per direction, then interleaved: i * 4 + k
+        east = array("i", [i + 1 if i % width != last_x and walkable[i + 1] else NO_NEIGHBOR
+                           for i in range(size)])
+        west = array("i", [i - 1 if i % width and walkable[i - 1] else NO_NEIGHBOR
+                           for i in range(size)])
+        south = array("i", [i + width if i + width < size and walkable[i + width] else NO_NEIGHBOR
+                            for i in range(size)])
+        north = array("i", [i - width if i >= width and walkable[i - width] else NO_NEIGHBOR
+                            for i in range(size)])
+        neighbor = array("i", [NO_NEIGHBOR]) * (size * 4)
+        neighbor[EAST::4] = east
+        neighbor[WEST::4] = west
+        neighbor[SOUTH::4] = south
+        neighbor[NORTH::4] = north
+        for y in self.tunnel_rows:
+            left, right = y * width, y * width + last_x
+            neighbor[left * 4 + WEST] = right
+            neighbor[right * 4 + EAST] = left
+        for x in self.tunnel_cols:
+            top, bottom = x, (height - 1) * width + x
+            neighbor[top * 4 + NORTH] = bottom
+            neighbor[bottom * 4 + SOUTH] = top
+        self.neighbor = neighbor
+
+        # Per-tile neighbour tuples, filled in the first time a tile is asked about
+        self._adjacent = [None] * size
+        self._links = None
+
+    def index(self, x, y):
+        return y * self.width + x
+
+    def neighbors(self, x, y):
+        """Walkable (x, y) neighbours of a tile, tunnels included, in DIRECTIONS order"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return ()
+        i = y * self.width + x
+        adjacent = self._adjacent[i]
+        if adjacent is None:
+            width = self.width
+            adjacent = self._adjacent[i] = tuple(
+                (j % width, j // width) for j in self.neighbor[i * 4:i * 4 + 4] if j != NO_NEIGHBOR
+            )
+        return adjacent
+
+    def step(self, x, y, dx, dy):
+        """The tile one step from (x, y) in direction (dx, dy), or None if blocked"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        j = self.neighbor[(y * self.width + x) * 4 + _DIRECTION_INDEX[dx, dy]]
+        if j == NO_NEIGHBOR:
+            return None
+        return j % self.width, j // self.width
+
+    def links(self):
+        """Per tile index, [(neighbour index, (dx, dy))] (flow-field BFS)"""
+        if self._links is None:
+            neighbor = self.neighbor
+            self._links = [
+                [(neighbor[base + k], DIRECTIONS[k]) for k in range(4) if neighbor[base + k] != NO_NEIGHBOR]
+                for base in range(0, len(neighbor), 4)
+            ]
+        return self._links
+
+
+def get_topology(grid):
+    """The shared Topology for a grid's walls"""
+    key = (grid.width, grid.height, grid.walkable)
+    with _topologies_lock:
+        topology = _topologies.get(key)
+        if topology is not None:
+            _topologies.move_to_end(key)
+            return topology
+    topology = Topology(grid.width, grid.height, grid.walkable)
+    with _topologies_lock:
+        # Built by another thread meanwhile: keep the one already handed out
+        topology = _topologies.setdefault(key, topology)
+        _topologies.move_to_end(key)
+        while len(_topologies) > MAX_TOPOLOGIES:
+            _topologies.popitem(last=False)
+    return topology
@@ -0,0 +1,145 @@
+import random
+import numpy as np
+from maze import GRID, TILE_SIZE
+from grid import PILL, POWER_PILL
+from navigation import NavTable
+from simulation import Simulation, DIRECTIONS, GHOST_SPEED, GHOST_COUNT, INITIAL_LIVES
+
+# Action i: 0 = keep going, 1..4 = simulation.DIRECTIONS (up, down, left, right)
+ACTIONS = [None] + DIRECTIONS
+NUM_ACTIONS = len(ACTIONS)
+
+# Observation planes, each (height, width) of 0/1
+CHANNELS = ["walls", "pills", "power_pills", "pacman", "ghosts", "scared_ghosts"]
+WALLS, PILLS, POWER_PILLS, PACMAN, GHOSTS, SCARED_GHOSTS = range(len(CHANNELS))
+
+
+class VecEnv:
+    """K independent games stepped in lockstep in one process.
+
+    Every game has its own grid copy, entities and seeded RNG; the nav graph,
+    flow-field neighbour lists and (for ghost_ai="table") the nav table are
+    built once per level and shared. step() takes one action per game and
+    returns stacked observations of shape (K, len(CHANNELS), height, width),
+    rewards (score gained), done flags and per-game info dicts. Finished
+    games are reset automatically; their info holds the final score.
+    """
+
+    def __init__(self, num_envs, seed=0, grid=None, ghost_count=GHOST_COUNT, ghost_speed=GHOST_SPEED,
+                 initial_lives=INITIAL_LIVES, ghost_ai="flow", ticks_per_step=1, max_ticks=None):
+        self.num_envs = num_envs
+        self.grid = grid if grid is not None else GRID
+        self.ghost_count = ghost_count
+        self.ghost_speed = ghost_speed
+        self.initial_lives = initial_lives
+        self.ghost_ai = ghost_ai
+        # Ticks simulated per step() with the same action (frame skip)
+        self.ticks_per_step = ticks_per_step
+        # Games longer than this are cut off (done, info["truncated"] = True)
+        self.max_ticks = max_ticks
+        self.nav_table = NavTable.for_grid(self.grid) if ghost_ai == "table" else None
+        # Seeds for new games come from here, so a VecEnv seed fixes every episode
+        self._seed_rng = random.Random(seed)
+
+        height, width = self.grid.height, self.grid.width
+        self.observation_shape = (len(CHANNELS), height, width)
+        self._obs = np.zeros((num_envs,) + self.observation_shape, dtype=np.uint8)
+        walls = np.frombuffer(self.grid.walkable, dtype=np.uint8).reshape(height, width) == 0
+        self._obs[:, WALLS] = walls
+        self._tiles = np.empty((num_envs, height, width), dtype=np.uint8)
+        self.sims = [None] * num_envs
+        self._scores = np.zeros(num_envs, dtype=np.int64)
+
+    def _new_game(self, i):
+        sim = Simulation(ghost_speed=self.ghost_speed, initial_lives=self.initial_lives,
+                         ghost_count=self.ghost_count, ghost_ai=self.ghost_ai,
+                         nav_table=self.nav_table, grid=self.grid,
+                         seed=self._seed_rng.randrange(2 ** 32))
+        self.sims[i] = sim
+        self._scores[i] = 0
+
+    def reset(self):
+        for i in range(self.num_envs):
+            self._new_game(i)
+        return self.observe()
+
+    def observe(self):
+        """Stacked observation planes for every game (a fresh array each call)"""
+        if None in self.sims:
+            raise RuntimeError("call reset() first")
+        obs = self._obs
+        height, width = self.grid.height, self.grid.width
+        tiles = self._tiles
+        for i, sim in enumerate(self.sims):
+            tiles[i] = np.frombuffer(sim.grid.tiles, dtype=np.uint8).reshape(height, width)
+        obs[:, PILLS] = tiles == PILL
+        obs[:, POWER_PILLS] = tiles == POWER_PILL
+        obs[:, PACMAN:] = 0
+
+        # Entity tiles, clipped so tunnel overshoot stays on the board
+        env_index, xs, ys, channels = [], [], [], []
+        for i, sim in enumerate(self.sims):
+            env_index.append(i)
+            xs.append(sim.pacman.px)
+            ys.append(sim.pacman.py)
+            channels.append(PACMAN)
+            for ghost in sim.ghosts:
+                env_index.append(i)
+                xs.append(ghost.px)
+                ys.append(ghost.py)
+                channels.append(SCARED_GHOSTS if ghost.scatter_active else GHOSTS)
+        tx = np.clip(np.floor_divide(xs, TILE_SIZE).astype(np.intp), 0, width - 1)
+        ty = np.clip(np.floor_divide(ys, TILE_SIZE).astype(np.intp), 0, height - 1)
+        obs[env_index, channels, ty, tx] = 1
+        return obs.copy()
+
+    def step(self, actions):
+        """Apply one action per game; returns (obs, rewards, dones, infos)"""
+        if None in self.sims:
+            raise RuntimeError("call reset() first")
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"expected {self.num_envs} actions, got shape {actions.shape}")
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        infos = [{} for _ in range(self.num_envs)]
+        for i, sim in enumerate(self.sims):
+            direction = ACTIONS[actions[i]]
+            for _ in range(self.ticks_per_step):
+                sim.step(direction)
+                # A queued direction stays queued; no need to repeat it
+                direction = None
+                if sim.game_over or sim.level_cleared:
+                    break
+            score = sim.pacman.pallet_count
+            rewards[i] = score - self._scores[i]
+            self._scores[i] = score
+            truncated = self.max_ticks is not None and sim.tick >= self.max_ticks
+            info = infos[i]
+            info["lives"] = sim.level.get_lives()
+            info["score"] = score
+            if sim.game_over or sim.level_cleared or truncated:
+                dones[i] = True
+                info["truncated"] = truncated and not (sim.game_over or sim.level_cleared)
+                info["cleared"] = sim.level_cleared
+                info["ticks"] = sim.tick
+                self._new_game(i)
+        return self.observe(), rewards, dones, infos
+
+
+if __name__ == "__main__":
+    # Throughput: K games in one VecEnv vs one game stepped K times as many ticks
+    import sys
+    import time
+
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    action_rng = np.random.default_rng(0)
+    for k in (1, 8, 64, 256):
+        env = VecEnv(k, seed=0, initial_lives=10 ** 9)
+        env.reset()
+        n = max(1, steps // k)
+        start = time.perf_counter()
+        for _ in range(n):
+            env.step(action_rng.integers(0, NUM_ACTIONS, size=k))
+        elapsed = time.perf_counter() - start
+        print(f"K={k:>4}: {n * k / elapsed:>9.0f} game-ticks/s ({elapsed / n * 1000:.2f} ms per step)")